@@ -0,0 +1,50 @@
+import delegator_wiring
+import add_mapper_UMM2ISO as mapper
+import generate_setup as setup
+from termcolor import colored
+
+# Function to check if the field mapper of a field is already wired into an ISO to UMM message mapper
+def analyze_message_mapper(message_mapper_path, field_mapper):
+    message_mapper_content = mapper.read_file_as_string(message_mapper_path)
+    return delegator_wiring.is_wired(message_mapper_content, "iso_to_umm", mapper.get_field_mapper(field_mapper, "iso_to_umm"))
+
+
+def main():
+    import spec_cache
+
+    spec, _ = spec_cache.load_spec(setup.SPEC_FILE)
+    message_function = spec["message_function"]
+    message_function_description = "Financial Request"
+    directions = ["inbound", "outbound"]
+    bidirection = "iso_to_umm"
+
+    for i, dir in enumerate(directions):
+        print(colored(f"{i+1}. {dir}", 'yellow'))
+    index = int(input(colored("Enter the number of the direction to use: ", 'white')))
+    while index < 1 or index > len(directions):
+        print(colored("Invalid direction number. Please enter a valid number.", 'red'))
+        index = int(input(colored("Enter the number of the direction to use: ", 'white')))
+    direction = directions[index-1]
+
+    field = int(input(colored("Enter the field number to implement: ", 'white')))
+    try:
+        [field_mapper] = mapper.locate_field_mappers([field], bidirection)
+    except RuntimeError:
+        # The missing field mapper has already been reported
+        return
+    except ValueError as error:
+        print(colored(str(error), "red"))
+        return
+    message_mapper_path = mapper.locate_message_mapper(message_function, message_function_description, direction, bidirection)
+
+    if analyze_message_mapper(message_mapper_path, field_mapper):
+        print(colored(f"Field {field} is already implemented in the message mapper.", "green"))
+    else:
+        print(colored(f"Field {field} is not implemented in the message mapper.", "red"))
+        message_mapper_content = mapper.read_file_as_string(message_mapper_path)
+        mapper.write_file(message_mapper_path, mapper.add_fields_to_delegator(message_mapper_content, [field_mapper], bidirection))
+        print(colored(f"Field {field} has been successfully implemented in the message mapper.", "green"))
+    print(colored("Process completed.", "green"))
+
+if __name__ == "__main__":
+    main()
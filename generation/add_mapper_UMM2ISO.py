@@ -1,34 +1,17 @@
-import os, re
-import platform
+import re
 import generate_setup as setup
-from pathlib import Path
+import field_mapper_catalog as catalog
+import delegator_wiring
+import changeset
+import instrumentation
+import project_config
+from functools import lru_cache
 from termcolor import colored
-from jinja2 import Environment, FileSystemLoader
-
-# Constants for paths
-# Constants for paths
-if platform.system() == "Windows":
-    BASE_DIR = "C:/Source/mapping-components-auth-trg"
-else:
-    BASE_DIR = "/Source/mapping-components-auth-trg"
-COMMON_DIR = BASE_DIR + "/mapping-components-auth-trg"
-MAIN_JAVA = "/src/main/java/"
-FIELD_MAPPERS_PATH_UMM_TO_ISO = "eu/nets/mapping/components/auth/trg/umm_to_iso8583/field_mappers"
-FIELD_MAPPERS_DIR_UMM_TO_ISO = COMMON_DIR + MAIN_JAVA + FIELD_MAPPERS_PATH_UMM_TO_ISO
-FIELD_MAPPERS_PATH_ISO_TO_UMM = "eu/nets/mapping/components/auth/trg/iso8583_to_umm/field_mappers"
-FIELD_MAPPERS_DIR_ISO_TO_UMM = COMMON_DIR + MAIN_JAVA + FIELD_MAPPERS_PATH_ISO_TO_UMM
-INBOUND_BASE_DIR = BASE_DIR + "/mapping-components-auth-trg-dk-merchant"
-INBOUND_MAPPERS_DIR_ISO_TO_UMM = INBOUND_BASE_DIR + MAIN_JAVA + "eu/nets/mapping/components/auth/trg/dk/merchant/iso8583_to_umm/message_mappers"
-INBOUND_MAPPERS_DIR_UMM_TO_ISO = INBOUND_BASE_DIR + MAIN_JAVA + "eu/nets/mapping/components/auth/trg/dk/merchant/umm_to_iso8583/message_mappers"
-OUTBOUND_BASE_DIR = BASE_DIR + "/mapping-components-auth-trg-dk-merchant-nds"
-OUTBOUND_MAPPERS_DIR_UMM_TO_ISO = OUTBOUND_BASE_DIR + MAIN_JAVA + "eu/nets/mapping/components/auth/trg/dk/merchant/nds/umm_to_iso8583/message_mappers"
-OUTBOUND_MAPPERS_DIR_ISO_TO_UMM = OUTBOUND_BASE_DIR + MAIN_JAVA + "eu/nets/mapping/components/auth/trg/dk/merchant/nds/iso8583_to_umm/message_mappers"
-dir_paths = {
-    ("inbound", "iso_to_umm"): INBOUND_MAPPERS_DIR_ISO_TO_UMM,
-    ("inbound", "umm_to_iso"): INBOUND_MAPPERS_DIR_UMM_TO_ISO,
-    ("outbound", "iso_to_umm"): OUTBOUND_MAPPERS_DIR_ISO_TO_UMM,
-    ("outbound", "umm_to_iso"): OUTBOUND_MAPPERS_DIR_UMM_TO_ISO,
-}
+# argparse, spec_cache and spec_reader are imported where they are used, keeping read-only checks fast to start
+
+# The paths of the selected module of the project config are shared with generate_setup, see project_config.py
+FIELD_MAPPER_ROOTS = setup.FIELD_MAPPER_ROOTS
+dir_paths = setup.dir_paths
     
 # Function to analyze a message mapper
 def analyze_message_mapper(message_mapper_path, field):
@@ -41,21 +24,27 @@ def analyze_message_mapper(message_mapper_path, field):
 
 # Function to check and modify DataElementMapperDelegator for a specific field
 def modify_message_mapper(message_mapper_path, field):
-    field_mapper = locate_field_mapper(field)
+    modify_message_mapper_fields(message_mapper_path, [field])
+
+# Function to add several fields to the builder chain of a message mapper in a single read/modify/write
+def modify_message_mapper_fields(message_mapper_path, fields, bidirection="umm_to_iso"):
+    wire_message_mapper(message_mapper_path, locate_field_mappers(fields, bidirection), bidirection)
 
+# Function to add located field mappers to the builder chain of a message mapper
+def wire_message_mapper(message_mapper_path, field_mappers, bidirection="umm_to_iso"):
     # Read the message mapper file
     message_mapper_content = read_file_as_string(message_mapper_path)
     
-    # Check if the field is already implemented
-    modified_content = add_field_to_delegator(message_mapper_content, field_mapper)
+    # Add all the fields to the builder chain at once
+    modified_content = add_fields_to_delegator(message_mapper_content, field_mappers, bidirection)
         
     # Write the modified content back to the file
     write_file(message_mapper_path, modified_content)
 
 
 # Function to find the field mapper for a specific field and implement it if it doesn't exist
-def locate_field_mapper(field):
-    possible_field_mappers = does_field_mapper_exist(field, "umm_to_iso")
+def locate_field_mapper(field, bidirection="umm_to_iso"):
+    possible_field_mappers = does_field_mapper_exist(field, bidirection)
     if possible_field_mappers.__len__() == 0:
         implement_new_mapper(field)
     else:
@@ -71,8 +60,30 @@ def locate_field_mapper(field):
         return possible_field_mappers[index-1]
 
 
+# Function to find the field mappers of several fields, rejecting the ones that cannot be wired into the builder
+# chains of the conversion before any message mapper is touched
+def locate_field_mappers(fields, bidirection="umm_to_iso"):
+    field_mappers = [locate_field_mapper(field, bidirection) for field in fields]
+    delegator_wiring.check_field_mappers(bidirection, [get_field_mapper(field_mapper, bidirection) for field_mapper in field_mappers])
+    return field_mappers
+
+
 # Function to construct message mapper path based on description and direction
 def locate_message_mapper(message_function, message_function_description, direction, bidirection):
+    full_path = message_mapper_path(message_function_description, direction, bidirection)
+    
+    # Check if the mapper exists under the constructed path
+    if changeset.exists(full_path):
+        instrumentation.event("message_mapper.found", "Message mapper found: " + colored(full_path, 'yellow'), path=full_path)
+    else:
+        instrumentation.event("message_mapper.missing", "Message mapper not found: " + colored(full_path, 'yellow') + ", generating on the spot",
+                              path=full_path)
+        setup.generate_mapper_class(message_function_description, message_function, direction, bidirection)
+
+    return full_path
+
+# Function to construct the path of a message mapper, without checking that it exists
+def message_mapper_path(message_function_description, direction, bidirection):
     # Logic to construct the path based on project structure and inputs
     mapper_name = f"{message_function_description.replace(' ', '')}Mapper"
     
@@ -83,27 +94,15 @@ def locate_message_mapper(message_function, message_function_description, direct
         raise ValueError("Invalid direction or bidirection provided.")
     
     # Construct the full path to the mapper
-    full_path = dir_path + "/" +  mapper_name + ".java"
-    
-    # Check if the mapper exists under the constructed path
-    if os.path.exists(full_path):
-        print(f"Message mapper found: " + colored(full_path, 'yellow'))
-    else:
-        print(f"Message mapper not found: " + colored(full_path, 'yellow') + ", generating on the spot")
-        setup.generate_mapper_class(message_function_description, message_function, direction, bidirection)
-
-    return full_path
+    return f"{dir_path}/{mapper_name}.java"
 
 # Function to read a file line by line
 def read_file(file_path):
-    with open(file_path, 'r') as file:
-        return file.readlines()
+    return changeset.read_lines(file_path)
 
 # Function that reads the entire file into a single string
 def read_file_as_string(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    return content
+    return changeset.read_file(file_path)
 
 # Function to analyze mapper content to find implemented fields
 def analyze_mapper_content(content, field):
@@ -128,105 +127,38 @@ def analyze_mapper_content(content, field):
 
     return field_found
 
+# Function to load the field mapper catalog, scanned once per process and refreshed from file mtimes
+@lru_cache(maxsize=None)
+def get_field_mapper_catalog():
+    module = project_config.get_module(setup.module_name)
+    return catalog.load_catalog(FIELD_MAPPER_ROOTS, project_config.module_cache_path(catalog.CATALOG_PATH, module))
+
 # Function to check if a specific field mapper implementation exists in the path 
 def does_field_mapper_exist(field, direction):    
-    # Pattern to match files, e.g., DE49_TransactionCurrencyCodeMapper
-    file_pattern = re.compile(rf'DE{field}_\w+Mapper\.java$')
-    possible_field_mappers = []
-    if direction == "umm_to_iso": 
-        directory = FIELD_MAPPERS_DIR_UMM_TO_ISO
-        for filename in os.listdir(directory):
-            # Check if the filename matches the pattern
-            if file_pattern.match(filename):
-                possible_field_mappers.append(filename)
+    # Look up the field mappers, e.g. DE49_TransactionCurrencyCodeMapper, in the catalog
+    possible_field_mappers = [class_name + ".java" for class_name, _, _ in catalog.find_field_mappers(get_field_mapper_catalog(), direction, field)]
     if possible_field_mappers.__len__() == 0:
-        print(f"Field mapper for field {field} is not implemented.")
+        instrumentation.event("field_mapper.missing", f"Field mapper for field {field} is not implemented.", field=field, direction=direction)
     return possible_field_mappers
 
+# Function to find a field mapper of the catalog by its file name
+def get_field_mapper(field_mapper, direction="umm_to_iso"):
+    class_name = field_mapper.split("/")[-1].replace(".java", "")
+    mapper = catalog.find_field_mapper(get_field_mapper_catalog(), direction, class_name)
+    if mapper is None:
+        raise ValueError(f"Field mapper {class_name} not found in the catalog")
+    return mapper
+
 # Function to add a new field to the DataElementMapperDelegator
 def add_field_to_delegator(content, field_mapper):
+    return add_fields_to_delegator(content, [field_mapper])
 
-    # Step 1: Identify the builder method call start and end
-    builder_start = content.find("DataElementMapperDelegator.<UniMessageContext, MappingContext>builder()")
-    builder_end = content.find(".build()", builder_start) + len(".build()")
-    
-    # Extract the builder method content
-    builder_content = content[builder_start:builder_end]
-    
-    # Find all existing field numbers in the builder content
-    existing_fields = re.findall(r"\.de(\d+)", builder_content)
-    existing_fields_numbers = [int(num) for num in existing_fields]
-    
-    # Determine the correct insertion point based on field number
-    new_field_number = get_de_number(field_mapper)
-    insertion_index = None
-    for i, num in enumerate(existing_fields_numbers):
-        if new_field_number < num:
-            # Find the position of the field just larger than the new field
-            insertion_index = builder_content.find(f".de{num}")
-            break
-    
-    # If the new field number is larger than any existing, append before .build()
-    if insertion_index is None:
-        insertion_index = builder_content.rfind(".build()")
-    
-    instance_call = create_instance_call_line(field_mapper)
-
-    field_method = field_mapper.replace(".java", "").split("_")[-1]
-    # Construct the new field method call
-    new_field_method_call = f".de{new_field_number}_{field_method}({instance_call})\n                        "
-    
-    # Construct the static import line
-    static_import_line = create_static_import_line(field_mapper, FIELD_MAPPERS_PATH_UMM_TO_ISO) + "\n"
-    # Find the position package declaration
-    position_after_second_newline = content.find('\n', content.find('\n') + 1) + 1
-    content_with_imports = content[:position_after_second_newline] + static_import_line + content[position_after_second_newline:builder_start]
-
-    # Insert the new field method call into the builder content
-    modified_builder_content = builder_content[:insertion_index] + new_field_method_call + builder_content[insertion_index:]
-
-    # Replace the old builder content in the original content with the modified one
-    modified_content = content_with_imports + modified_builder_content + content[builder_end:]
-    
+# Function to add several new fields to the builder chain of a message mapper, parsing the builder chain once
+def add_fields_to_delegator(content, field_mappers, bidirection="umm_to_iso"):
+    mappers = [get_field_mapper(field_mapper, bidirection) for field_mapper in field_mappers]
+    modified_content, _ = delegator_wiring.wire_field_mappers(content, bidirection, mappers)
     return modified_content
 
-def create_instance_call_line(field_mapper):
-    # Find the field mapper class name
-    field_mapper_class_name = field_mapper.split(".")[0]
-    
-    directory = FIELD_MAPPERS_DIR_UMM_TO_ISO + "/" + field_mapper_class_name + ".java"
-    # Find the instance call for the field mapper
-    field_mapper_instance_call = find_field_mapper_instance_call(field_mapper_class_name, directory)
-    return field_mapper_instance_call
-
-def find_field_mapper_instance_call(class_name, directory):
-    # Read the field mapper class file
-    class_content = read_file_as_string(directory)
-
-    # Regex pattern to find "public static {className}" followed by any method call
-    pattern = rf"public static {class_name}\s+([^\s(]+)\s*\("
-    
-    match = re.search(pattern, class_content)
-    
-    if match:
-        # Return the method call found
-        return match.group(1) + "()"
-    else:
-        raise ValueError(f"Instance call not found for class {class_name}")
-    
-def create_static_import_line(field_mapper_path, field_mapper_dir):
-    # Extract the package path from the field mapper directory
-    package_path = field_mapper_dir.replace("/", ".").strip(".")
-
-    # Extract the class name and field name from the file name
-    class_name = field_mapper_path.split("/")[-1].replace(".java", "")
-    field_name = class_name.replace("Mapper", "")
-
-    # Construct the static import line
-    import_line = f"import static {package_path}.{class_name}.{field_name};"
-
-    return import_line
-
 def get_de_number(filename):
     # Regex pattern to match "DE" followed by any number of digits
     pattern = r"DE(\d+)_"
@@ -240,10 +172,9 @@ def get_de_number(filename):
     else:
         return None
         
-# Function to write modified content back to a file
+# Function to write modified content back to a file, staged in the transaction in progress if there is one
 def write_file(file_path, content):
-    with open(file_path, 'w') as file:   
-        file.writelines(content)
+    changeset.write_file(file_path, content)
 
 # Function to implement a new mapper based on specifications
 def implement_new_mapper(field):
@@ -252,11 +183,80 @@ def implement_new_mapper(field):
     raise RuntimeError("Field mapper not implemented. Function needs to be implemented")
 
 
-def main():
-    message_function = "RVRA" #"ADNO" 
-    message_function_description = "Reversal Advice" #"Addendum Notification" 
+# Function to wire every field mapped in the spec (or only the given data elements of it) into the message mappers
+# of the given directions, without prompts
+def implement_spec_fields(spec, message_function_description, directions, bidirection="umm_to_iso", fields=None):
+    import spec_reader
+
+    message_function = spec["message_function"]
+    spec_fields = sorted({field["data_element"] for field in spec["fields"] if spec_reader.is_mapped_field(field)
+                          and (fields is None or field["data_element"] in fields)})
+
+    # Cross-reference the spec fields with the field mapper catalog
+    field_mappers = []
+    missing_fields = []
+    ambiguous_fields = []
+    for field in spec_fields:
+        candidates = catalog.find_field_mappers(get_field_mapper_catalog(), bidirection, field)
+        if len(candidates) == 1:
+            field_mappers.append(candidates[0][0] + ".java")
+        elif candidates:
+            ambiguous_fields.append((field, [class_name for class_name, _, _ in candidates]))
+        else:
+            missing_fields.append(field)
+
+    # Read the message mappers of all directions at once instead of one round-trip after the other
+    changeset.prefetch([message_mapper_path(message_function_description, direction, bidirection) for direction in directions])
+    for direction in directions:
+        mapper_path = locate_message_mapper(message_function, message_function_description, direction, bidirection)
+        message_mapper_content = read_file_as_string(mapper_path)
+        # The field mappers already wired in the builder chain of the conversion are skipped by the wiring
+        modified_content, wired = delegator_wiring.wire_field_mappers(
+            message_mapper_content, bidirection, [get_field_mapper(field_mapper, bidirection) for field_mapper in field_mappers])
+
+        if wired:
+            write_file(mapper_path, modified_content)
+        added = [get_de_number(class_name) for class_name in wired]
+        new_fields = ", ".join(map(str, added)) or "none"
+        action = "fields to add" if changeset.is_dry_run() else "fields added"
+        instrumentation.event("fields.wired", colored(f"{direction}: {action}: {new_fields}; "
+                                                      f"already implemented: {len(field_mappers) - len(wired)}", "green"),
+                              path=mapper_path, added=added, implemented=len(field_mappers) - len(wired))
+
+    if missing_fields:
+        instrumentation.event("fields.missing", colored(f"No field mapper implemented for fields: {', '.join(map(str, missing_fields))}", "red"),
+                              fields=missing_fields)
+    for field, class_names in ambiguous_fields:
+        instrumentation.event("fields.ambiguous", colored(f"Several field mappers for field {field}, wire one manually: {', '.join(class_names)}", "yellow"),
+                              field=field, field_mappers=class_names)
+    return field_mappers, missing_fields, ambiguous_fields
+
+
+def main(argv=None):
+    import argparse
+    import spec_cache
+    import spec_reader
+
+    parser = argparse.ArgumentParser(description="Add field mappers to the UMM to ISO message mappers.")
+    parser.add_argument("--all-fields", action="store_true",
+                        help="wire every field mapped in the spec workbook into the inbound and outbound message mappers")
+    parser.add_argument("--spec", default=setup.SPEC_FILE, help="spec workbook (default: %(default)s)")
+    parser.add_argument("--sheet", default=None, help="sheet of the spec workbook (default: the first sheet)")
+    parser.add_argument("--dry-run", action="store_true", help="with --all-fields, print the unified diff instead of writing the files")
+    args = parser.parse_args(argv)
+
+    spec, _ = spec_cache.load_spec(args.spec, args.sheet)
+    message_function = spec["message_function"] #"RVRA" #"ADNO"
+    message_function_description = "Financial Request" #"Reversal Advice" #"Addendum Notification"
     directions = ["inbound", "outbound"]
     bidirection = "umm_to_iso"
+
+    if args.all_fields:
+        message_function_description = spec_reader.describe_message_function(spec["sheet"])
+        with changeset.transaction(dry_run=args.dry_run):
+            implement_spec_fields(spec, message_function_description, directions, bidirection)
+        print(colored("Process completed.", "green"))
+        return
     
     for i, dir in enumerate(directions):
         print(colored(f"{i+1}. {dir}", 'yellow'))
@@ -0,0 +1,270 @@
+"""
+This script generates the mapper classes and the message type indicator mappings for a whole set of spec workbooks
+in a single, non-interactive run.
+
+The mapper classes are generated into every module of the project config (see project_config.py), or into the
+modules selected with --modules, in a single run and a single changeset.
+
+Usage:
+    python generation/batch_generate.py <directory or manifest.json> [--directions 1,2,3,4] [--modules all | name,...]
+                                        [--workers N] [--dry-run] [--profile report.json [--profile-format chrome]]
+
+A manifest is a JSON list of entries, each with a "workbook" path (relative to the manifest) and optionally
+a "sheet" and a "description" overriding the one derived from the sheet title.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from termcolor import colored
+import cli
+import changeset
+import generate_setup as setup
+import instrumentation
+import project_config
+import spec_cache
+import spec_reader
+
+GENERATED = "generated"
+SKIPPED = "skipped"
+FAILED = "failed"
+# Detail of the items skipped because they were generated by an earlier run; the other skips are listed in the summary
+ALREADY_EXISTS = "already exists"
+WORKBOOK_SUFFIXES = (".xlsx", ".xlsm")
+
+
+def collect_jobs(source):
+    """
+    Collects the workbooks to process from a directory or a manifest file.
+
+    Args:
+        source (str): The directory containing the spec workbooks, or the path of a JSON manifest.
+
+    Returns:
+        list: The jobs as dicts with the keys "workbook", "sheet" and "description".
+    """
+    source = Path(source)
+    if source.is_dir():
+        return [
+            {"workbook": str(path), "sheet": None, "description": None}
+            for path in sorted(source.iterdir())
+            if path.suffix.lower() in WORKBOOK_SUFFIXES and not path.name.startswith("~$")
+        ]
+
+    with open(source, 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    return [
+        {
+            "workbook": str(source.parent / entry["workbook"]),
+            "sheet": entry.get("sheet"),
+            "description": entry.get("description"),
+        }
+        for entry in manifest
+    ]
+
+
+def process_workbook(job, directions, modules):
+    """
+    Extracts every mapping sheet of a workbook (or the sheet selected by the job) through the spec cache and renders
+    its mapper classes for every module, so that each workbook is read once whatever the number of modules.
+
+    Runs in a worker process and writes nothing: the rendered classes and the message type indicator mappings
+    are written afterwards by the parent process, in a single changeset for the whole batch.
+
+    Args:
+        job (dict): The job, see collect_jobs.
+        directions (list): The direction keys to generate, see generate_setup.directions_map.
+        modules (list): The modules to generate into, see project_config.resolve_module.
+
+    Returns:
+        tuple: A tuple containing:
+            - results (list): (status, label, detail) tuples for every mapper class, and for the skipped sheets.
+            - mappings (list): (message_function, message_type_indicator) pairs to add to the helpers.
+            - rendered (list): (label, file_path, content) tuples of the rendered mapper classes.
+    """
+    results = []
+    mappings = []
+    rendered = []
+    workbook = job["workbook"]
+    # Without a selected sheet the whole workbook is extracted in one pass and cached, so warm runs do not reopen
+    # it for the sheets that are not mapping sheets
+    label = f"{Path(workbook).name} [{job['sheet']}]" if job["sheet"] else workbook
+    skipped = []
+    try:
+        if job["sheet"]:
+            specs = [spec_cache.load_spec(workbook, job["sheet"])[0]]
+        else:
+            specs, skipped, _ = spec_cache.load_workbook_specs(workbook)
+    except Exception as error:
+        return [(FAILED, label, str(error))], mappings, rendered
+    results.extend((SKIPPED, f"{Path(workbook).name} [{sheet}]", f"not a mapping sheet: {reason}") for sheet, reason in skipped)
+    if not specs:
+        return results or [(SKIPPED, label, "no mapping sheet")], mappings, rendered
+
+    for spec in specs:
+        label = f"{Path(workbook).name} [{spec['sheet']}]"
+        description = job["description"] or spec_reader.describe_message_function(spec["sheet"])
+        message_function = spec["message_function"]
+        for indicator in spec_reader.split_message_type_indicators(spec["message_type_indicator"]):
+            mappings.append((message_function, indicator))
+
+        for module in modules:
+            for direction_key in directions:
+                direction, conversion = setup.directions_map[direction_key]
+                mapper_label = f"{label} {description} {direction}/{conversion}"
+                if len(modules) > 1:
+                    mapper_label = f"{module['name']}: {mapper_label}"
+                try:
+                    file_path, content = setup.render_mapper_class(description, message_function, direction, conversion,
+                                                                   output_dirs=module["dir_paths"])
+                except Exception as error:
+                    results.append((FAILED, mapper_label, str(error)))
+                else:
+                    rendered.append((mapper_label, file_path, content))
+    return results, mappings, rendered
+
+
+def write_mapper_classes(rendered):
+    """
+    Writes the rendered mapper classes, skipping the ones that already exist.
+
+    Args:
+        rendered (list): (label, file_path, content) tuples, see process_workbook.
+
+    Returns:
+        list: (status, label, detail) tuples for every mapper class.
+    """
+    results = []
+    changeset.prefetch_listings(os.path.dirname(file_path) for _, file_path, _ in rendered)
+    for label, file_path, content in rendered:
+        if changeset.exists(file_path):
+            results.append((SKIPPED, label, ALREADY_EXISTS))
+            continue
+        changeset.write_file(file_path, content)
+        results.append((GENERATED, label, ""))
+    return results
+
+
+def update_message_type_indicators(mappings, mti_helper_path=None):
+    """
+    Adds the collected mappings to a message type indicator helper in a single update.
+
+    Args:
+        mappings (list): (message_function, message_type_indicator) pairs.
+        mti_helper_path (str): The helper to update. Defaults to the helper of the selected module.
+
+    Returns:
+        list: (status, label, detail) tuples for every mapping.
+    """
+    if not mappings:
+        return []
+    try:
+        result = setup.update_message_type_indicators(sorted(set(mappings), key=lambda pair: pair[1]), mti_helper_path)
+    except (OSError, ValueError) as error:
+        return [(FAILED, mti_helper_path or "MessageTypeIndicatorHelper.java", str(error))]
+
+    results = [(GENERATED, f"MTI {mti} -> {function}", "") for function, mti in result["added"]]
+    results += [(SKIPPED, f"MTI {mti} -> {function}", ALREADY_EXISTS) for function, mti in result["existing"]]
+    results += [(FAILED, f"MTI {mti} -> {function}", f"already mapped to {existing}")
+                for function, mti, existing in result["conflicts"]]
+    return results
+
+
+def print_summary(results, dry_run=False):
+    """
+    Prints a single summary of the batch run, listing the failures and the items skipped for another reason than
+    already existing, e.g. the sheets that are not mapping sheets.
+
+    Args:
+        results (list): (status, label, detail) tuples.
+        dry_run (bool): Whether the batch was a dry run, so nothing was written.
+
+    Returns:
+        None
+    """
+    counts = {GENERATED: 0, SKIPPED: 0, FAILED: 0}
+    for status, label, detail in results:
+        counts[status] += 1
+        if status == FAILED:
+            instrumentation.event("batch.failed", colored(f"FAILED  {label}: {detail}", 'red'), label=label, detail=detail)
+        elif status == SKIPPED and detail != ALREADY_EXISTS:
+            instrumentation.event("batch.skipped", colored(f"SKIPPED {label}: {detail}", 'yellow'), label=label, detail=detail)
+    instrumentation.event("batch.completed",
+                          colored(f"Batch {'dry run ' if dry_run else ''}completed: {counts[GENERATED]} "
+                                  f"{'to generate' if dry_run else 'generated'}, {counts[SKIPPED]} skipped, {counts[FAILED]} failed.",
+                                  'red' if counts[FAILED] else 'green'),
+                          **counts)
+
+
+def run_batch(source, directions, workers=None, dry_run=False, modules=None):
+    """
+    Runs the batch generation for every workbook of the source in a process pool, into every module.
+
+    All mapper classes and the message type indicator helpers of all modules are committed together at the end;
+    if the commit fails, nothing is written.
+
+    Args:
+        source (str): The directory containing the spec workbooks, or the path of a JSON manifest.
+        directions (list): The direction keys to generate, see generate_setup.directions_map.
+        workers (int): The number of worker processes. Defaults to the number of CPUs.
+        dry_run (bool): Whether to print the unified diff of the batch instead of writing it.
+        modules (list): The modules to generate into, see project_config.get_modules. Defaults to the selected module.
+
+    Returns:
+        list: (status, label, detail) tuples for every processed item.
+    """
+    modules = modules or [project_config.get_module(setup.module_name)]
+    jobs = collect_jobs(source)
+    results = []
+    mappings = []
+    rendered = []
+    if jobs:
+        with instrumentation.span("batch.workbooks", workbooks=len(jobs), modules=len(modules)), \
+                ProcessPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1)) as executor:
+            profiled = [instrumentation.is_profiling()] * len(jobs)
+            for (job_results, job_mappings, job_rendered), recording in executor.map(
+                    instrumentation.profiled_call, profiled, [process_workbook] * len(jobs), jobs,
+                    [directions] * len(jobs), [modules] * len(jobs)):
+                instrumentation.merge_recording(recording)
+                results.extend(job_results)
+                mappings.extend(job_mappings)
+                rendered.extend(job_rendered)
+    # Modules sharing the common module share its helper, which is updated once
+    mti_helper_paths = sorted({module["mti_helper"] for module in modules})
+    try:
+        with changeset.transaction(dry_run=dry_run):
+            results.extend(write_mapper_classes(rendered))
+            for mti_helper_path in mti_helper_paths:
+                results.extend(update_message_type_indicators(mappings, mti_helper_path))
+    except OSError as error:
+        results = [(FAILED, label, f"rolled back: {error}") if status == GENERATED else (status, label, detail)
+                   for status, label, detail in results]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate mapper classes for a batch of spec workbooks.")
+    parser.add_argument("source", help="directory containing the spec workbooks, or a JSON manifest")
+    cli.add_directions_argument(parser, "generate")
+    parser.add_argument("--modules", default="all",
+                        help="comma separated modules of the project config to generate into (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--dry-run", action="store_true", help="print the unified diff instead of writing the files")
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        modules = project_config.get_modules(args.modules)
+    except ValueError as error:
+        parser.error(str(error))
+    with instrumentation.profiling(args.profile, args.profile_format, sys.argv):
+        results = run_batch(args.source, args.directions, args.workers, args.dry_run, modules)
+        print_summary(results, args.dry_run)
+    return 1 if any(status == FAILED for status, _, _ in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
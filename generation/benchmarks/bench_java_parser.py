@@ -0,0 +1,97 @@
+"""
+This script benchmarks the Java builder-chain parser on generated message mappers, checks that unchanged files
+round-trip byte for byte and times wiring a batch of field mappers.
+
+Usage (from the repository root):
+    python generation/benchmarks/bench_java_parser.py [--fields 40] [--repeat 2000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import delegator_wiring  # noqa: E402
+import java_parser  # noqa: E402
+
+PACKAGE = "eu.nets.mapping.components.auth.trg.umm_to_iso8583.field_mappers"
+
+
+def generate_message_mapper(fields):
+    """
+    Generates a UMM to ISO message mapper wiring a number of data elements.
+
+    Args:
+        fields (int): The number of wired data elements.
+
+    Returns:
+        str: The Java source.
+    """
+    imports = "".join(f"import static {PACKAGE}.DE{num}_Field{num}Mapper.DE{num}_Field{num};\n"
+                      for num in range(2, fields + 2))
+    calls = "".join(f"                        .de{num}_Field{num}Mapper(DE{num}_Field{num}())\n"
+                    for num in range(2, fields + 2))
+    return (
+        "package eu.nets.mapping.components.auth.trg.dk.merchant.umm_to_iso8583.message_mappers;\n\n"
+        f"{imports}"
+        "import eu.nets.uni.mapping.components.core.auth.iso8583.delegator.DataElementMapperDelegator;\n"
+        "import eu.nets.uni.mapping.components.core.context.MappingContext;\n\n"
+        "/**\n * Implementation of FNCQ message mapper.\n */\n"
+        "public class FinancialRequestMapper extends AbstractDataElementMappingDelegator {\n"
+        "    public FinancialRequestMapper() {\n"
+        "        super(\n"
+        "                messageTypeIndicatorMapper(),\n"
+        "                DataElementMapperDelegator.<UniMessageContext, MappingContext>builder()\n"
+        f"{calls}"
+        "                        .build()\n"
+        "        );\n"
+        "    }\n"
+        "}\n"
+    )
+
+
+def measure(function, repeat):
+    """
+    Times a function.
+
+    Args:
+        function (callable): The function to time.
+        repeat (int): The number of calls.
+
+    Returns:
+        float: The mean duration of a call in seconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Java builder-chain parser.")
+    parser.add_argument("--fields", type=int, default=40, help="data elements wired in the generated mapper")
+    parser.add_argument("--repeat", type=int, default=2000, help="timed runs")
+    args = parser.parse_args()
+
+    source = generate_message_mapper(args.fields)
+    for line_separator in ("\n", "\r\n"):
+        content = source.replace("\n", line_separator)
+        unchanged, wired = delegator_wiring.wire_field_mappers(content, "umm_to_iso", [])
+        assert unchanged == content and java_parser.apply_patches(content, []) == content and not wired
+    signature = delegator_wiring.get_signature("umm_to_iso", PACKAGE)
+    new_field_mappers = [(f"DE{num}_Field{num}Mapper", f"DE{num}_Field{num}", PACKAGE)
+                         for num in range(args.fields + 2, args.fields + 12)]
+
+    print(f"Message mapper: {args.fields} fields, {len(source)} bytes, round-trip unchanged")
+    timings = (
+        ("tokenize", lambda: java_parser.tokenize(source)),
+        ("parse + chain", lambda: java_parser.find_chain(java_parser.parse_java(source), signature["builder"])),
+        ("wire 10 fields", lambda: delegator_wiring.wire_field_mappers(source, "umm_to_iso", new_field_mappers)),
+    )
+    for name, function in timings:
+        print(f"{name:>15}: {measure(function, args.repeat) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+This script benchmarks reading many Java files on a high-latency file system, e.g. a network share: one
+changeset.read_file after the other against changeset.prefetch followed by the same reads.
+
+The latency of the share is simulated by sleeping before every open.
+
+Usage (from the repository root):
+    python generation/benchmarks/bench_prefetch.py [--files 300] [--latency-ms 5] [--workers 16]
+"""
+
+import argparse
+import builtins
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import changeset  # noqa: E402
+
+
+def make_files(root, count):
+    """
+    Creates message mapper sized Java files.
+
+    Args:
+        root (Path): The directory.
+        count (int): The number of files.
+
+    Returns:
+        list: The paths of the files.
+    """
+    paths = []
+    for i in range(count):
+        path = root / f"GeneratedMessage{i}Mapper.java"
+        path.write_text(f"public class GeneratedMessage{i}Mapper {{\n" + "    // field\n" * 200 + "}\n", encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def slow_open(latency):
+    """
+    Returns an open function that waits for the given latency before opening the file.
+    """
+    def open_with_latency(*args, **kwargs):
+        time.sleep(latency)
+        return builtins.open(*args, **kwargs)
+    return open_with_latency
+
+
+def time_reads(paths, prefetch_workers=None):
+    """
+    Times reading every file through the changeset, with a cold content cache.
+
+    Args:
+        paths (list): The paths of the files.
+        prefetch_workers (int): The number of prefetch threads, or None to read the files one after the other.
+
+    Returns:
+        float: The elapsed time in seconds.
+    """
+    changeset.forget_contents()
+    start = time.perf_counter()
+    if prefetch_workers:
+        changeset.prefetch(paths, prefetch_workers)
+    for path in paths:
+        changeset.read_file(path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prefetching reads of the changeset.")
+    parser.add_argument("--files", type=int, default=300, help="Java files to read")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated latency of every open")
+    parser.add_argument("--workers", type=int, default=changeset.PREFETCH_WORKERS, help="prefetch threads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = make_files(Path(tmp_dir), args.files)
+        # Shadows the builtin open in the changeset module only
+        changeset.open = slow_open(args.latency_ms / 1000)
+        try:
+            serial = time_reads(paths)
+            prefetched = time_reads(paths, args.workers)
+            warm = time.perf_counter()
+            for path in paths:
+                changeset.read_file(path)
+            warm = time.perf_counter() - warm
+        finally:
+            del changeset.open
+
+    print(f"{args.files} files, {args.latency_ms} ms latency, serial reads:   {serial * 1000:8.1f} ms")
+    print(f"{args.files} files, {args.latency_ms} ms latency, prefetch x{args.workers:<3}: {prefetched * 1000:8.1f} ms")
+    print(f"{args.files} files, content cache hits:              {warm * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
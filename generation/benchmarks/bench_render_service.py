@@ -0,0 +1,111 @@
+"""
+This script benchmarks the generation of many mapper classes: one generate_mapper_class call per class against
+the render service, and a cold template compilation against a warm bytecode cache.
+
+Usage (from the repository root):
+    python generation/benchmarks/bench_render_service.py [--classes 1000] [--workers 8]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader  # noqa: E402
+import generate_setup as setup  # noqa: E402
+import render_service  # noqa: E402
+
+
+def make_jobs(count):
+    """
+    Builds the render jobs for a number of mapper classes, spread over the four directions.
+
+    Args:
+        count (int): The number of mapper classes.
+
+    Returns:
+        list: (message_function_description, message_function, direction, directional_conversion) tuples.
+    """
+    directions = list(setup.directions_map.values())
+    return [(f"Generated Message {i}", f"GM{i:04d}", *directions[i % len(directions)]) for i in range(count)]
+
+
+def make_output_dirs(root):
+    """
+    Creates one output directory per direction.
+
+    Args:
+        root (Path): The root directory.
+
+    Returns:
+        dict: (direction, conversion) -> output directory.
+    """
+    output_dirs = {}
+    for direction, conversion in setup.directions_map.values():
+        path = root / direction / conversion
+        path.mkdir(parents=True)
+        output_dirs[(direction, conversion)] = path
+    return output_dirs
+
+
+def time_template_loading(cache_dir):
+    """
+    Times loading the four templates into a fresh environment.
+
+    Args:
+        cache_dir (str): The bytecode cache directory, or None to compile without a cache.
+
+    Returns:
+        float: The elapsed time in seconds.
+    """
+    start = time.perf_counter()
+    bytecode_cache = FileSystemBytecodeCache(cache_dir) if cache_dir else None
+    environment = Environment(loader=FileSystemLoader(setup.TEMPLATE_DIR), bytecode_cache=bytecode_cache)
+    for name in environment.list_templates():
+        environment.get_template(name)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mapper class generation.")
+    parser.add_argument("--classes", type=int, default=1000, help="mapper classes to generate")
+    parser.add_argument("--workers", type=int, default=None, help="render threads")
+    args = parser.parse_args()
+    jobs = make_jobs(args.classes)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+
+        cache_dir = root / "bytecode"
+        cache_dir.mkdir()
+        print(f"templates, no cache:   {time_template_loading(None) * 1000:8.1f} ms")
+        print(f"templates, cold cache: {time_template_loading(str(cache_dir)) * 1000:8.1f} ms")
+        print(f"templates, warm cache: {time_template_loading(str(cache_dir)) * 1000:8.1f} ms")
+
+        sequential_dirs = make_output_dirs(root / "sequential")
+        original_dir_paths = setup.dir_paths
+        setup.dir_paths = sequential_dirs
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for job in jobs:
+                    setup.generate_mapper_class(*job)
+            sequential = time.perf_counter() - start
+        finally:
+            setup.dir_paths = original_dir_paths
+
+        service_dirs = make_output_dirs(root / "service")
+        start = time.perf_counter()
+        generated, _ = render_service.generate_mapper_classes(jobs, args.workers, service_dirs, verbose=False)
+        service = time.perf_counter() - start
+
+        print(f"{args.classes} classes, generate_mapper_class: {sequential * 1000:8.1f} ms")
+        print(f"{args.classes} classes, render service:        {service * 1000:8.1f} ms ({len(generated)} written)")
+
+
+if __name__ == "__main__":
+    main()
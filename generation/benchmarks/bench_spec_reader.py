@@ -0,0 +1,115 @@
+"""
+This script benchmarks the streaming spec reader against the previous pandas-based extraction on a large generated workbook.
+
+Usage:
+    python generation/benchmarks/bench_spec_reader.py [--rows 200000] [--sheets 4] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from openpyxl import Workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import spec_reader  # noqa: E402
+
+
+def generate_workbook(file_path, rows, sheets):
+    """
+    Generates a mapping specification workbook padded with filler rows.
+
+    Args:
+        file_path (str): The path of the workbook to create.
+        rows (int): The number of filler rows per sheet.
+        sheets (int): The number of sheets in the workbook.
+
+    Returns:
+        None
+    """
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for sheet_number in range(sheets):
+        sheet = workbook.create_sheet(f"{1200 + sheet_number * 10} Generated")
+        sheet.append([None] * 7 + ["ISO20022", None, None])
+        sheet.append(["TRG for PSP "] + [None] * 6 + ["Generated Request", None, None])
+        sheet.append(["Field", None, None, None, "Format", "Value", "Note", "Field", None, None])
+        sheet.append(["Message Type Identifier", None, None, None, "n-4", 1200 + sheet_number * 10, None,
+                      "UniMessage.Hdr.MsgFctn, value FNCQ", "UniMessage.Hdr.MsgFctn, value FNCQ", None])
+        for row_number in range(rows):
+            field = row_number % 128 + 1
+            sheet.append([field, f"Field {field}", None, None, "an-12", None, None,
+                          f"UniMessage.Generated.Element{field}", f"UniMessage.Generated.Element{field}", "echo"])
+    workbook.save(file_path)
+
+
+def extract_with_pandas(file_path):
+    """
+    The previous extraction, reading the whole first sheet into a DataFrame.
+
+    Args:
+        file_path (str): The path to the Excel file.
+
+    Returns:
+        tuple: The message function and the message type indicator.
+    """
+    import pandas as pd
+
+    df = pd.read_excel(file_path, header=None)
+    iso_column_index = df.iloc[0].tolist().index('ISO20022')
+    message_function_raw = df.iloc[3, iso_column_index]
+    message_function = message_function_raw.split(", value ")[-1] if ", value " in message_function_raw else message_function_raw
+    mask = df.map(lambda x: "Message Type Identifier" in str(x)) if hasattr(df, "map") else df.applymap(lambda x: "Message Type Identifier" in str(x))
+    message_type_identifier_row, message_type_identifier_col = df[mask.any(axis=1)].stack().index.tolist()[0]
+    message_type_indicator = df.iloc[message_type_identifier_row, message_type_identifier_col + 5]
+    return message_function, message_type_indicator
+
+
+def measure(function, file_path, repeat):
+    """
+    Measures the best wall time and the peak traced memory of an extraction function.
+
+    Args:
+        function (callable): The extraction function.
+        file_path (str): The path to the Excel file.
+        repeat (int): The number of timed runs.
+
+    Returns:
+        tuple: The result, the best time in seconds and the peak memory in bytes.
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(file_path)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    function(file_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Excel spec readers.")
+    parser.add_argument("--rows", type=int, default=200_000, help="filler rows per sheet")
+    parser.add_argument("--sheets", type=int, default=4, help="sheets in the generated workbook")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per reader")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "generated_spec.xlsx")
+        generate_workbook(file_path, args.rows, args.sheets)
+        print(f"Workbook: {args.sheets} sheets x {args.rows} rows, {os.path.getsize(file_path) / 1024:.0f} KB")
+
+        for name, function in (("pandas", extract_with_pandas), ("streaming", spec_reader.read_message_header)):
+            result, seconds, peak = measure(function, file_path, args.repeat)
+            print(f"{name:>10}: {seconds * 1000:10.1f} ms  peak {peak / 1024 / 1024:8.1f} MB  -> {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+This script benchmarks the main operations of the generator on synthetic mapping-components trees of several sizes.
+
+For every scale a project tree is generated in a temporary directory: field mappers for every data element in both
+field_mappers trees, message mappers spread over the four message_mappers directories (the UMM to ISO ones wired
+with fields), a MessageTypeIndicatorHelper with many mappings and a matching spec workbook. The path constants of
+the generator are pointed at that tree, and every operation is timed over several runs.
+
+The results are written as JSON (by default to generation/.cache/benchmarks/<revision>.json), and compared with
+the results of a previous version with --compare; the exit code is 1 when an operation regressed.
+
+Usage (from the repository root):
+    python generation/benchmarks/bench_suite.py [--scales small,medium,large] [--repeat 5]
+                                                [--output results.json] [--compare baseline.json]
+    python generation/benchmarks/bench_suite.py --data-elements 128 --field-mappers-per-de 3 --message-mappers 200
+                                                --mti-mappings 500 --spec-rows 2000
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import add_mapper_UMM2ISO as mapper  # noqa: E402
+import delegator_wiring  # noqa: E402
+import field_mapper_catalog as catalog  # noqa: E402
+import generate_setup as setup  # noqa: E402
+from bench_spec_reader import generate_workbook  # noqa: E402
+
+RESULTS_DIR = Path("generation/.cache/benchmarks")
+RESULTS_VERSION = 1
+# A slowdown above this ratio of the baseline median is reported as a regression
+MAX_REGRESSION = 1.25
+
+SCALES = {
+    "small": {"data_elements": 64, "field_mappers_per_de": 1, "message_mappers": 8, "mti_mappings": 16, "spec_rows": 64},
+    "medium": {"data_elements": 128, "field_mappers_per_de": 3, "message_mappers": 100, "mti_mappings": 200, "spec_rows": 1000},
+    "large": {"data_elements": 128, "field_mappers_per_de": 10, "message_mappers": 1000, "mti_mappings": 2000, "spec_rows": 20000},
+}
+# Data elements wired into every generated UMM to ISO message mapper
+WIRED_FIELDS = 16
+
+JAVA_ROOT = "src/main/java"
+COMMON_PACKAGE = "eu.nets.mapping.components.auth.trg"
+FIELD_MAPPER_PACKAGES = {
+    "umm_to_iso": f"{COMMON_PACKAGE}.umm_to_iso8583.field_mappers",
+    "iso_to_umm": f"{COMMON_PACKAGE}.iso8583_to_umm.field_mappers",
+}
+MESSAGE_MAPPER_PACKAGES = {
+    ("inbound", "iso_to_umm"): f"{COMMON_PACKAGE}.dk.merchant.iso8583_to_umm.message_mappers",
+    ("inbound", "umm_to_iso"): f"{COMMON_PACKAGE}.dk.merchant.umm_to_iso8583.message_mappers",
+    ("outbound", "iso_to_umm"): f"{COMMON_PACKAGE}.dk.merchant.nds.iso8583_to_umm.message_mappers",
+    ("outbound", "umm_to_iso"): f"{COMMON_PACKAGE}.dk.merchant.nds.umm_to_iso8583.message_mappers",
+}
+MTI_HELPER_PACKAGE = f"{COMMON_PACKAGE}.common.message_function"
+
+
+def package_dir(root, module, package):
+    """
+    Returns the source directory of a Java package in a module of the synthetic tree.
+
+    Args:
+        root (Path): The root of the synthetic tree.
+        module (str): The Maven module.
+        package (str): The Java package.
+
+    Returns:
+        Path: The directory.
+    """
+    return root / module / JAVA_ROOT / package.replace(".", "/")
+
+
+def build_project(root, parameters):
+    """
+    Generates a synthetic mapping-components tree and a matching spec workbook.
+
+    Args:
+        root (Path): The directory to generate the tree in.
+        parameters (dict): The scale, see SCALES.
+
+    Returns:
+        dict: The paths of the tree with the keys "field_mapper_roots", "dir_paths", "mti_helper" and "workbook".
+    """
+    field_mapper_roots = {}
+    for conversion, package in FIELD_MAPPER_PACKAGES.items():
+        directory = package_dir(root, "mapping-components-auth-trg", package)
+        directory.mkdir(parents=True)
+        field_mapper_roots[conversion] = str(directory)
+        for data_element in range(1, parameters["data_elements"] + 1):
+            for variant in range(1, parameters["field_mappers_per_de"] + 1):
+                class_name = f"DE{data_element}_Field{variant}Mapper"
+                (directory / f"{class_name}.java").write_text(
+                    f"package {package};\n\n"
+                    f"public class {class_name} {{\n"
+                    f"    public static {class_name} DE{data_element}_Field{variant}() {{\n"
+                    f"        return new {class_name}();\n"
+                    f"    }}\n"
+                    f"}}\n", encoding="utf-8")
+
+    dir_paths = {}
+    for key, package in MESSAGE_MAPPER_PACKAGES.items():
+        module = "mapping-components-auth-trg-dk-merchant" + ("-nds" if key[0] == "outbound" else "")
+        directory = package_dir(root, module, package)
+        directory.mkdir(parents=True)
+        dir_paths[key] = str(directory)
+
+    wired = [(f"DE{num}_Field1Mapper", f"DE{num}_Field1", FIELD_MAPPER_PACKAGES["umm_to_iso"])
+             for num in range(2, min(WIRED_FIELDS, parameters["data_elements"]) + 1)]
+    keys = list(dir_paths)
+    for number in range(parameters["message_mappers"]):
+        direction, conversion = keys[number % len(keys)]
+        file_path, rendered = setup.render_mapper_class(f"Synthetic Message {number}", f"S{number:04d}",
+                                                        direction, conversion, output_dirs=dir_paths)
+        if conversion == "umm_to_iso":
+            rendered, _ = delegator_wiring.wire_field_mappers(rendered, conversion, wired)
+        file_path.write_text(rendered, encoding="utf-8")
+
+    mti_dir = package_dir(root, "mapping-components-auth-trg", MTI_HELPER_PACKAGE)
+    mti_dir.mkdir(parents=True)
+    mti_helper = mti_dir / "MessageTypeIndicatorHelper.java"
+    mappings = "".join(f'        map("{1000 + number}", MessageFunction.S{number:04d});\n'
+                       for number in range(parameters["mti_mappings"]))
+    mti_helper.write_text(
+        f"package {MTI_HELPER_PACKAGE};\n\n"
+        "import java.util.HashMap;\nimport java.util.Map;\n\n"
+        "public final class MessageTypeIndicatorHelper {\n"
+        "    private static final Map<String, MessageFunction> MAPPINGS = new HashMap<>();\n\n"
+        f"    static {{\n{mappings}    }}\n\n"
+        "    private static void map(String mti, MessageFunction function) {\n"
+        "        MAPPINGS.put(mti, function);\n"
+        "    }\n"
+        "}\n", encoding="utf-8")
+
+    workbook = root / "spec.xlsx"
+    generate_workbook(str(workbook), parameters["spec_rows"], 1)
+    return {"field_mapper_roots": field_mapper_roots, "dir_paths": dir_paths, "mti_helper": str(mti_helper),
+            "workbook": str(workbook)}
+
+
+def use_project(project, cache_dir):
+    """
+    Points the path constants of the generator at a synthetic tree.
+
+    Args:
+        project (dict): The paths returned by build_project.
+        cache_dir (Path): The directory for the persisted field mapper catalog.
+
+    Returns:
+        None
+    """
+    for dir_paths in (setup.dir_paths, mapper.dir_paths):
+        dir_paths.clear()
+        dir_paths.update(project["dir_paths"])
+    mapper.FIELD_MAPPER_ROOTS.clear()
+    mapper.FIELD_MAPPER_ROOTS.update(project["field_mapper_roots"])
+    setup.MTI_HELPER_PATH = project["mti_helper"]
+    catalog.CATALOG_PATH = cache_dir / "field_mapper_catalog.json"
+    mapper.get_field_mapper_catalog.cache_clear()
+
+
+def time_operation(operation, repeat, prepare=None, cleanup=None):
+    """
+    Times an operation over several runs, excluding its preparation and clean-up, with its output silenced.
+
+    Args:
+        operation (callable): The operation, called with the run number.
+        repeat (int): The number of timed runs.
+        prepare (callable): Called with the run number before each run.
+        cleanup (callable): Called with the run number after each run.
+
+    Returns:
+        dict: The statistics in milliseconds with the keys "min_ms", "median_ms", "mean_ms" and "runs".
+    """
+    durations = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for run in range(repeat):
+            if prepare:
+                prepare(run)
+            start = time.perf_counter()
+            operation(run)
+            durations.append((time.perf_counter() - start) * 1000)
+            if cleanup:
+                cleanup(run)
+    return {
+        "min_ms": round(min(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "runs": repeat,
+    }
+
+
+def run_scale(parameters, repeat):
+    """
+    Builds the synthetic tree of a scale and times every operation on it.
+
+    Args:
+        parameters (dict): The scale, see SCALES.
+        repeat (int): The number of timed runs per operation.
+
+    Returns:
+        dict: The result with the keys "parameters", "build_seconds" and "timings" (operation -> statistics).
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        start = time.perf_counter()
+        project = build_project(root, parameters)
+        build_seconds = time.perf_counter() - start
+        use_project(project, root / "cache")
+
+        field = min(WIRED_FIELDS + 1, parameters["data_elements"])
+        message_mapper = Path(project["dir_paths"][("inbound", "umm_to_iso")]) / "SyntheticMessage1Mapper.java"
+        content = message_mapper.read_text(encoding="utf-8")
+        mti_helper = Path(project["mti_helper"])
+        mti_content = mti_helper.read_text(encoding="utf-8")
+        generated_dir = Path(project["dir_paths"][("outbound", "umm_to_iso")])
+
+        def clear_catalog(run):
+            mapper.get_field_mapper_catalog.cache_clear()
+            catalog.CATALOG_PATH.unlink(missing_ok=True)
+
+        timings = {
+            "extract_variables_from_excel": time_operation(
+                lambda run: setup.extract_variables_from_excel(project["workbook"]), repeat),
+            "does_field_mapper_exist (cold catalog)": time_operation(
+                lambda run: mapper.does_field_mapper_exist(field, "umm_to_iso"), repeat, prepare=clear_catalog),
+            "does_field_mapper_exist (persisted catalog)": time_operation(
+                lambda run: mapper.does_field_mapper_exist(field, "umm_to_iso"), repeat,
+                prepare=lambda run: mapper.get_field_mapper_catalog.cache_clear()),
+            "add_field_to_delegator": time_operation(
+                lambda run: mapper.add_field_to_delegator(content, f"DE{field}_Field1Mapper.java"), repeat),
+            "update_message_type_indicator": time_operation(
+                lambda run: setup.update_message_type_indicator(f"B{run:04d}", str(9000 + run)), repeat,
+                cleanup=lambda run: mti_helper.write_text(mti_content, encoding="utf-8")),
+            "generate_mapper_class": time_operation(
+                lambda run: setup.generate_mapper_class(f"Benchmark Message {run}", f"B{run:04d}", "outbound", "umm_to_iso"),
+                repeat, cleanup=lambda run: (generated_dir / f"BenchmarkMessage{run}Mapper.java").unlink()),
+        }
+    return {"parameters": parameters, "build_seconds": round(build_seconds, 3), "timings": timings}
+
+
+def git_revision():
+    """
+    Returns the short git revision of the working tree, or "unknown" outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(results, baseline, max_regression=MAX_REGRESSION):
+    """
+    Compares the medians of two benchmark results and prints the ratio of every operation.
+
+    Args:
+        results (dict): The current results.
+        baseline (dict): The results of the previous version.
+        max_regression (float): The ratio above which an operation counts as a regression.
+
+    Returns:
+        list: (scale, operation, ratio) tuples of the regressions.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline.get('revision', 'unknown')}:")
+    for scale, result in results["scales"].items():
+        baseline_timings = baseline.get("scales", {}).get(scale, {}).get("timings", {})
+        for operation, timing in result["timings"].items():
+            previous = baseline_timings.get(operation)
+            if not previous or not previous["median_ms"]:
+                continue
+            ratio = timing["median_ms"] / previous["median_ms"]
+            flag = "  REGRESSION" if ratio > max_regression else ""
+            print(f"  {scale:>8} {operation:<45} {previous['median_ms']:10.3f} -> {timing['median_ms']:10.3f} ms"
+                  f"  x{ratio:.2f}{flag}")
+            if flag:
+                regressions.append((scale, operation, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generator on synthetic mapping-components trees.")
+    parser.add_argument("--scales", default="small,medium", help=f"comma separated scales among {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per operation")
+    parser.add_argument("--output", default=None, help="results file (default: generation/.cache/benchmarks/<revision>.json)")
+    parser.add_argument("--compare", default=None, help="results file of a previous version to compare with")
+    parser.add_argument("--max-regression", type=float, default=MAX_REGRESSION,
+                        help="slowdown ratio reported as a regression (default: %(default)s)")
+    custom = parser.add_argument_group("custom scale, replacing --scales")
+    for name in SCALES["small"]:
+        custom.add_argument(f"--{name.replace('_', '-')}", type=int, default=None)
+    args = parser.parse_args()
+
+    custom_parameters = {name: getattr(args, name) for name in SCALES["small"]}
+    if any(value is not None for value in custom_parameters.values()):
+        scales = {"custom": {name: value if value is not None else SCALES["small"][name]
+                             for name, value in custom_parameters.items()}}
+    else:
+        unknown = [name for name in args.scales.split(",") if name not in SCALES]
+        if unknown:
+            parser.error(f"unknown scales: {', '.join(unknown)}")
+        scales = {name: SCALES[name] for name in args.scales.split(",")}
+
+    results = {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    for name, parameters in scales.items():
+        result = run_scale(parameters, args.repeat)
+        results["scales"][name] = result
+        print(f"{name}: {parameters} (tree built in {result['build_seconds']:.1f} s)")
+        for operation, timing in result["timings"].items():
+            print(f"  {operation:<45} median {timing['median_ms']:10.3f} ms  min {timing['min_ms']:10.3f} ms")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{results['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare_results(results, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+This script reports the start-up cost of the read-only CLI commands, based on python -X importtime.
+
+It fails when a command imports one of the heavy modules or when its start-up overhead, measured against a bare
+interpreter, exceeds the budget, so it can be run as a check before merging.
+
+Usage (from the repository root):
+    python generation/benchmarks/startup_report.py [--budget-ms 100] [--top 10] [--repeat 5]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+CLI = str(Path(__file__).resolve().parent.parent / "cli.py")
+BUDGET_MS = 100.0
+HEAVY_MODULES = ("openpyxl", "pandas", "jinja2", "numpy")
+COMMANDS = {
+    "check-field": [CLI, "check-field", "--description", "Financial Request", "--direction", "inbound", "2"],
+    "help": [CLI, "--help"],
+}
+
+
+def run(arguments, importtime=False):
+    """
+    Runs a Python command and measures its wall time.
+
+    Args:
+        arguments (list): The arguments passed to the interpreter.
+        importtime (bool): Whether to run with -X importtime.
+
+    Returns:
+        tuple: The wall time in seconds and the captured stderr.
+    """
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + arguments
+    start = time.perf_counter()
+    completed = subprocess.run(command, capture_output=True, text=True)
+    return time.perf_counter() - start, completed.stderr
+
+
+def parse_importtime(stderr):
+    """
+    Parses the output of -X importtime.
+
+    Args:
+        stderr (str): The captured stderr.
+
+    Returns:
+        list: (module, self microseconds, cumulative microseconds, top_level) tuples.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level below the single space of top-level imports
+        top_level = not name.startswith("  ")
+        imports.append((name.strip(), int(self_us), int(cumulative_us), top_level))
+    return imports
+
+
+def best_wall_time(arguments, repeat):
+    """
+    Returns the best wall time of a command over several runs.
+
+    Args:
+        arguments (list): The arguments passed to the interpreter.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The best wall time in seconds.
+    """
+    return min(run(arguments)[0] for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the start-up cost of the CLI commands.")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="maximum start-up overhead per command")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per command for the wall time")
+    args = parser.parse_args()
+
+    baseline = best_wall_time(["-c", "pass"], args.repeat)
+    print(f"bare interpreter: {baseline * 1000:.1f} ms")
+    failed = False
+    for name, arguments in COMMANDS.items():
+        _, stderr = run(arguments, importtime=True)
+        imports = parse_importtime(stderr)
+        top_level = [entry for entry in imports if entry[3]]
+        heavy = sorted({entry[0].split(".")[0] for entry in imports} & set(HEAVY_MODULES))
+        overhead = best_wall_time(arguments, args.repeat) - baseline
+
+        print(f"\n{name}: overhead {overhead * 1000:.1f} ms, imports {sum(entry[1] for entry in imports) / 1000:.1f} ms")
+        for module, _, cumulative, _ in sorted(top_level, key=lambda entry: -entry[2])[:args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {module}")
+        if heavy:
+            print(f"  FAIL: imports heavy modules: {', '.join(heavy)}")
+            failed = True
+        if overhead * 1000 > args.budget_ms:
+            print(f"  FAIL: start-up overhead above the {args.budget_ms:.0f} ms budget")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
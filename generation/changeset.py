@@ -0,0 +1,554 @@
+"""
+This script is the single writer of the generator: every file creation and modification goes through write_file.
+
+Inside a transaction() the writes are only collected in memory, and read_file and exists see the pending content,
+so a run can generate a mapper class and wire fields into it before anything is on disk. When the block ends,
+every pending file is written to a temporary file next to its target and fsynced, and only once all of them are
+written are they renamed into place; if anything fails, the temporary files are removed and the files already
+renamed are restored to their original content. A dry-run transaction prints the unified diff instead.
+
+Outside a transaction, write_file commits the single file immediately, with the same temp-file + fsync + rename.
+
+exists() looks files up in directory listings that are read once per process and kept up to date by the commits;
+long-running processes call forget_listings() when the tree may have changed behind their back.
+
+The content read from disk is kept in a bounded cache, least recently used first out, and dropped when the file
+is written. On a network share every open and listdir is a round-trip, so a run that is about to touch many files
+calls prefetch() and prefetch_listings() first: they read the files and list the directories in a thread pool,
+overlapping the latencies, and the reads that follow are served from the cache.
+"""
+
+import difflib
+import io
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import instrumentation
+# concurrent.futures is imported where it is used, it pulls in logging and slows down the start of read-only checks
+
+WRITE_BUFFER_SIZE = 256 * 1024
+NEW_FILE_MODE = 0o644
+CONTENT_CACHE_BYTES = 32 * 1024 * 1024
+PREFETCH_WORKERS = 16
+
+# The changeset of the transaction in progress, None outside a transaction
+active_changeset = None
+# directory -> set of the names in it, read once per process, see list_directory
+listings = {}
+# absolute path -> content read from disk, least recently used first, see read_disk
+contents = OrderedDict()
+contents_size = 0
+contents_lock = threading.Lock()
+
+
+def new_changeset(dry_run=False):
+    """
+    Creates an empty changeset.
+
+    Args:
+        dry_run (bool): Whether the changeset is only printed as a diff, never committed.
+
+    Returns:
+        dict: The changeset, with "files" mapping each absolute path to a dict with the keys "original"
+            (the content on disk, or None for a new file) and "content" (the pending content), and "dry_run".
+    """
+    return {"files": {}, "dry_run": dry_run}
+
+
+@contextmanager
+def transaction(dry_run=False, output=None):
+    """
+    Collects the writes of a block in a changeset and commits them together when the block ends.
+
+    A transaction opened inside another one joins it, so the outer block decides when everything is committed.
+    Nothing is written if the block raises.
+
+    Args:
+        dry_run (bool): Whether to print the unified diff of the changeset instead of committing it.
+        output (file): The text stream the diff is written to. Defaults to standard output.
+
+    Yields:
+        dict: The changeset, see new_changeset.
+    """
+    global active_changeset
+    if active_changeset is not None:
+        yield active_changeset
+        return
+
+    changes = new_changeset(dry_run)
+    active_changeset = changes
+    try:
+        yield changes
+    finally:
+        active_changeset = None
+    if dry_run:
+        (output or sys.stdout).write(unified_diff(changes))
+    else:
+        commit(changes)
+
+
+def is_dry_run():
+    """
+    Checks whether the transaction in progress is a dry run, so that the console reports what would be written.
+    """
+    return active_changeset is not None and active_changeset["dry_run"]
+
+
+def normalize(file_path):
+    """
+    Returns the absolute path keying a file in a changeset.
+    """
+    return os.path.abspath(os.fspath(file_path))
+
+
+def read_disk(file_path):
+    """
+    Reads a file as UTF-8, keeping its line endings, from the content cache if it was read before.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The content, or None if the file does not exist.
+    """
+    path = normalize(file_path)
+    with contents_lock:
+        content = contents.get(path)
+        if content is not None:
+            contents.move_to_end(path)
+            return content
+    with instrumentation.span("file.read", path=path) as attributes:
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as file:
+                content = file.read()
+        except FileNotFoundError:
+            return None
+        attributes["bytes"] = len(content)
+    cache_content(path, content)
+    return content
+
+
+def cache_content(path, content):
+    """
+    Adds the content of a file to the content cache, evicting the least recently used files beyond
+    CONTENT_CACHE_BYTES. Files larger than the whole cache are not kept.
+
+    Args:
+        path (str): The absolute path of the file.
+        content (str): The content read from disk.
+
+    Returns:
+        None
+    """
+    global contents_size
+    if len(content) > CONTENT_CACHE_BYTES:
+        return
+    with contents_lock:
+        previous = contents.pop(path, None)
+        if previous is not None:
+            contents_size -= len(previous)
+        contents[path] = content
+        contents_size += len(content)
+        while contents_size > CONTENT_CACHE_BYTES:
+            _, evicted = contents.popitem(last=False)
+            contents_size -= len(evicted)
+
+
+def forget_contents(paths=None):
+    """
+    Drops files from the content cache, so the next reads go to disk.
+
+    Args:
+        paths (iterable): The paths of the files. Defaults to every file.
+
+    Returns:
+        None
+    """
+    global contents_size
+    with contents_lock:
+        if paths is None:
+            contents.clear()
+            contents_size = 0
+            return
+        for path in paths:
+            content = contents.pop(normalize(path), None)
+            if content is not None:
+                contents_size -= len(content)
+
+
+def prefetch(file_paths, workers=PREFETCH_WORKERS):
+    """
+    Reads files into the content cache concurrently, so that the reads that follow do not wait on the disk.
+
+    Files already cached or staged in the transaction in progress are skipped; files that do not exist are ignored.
+
+    Args:
+        file_paths (iterable): The paths of the files.
+        workers (int): The number of reader threads.
+
+    Returns:
+        int: The number of files read.
+    """
+    with contents_lock:
+        paths = [path for path in dict.fromkeys(map(normalize, file_paths)) if path not in contents]
+    paths = [path for path in paths if not is_staged(path)]
+    if not paths:
+        return 0
+    with instrumentation.span("file.prefetch", files=len(paths)) as attributes:
+        if len(paths) == 1:
+            read = [read_disk(paths[0])]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+                read = list(executor.map(read_disk, paths))
+        attributes["bytes"] = sum(len(content) for content in read if content is not None)
+    return len(paths)
+
+
+def prefetch_listings(directories, workers=PREFETCH_WORKERS):
+    """
+    Lists directories concurrently, so that the exists() checks that follow do not wait on the disk.
+
+    Args:
+        directories (iterable): The directories.
+        workers (int): The number of threads.
+
+    Returns:
+        None
+    """
+    directories = [directory for directory in dict.fromkeys(map(normalize, directories)) if directory not in listings]
+    if len(directories) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(workers, len(directories))) as executor:
+            list(executor.map(list_directory, directories))
+    elif directories:
+        list_directory(directories[0])
+
+
+def read_file(file_path):
+    """
+    Reads a file, seeing the content written earlier in the transaction in progress.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The content, with its original line endings.
+
+    Raises:
+        FileNotFoundError: If the file neither exists nor is pending creation.
+    """
+    if active_changeset is not None:
+        entry = active_changeset["files"].get(normalize(file_path))
+        if entry is not None:
+            return entry["content"]
+    content = read_disk(file_path)
+    if content is None:
+        raise FileNotFoundError(f"No such file: {file_path}")
+    return content
+
+
+def read_lines(file_path):
+    """
+    Reads a file into lines, keeping the original line endings; see read_file.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        list: The lines of the file.
+    """
+    return io.StringIO(read_file(file_path), newline='').readlines()
+
+
+def is_staged(file_path):
+    """
+    Checks whether a file has pending content in the transaction in progress.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        bool: True if the file is staged.
+    """
+    return active_changeset is not None and normalize(file_path) in active_changeset["files"]
+
+
+def exists(file_path):
+    """
+    Checks whether a file exists on disk or is pending creation in the transaction in progress.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        bool: True if the file exists.
+    """
+    path = normalize(file_path)
+    return is_staged(path) or os.path.basename(path) in list_directory(os.path.dirname(path))
+
+
+def list_directory(directory):
+    """
+    Lists the names in a directory, reading it only the first time.
+
+    Args:
+        directory (str): The directory.
+
+    Returns:
+        set: The names in the directory, empty if it does not exist.
+    """
+    directory = normalize(directory)
+    names = listings.get(directory)
+    if names is None:
+        with instrumentation.span("directory.list", path=directory) as attributes:
+            try:
+                names = set(os.listdir(directory))
+            except (FileNotFoundError, NotADirectoryError):
+                names = set()
+            attributes["entries"] = len(names)
+        listings[directory] = names
+    return names
+
+
+def forget_listings():
+    """
+    Drops the directory listings read so far, so the next lookups read the directories again.
+    """
+    listings.clear()
+
+
+def update_listing(file_path, present):
+    """
+    Records in the cached listing of its directory that a file was created or removed.
+
+    Args:
+        file_path (str): The absolute path of the file.
+        present (bool): Whether the file now exists.
+
+    Returns:
+        None
+    """
+    names = listings.get(os.path.dirname(file_path))
+    if names is None:
+        return
+    if present:
+        names.add(os.path.basename(file_path))
+    else:
+        names.discard(os.path.basename(file_path))
+
+
+def write_file(file_path, content):
+    """
+    Writes a file: staged in the transaction in progress, or committed at once outside a transaction.
+
+    Args:
+        file_path (str): The path to the file.
+        content (str): The new content of the file.
+
+    Returns:
+        None
+    """
+    if active_changeset is not None:
+        stage(active_changeset, file_path, content)
+        return
+    changes = new_changeset()
+    stage(changes, file_path, content)
+    commit(changes)
+
+
+def stage(changes, file_path, content):
+    """
+    Records the new content of a file in a changeset, remembering the content on disk the first time.
+
+    Args:
+        changes (dict): The changeset.
+        file_path (str): The path to the file.
+        content (str): The new content of the file.
+
+    Returns:
+        None
+    """
+    path = normalize(file_path)
+    entry = changes["files"].get(path)
+    if entry is None:
+        changes["files"][path] = {"original": read_disk(path), "content": content}
+    else:
+        entry["content"] = content
+
+
+def pending(changes):
+    """
+    Lists the files of a changeset whose content differs from the disk.
+
+    Args:
+        changes (dict): The changeset.
+
+    Returns:
+        list: (path, entry) tuples in staging order.
+    """
+    return [(path, entry) for path, entry in changes["files"].items() if entry["content"] != entry["original"]]
+
+
+def unified_diff(changes):
+    """
+    Renders the pending changes as a unified diff.
+
+    Args:
+        changes (dict): The changeset.
+
+    Returns:
+        str: The diff, empty if nothing would change.
+    """
+    pieces = []
+    for path, entry in pending(changes):
+        original = entry["original"]
+        for line in difflib.unified_diff(
+                io.StringIO(original or "", newline='').readlines(),
+                io.StringIO(entry["content"], newline='').readlines(),
+                fromfile="/dev/null" if original is None else diff_label("a", path),
+                tofile=diff_label("b", path)):
+            pieces.append(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n")
+    return "".join(pieces)
+
+
+def diff_label(side, path):
+    """
+    Labels a file in the diff: a/ or b/ followed by the path relative to the working directory, or the absolute
+    path for files outside of it.
+
+    Args:
+        side (str): "a" or "b".
+        path (str): The absolute path of the file.
+
+    Returns:
+        str: The label.
+    """
+    relative = os.path.relpath(path)
+    return path if relative.startswith("..") else f"{side}/{relative}"
+
+
+def commit(changes):
+    """
+    Writes all pending files of a changeset, all or nothing.
+
+    Every file is first written to a temporary file in its directory and fsynced; the temporary files are then
+    renamed over their targets. If a write or a rename fails, the temporary files are removed and the targets
+    already replaced are restored.
+
+    Args:
+        changes (dict): The changeset.
+
+    Returns:
+        list: The paths of the written files.
+
+    Raises:
+        OSError: If a file cannot be written; the disk is left as it was.
+    """
+    files = pending(changes)
+    temporary = []
+    replaced = []
+    with instrumentation.span("file.commit", files=len(files)):
+        try:
+            for path, entry in files:
+                temporary.append((path, write_temporary(path, entry["content"], entry["original"] is not None)))
+            for path, tmp_path in temporary:
+                os.replace(tmp_path, path)
+                replaced.append(path)
+                forget_contents([path])
+                update_listing(path, True)
+        except BaseException:
+            for path, tmp_path in temporary[len(replaced):]:
+                remove_quietly(tmp_path)
+            rollback([(path, changes["files"][path]["original"]) for path in replaced])
+            raise
+        sync_directories({os.path.dirname(path) for path in replaced})
+    return replaced
+
+
+def write_temporary(file_path, content, keep_mode):
+    """
+    Writes content to a temporary file next to its target, through one buffered stream, and fsyncs it.
+
+    Args:
+        file_path (str): The path of the target file.
+        content (str): The content to write.
+        keep_mode (bool): Whether to copy the permissions of the existing target.
+
+    Returns:
+        str: The path of the temporary file.
+    """
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    with instrumentation.span("file.write", path=file_path, bytes=len(content)):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER_SIZE) as file:
+                file.write(content)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(tmp_path, os.stat(file_path).st_mode & 0o777 if keep_mode else NEW_FILE_MODE)
+        except BaseException:
+            remove_quietly(tmp_path)
+            raise
+    return tmp_path
+
+
+def rollback(originals):
+    """
+    Restores replaced files to their original content, removing the ones that did not exist.
+
+    Args:
+        originals (list): (path, original content or None) tuples.
+
+    Returns:
+        None
+    """
+    for path, original in originals:
+        try:
+            forget_contents([path])
+            if original is None:
+                os.remove(path)
+                update_listing(path, False)
+            else:
+                os.replace(write_temporary(path, original, True), path)
+        except OSError as error:
+            print(f"Could not restore {path}: {error}", file=sys.stderr)
+
+
+def sync_directories(directories):
+    """
+    Fsyncs directories so that the renames survive a crash; a no-op where directories cannot be opened.
+
+    Args:
+        directories (set): The directories.
+
+    Returns:
+        None
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    for directory in directories:
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def remove_quietly(file_path):
+    """
+    Removes a file, ignoring errors.
+    """
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
@@ -0,0 +1,353 @@
+"""
+Command line entry point of the mapping generator.
+
+Usage (from the repository root):
+    python generation/cli.py [--config project.json] [--module NAME] [--profile report.json [--profile-format chrome]] <command> ...
+    python generation/cli.py generate [--dry-run] [--spec workbook.xlsx] [--sheet SHEET] [--description "Financial Request"] [--directions 1,3]
+    python generation/cli.py add-field [--dry-run] --description "Financial Request" --direction inbound [--conversion umm_to_iso] 2 4 49
+    python generation/cli.py check-field --description "Financial Request" --direction inbound [--conversion umm_to_iso] 2
+    python generation/cli.py update-mti [--dry-run] FNCQ=1200 FNCN=1220
+    python generation/cli.py validate [workbook.xlsx | directory | manifest.json ...] [--directions 1,3] [--modules all]
+    python generation/cli.py watch [workbook.xlsx | directory | manifest.json ...] [--generate] [--poll]
+    python generation/cli.py spec-diff [--apply [--dry-run]] [--directions 1,3] [--modules all] old.xlsx new.xlsx
+
+The commands work on the module of the project config selected with --module (see project_config.py), except
+validate, which checks all modules unless --modules restricts them, and spec-diff, which applies the changes to the
+modules named by --modules. Only the standard library is imported at start-up; every subcommand imports the modules it needs when it runs,
+so that read-only checks do not pay for openpyxl, jinja2 or the templates.
+"""
+
+import argparse
+import sys
+
+DIRECTIONS = ("inbound", "outbound")
+CONVERSIONS = ("umm_to_iso", "iso_to_umm")
+PROFILE_FORMATS = ("json", "chrome")  # instrumentation.REPORT_FORMATS
+DIRECTION_KEYS = ("1", "2", "3", "4")  # generate_setup.directions_map
+DIRECTIONS_HELP = "1 inbound iso to umm, 2 inbound umm to iso, 3 outbound umm to iso, 4 outbound iso to umm"
+
+
+def run_generate(args):
+    """
+    Extracts the spec, updates the message type indicator mapping and generates the requested mapper classes.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    import generate_setup as setup
+    import spec_cache
+    import spec_reader
+
+    spec, _ = spec_cache.load_spec(args.spec, args.sheet)
+    description = args.description or spec_reader.describe_message_function(spec["sheet"])
+    result = setup.update_message_type_indicators(
+        [(spec["message_function"], indicator) for indicator in spec_reader.split_message_type_indicators(spec["message_type_indicator"])])
+    setup.handle_generation(description, spec["message_function"], args.directions)
+    return 1 if result["conflicts"] else 0
+
+
+def run_add_field(args):
+    """
+    Adds field mappers to the builder chain of a message mapper.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    import add_mapper_UMM2ISO as mapper
+
+    # Fields without a field mapper, or whose field mapper has no builder method in the conversion, are rejected
+    # before the message mapper is generated or read
+    try:
+        field_mappers = mapper.locate_field_mappers(args.fields, args.conversion)
+    except RuntimeError:
+        # The missing field mapper has already been reported
+        raise SystemExit(1)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    if args.function:
+        path = mapper.locate_message_mapper(args.function, args.description, args.direction, args.conversion)
+    else:
+        path = mapper.message_mapper_path(args.description, args.direction, args.conversion)
+    mapper.wire_message_mapper(path, field_mappers, args.conversion)
+    return 0
+
+
+def run_check_field(args):
+    """
+    Checks whether fields are implemented in a message mapper, without modifying anything.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        int: 0 if all fields are implemented, 1 if some are not, 2 if the message mapper does not exist.
+    """
+    import os
+    import add_mapper_UMM2ISO as mapper
+
+    path = mapper.message_mapper_path(args.description, args.direction, args.conversion)
+    if not os.path.exists(path):
+        print(f"Message mapper not found: {path}")
+        return 2
+    missing = []
+    for field in args.fields:
+        if args.conversion == "umm_to_iso":
+            implemented = mapper.analyze_message_mapper(path, field)
+        else:
+            import add_mapper_ISO2UMM
+
+            field_mappers = mapper.does_field_mapper_exist(field, args.conversion)
+            implemented = any(add_mapper_ISO2UMM.analyze_message_mapper(path, field_mapper) for field_mapper in field_mappers)
+        print(f"Field {field}: {'implemented' if implemented else 'not implemented'}")
+        if not implemented:
+            missing.append(field)
+    return 1 if missing else 0
+
+
+def run_update_mti(args):
+    """
+    Adds message type indicator mappings to the helper.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        int: 0 if every mapping was added or already present, 1 if there were conflicts.
+    """
+    import generate_setup as setup
+
+    mappings = []
+    for pair in args.mappings:
+        message_function, _, message_type_indicator = pair.partition("=")
+        if not message_function or not message_type_indicator.isdigit():
+            raise SystemExit(f"Invalid mapping {pair!r}, expected FUNCTION=MTI")
+        mappings.append((message_function, message_type_indicator))
+    result = setup.update_message_type_indicators(mappings)
+    return 1 if result["conflicts"] else 0
+
+
+def run_validate(args):
+    """
+    Validates the Java mappers against the spec workbooks.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        int: 0 if the mappers match the spec, 1 if there are findings other than skipped sheets.
+    """
+    import project_config
+    import validator
+
+    try:
+        modules = project_config.get_modules(args.modules)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    findings = validator.validate(args.sources, args.directions, args.workers, modules)
+    validator.print_findings(findings)
+    return 1 if validator.has_failures(findings) else 0
+
+
+def run_watch(args):
+    """
+    Revalidates, and optionally regenerates, whenever the spec workbooks or the Java sources change.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code, once interrupted.
+    """
+    import watch
+
+    watch.watch(args.sources, args.directions, args.generate, args.poll)
+    return 0
+
+
+def run_spec_diff(args):
+    """
+    Lists what changed between two spec versions and, with --apply, generates only the additions.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    import project_config
+    import spec_diff
+
+    try:
+        modules = project_config.get_modules(args.modules) if args.modules else None
+    except ValueError as error:
+        raise SystemExit(str(error))
+    new = spec_diff.load_records(args.new, args.workers)
+    changes = spec_diff.diff_records(spec_diff.load_records(args.old, args.workers), new)
+    spec_diff.print_changes(changes)
+    if args.apply:
+        spec_diff.apply_changes(changes, new, args.directions, modules)
+    return 0
+
+
+def parse_directions(value):
+    """
+    Parses the comma separated direction keys of --directions.
+
+    Args:
+        value (str): The option value, e.g. "1,3".
+
+    Returns:
+        list: The direction keys, see generate_setup.directions_map.
+
+    Raises:
+        argparse.ArgumentTypeError: If a key is not a known direction.
+    """
+    directions = [key.strip() for key in value.split(",") if key.strip()]
+    invalid = [key for key in directions if key not in DIRECTION_KEYS]
+    if invalid:
+        raise argparse.ArgumentTypeError(f"invalid directions: {', '.join(invalid)}")
+    return directions
+
+
+def add_directions_argument(parser, action):
+    parser.add_argument("--directions", type=parse_directions, default=",".join(DIRECTION_KEYS),
+                        help=f"directions to {action}: {DIRECTIONS_HELP} (default: all)")
+
+
+def add_dry_run_argument(parser):
+    parser.add_argument("--dry-run", action="store_true", help="print the unified diff instead of writing the files")
+
+
+def add_mapper_arguments(parser):
+    parser.add_argument("--description", required=True, help="message function description, e.g. \"Financial Request\"")
+    parser.add_argument("--direction", required=True, choices=DIRECTIONS)
+    parser.add_argument("--conversion", default="umm_to_iso", choices=CONVERSIONS)
+    parser.add_argument("fields", nargs="+", type=int, help="data element numbers")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="UNI mapping generator.")
+    parser.add_argument("--config", default=None, help="project config file (default: generation/project.json if present)")
+    parser.add_argument("--module", default=None, help="module of the project config (default: the default module)")
+    # Same options as instrumentation.add_profile_arguments, declared here so that start-up does not import it
+    parser.add_argument("--profile", default=None, metavar="REPORT", help="record timing spans and write them to this file")
+    parser.add_argument("--profile-format", choices=PROFILE_FORMATS, default="json",
+                        help="report format: json summary and spans, or a chrome trace (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="generate the mapper classes of a spec workbook")
+    generate.add_argument("--spec", default="Mapping_PSP to ISO20022_MTI12XX_V2.0.xlsx", help="spec workbook")
+    generate.add_argument("--sheet", default=None, help="sheet of the spec workbook (default: the first sheet)")
+    generate.add_argument("--description", default=None, help="message function description (default: from the sheet title)")
+    add_directions_argument(generate, "generate")
+    add_dry_run_argument(generate)
+    generate.set_defaults(handler=run_generate)
+
+    add_field = subparsers.add_parser("add-field", help="add field mappers to a message mapper")
+    add_mapper_arguments(add_field)
+    add_field.add_argument("--function", default=None, help="message function, generates the message mapper if missing")
+    add_dry_run_argument(add_field)
+    add_field.set_defaults(handler=run_add_field)
+
+    check_field = subparsers.add_parser("check-field", help="check whether fields are implemented in a message mapper")
+    add_mapper_arguments(check_field)
+    check_field.set_defaults(handler=run_check_field)
+
+    update_mti = subparsers.add_parser("update-mti", help="add message type indicator mappings")
+    update_mti.add_argument("mappings", nargs="+", help="FUNCTION=MTI pairs, e.g. FNCQ=1200")
+    add_dry_run_argument(update_mti)
+    update_mti.set_defaults(handler=run_update_mti)
+
+    validate = subparsers.add_parser("validate", help="validate the Java mappers against the spec workbooks")
+    validate.add_argument("sources", nargs="*", default=["Mapping_PSP to ISO20022_MTI12XX_V2.0.xlsx"],
+                          help="spec workbooks, directories containing spec workbooks or JSON manifests")
+    add_directions_argument(validate, "validate")
+    validate.add_argument("--modules", default="all", help="comma separated modules to validate (default: %(default)s)")
+    validate.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    validate.set_defaults(handler=run_validate)
+
+    watch = subparsers.add_parser("watch", help="revalidate whenever the spec workbooks or the Java sources change")
+    watch.add_argument("sources", nargs="*", default=["Mapping_PSP to ISO20022_MTI12XX_V2.0.xlsx"],
+                       help="spec workbooks, directories containing spec workbooks or JSON manifests")
+    add_directions_argument(watch, "validate")
+    watch.add_argument("--generate", action="store_true", help="generate the missing classes and mappings of changed sheets")
+    watch.add_argument("--poll", action="store_true", help="poll the modification times instead of using inotify")
+    watch.set_defaults(handler=run_watch)
+
+    spec_diff = subparsers.add_parser("spec-diff", help="compare two spec versions and generate only what changed")
+    spec_diff.add_argument("old", help="old spec: workbook, directory containing spec workbooks or JSON manifest")
+    spec_diff.add_argument("new", help="new spec: workbook, directory containing spec workbooks or JSON manifest")
+    add_directions_argument(spec_diff, "generate")
+    spec_diff.add_argument("--modules", default=None, help="comma separated modules to update, or all (default: --module)")
+    spec_diff.add_argument("--apply", action="store_true", help="generate the added message functions, MTIs and fields")
+    spec_diff.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    add_dry_run_argument(spec_diff)
+    spec_diff.set_defaults(handler=run_spec_diff)
+    return parser
+
+
+def select_module(args):
+    """
+    Selects the project config and the module the command works on.
+
+    The config file is passed through the environment, so that worker processes resolve the same modules.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        None
+    """
+    import os
+    import project_config
+
+    if args.config:
+        os.environ[project_config.CONFIG_ENV] = args.config
+    if args.config or args.module:
+        import generate_setup as setup
+
+        setup.use_module(args.module)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        select_module(args)
+    except ValueError as error:
+        raise SystemExit(f"Invalid project config: {error}")
+    if args.profile:
+        import instrumentation
+
+        with instrumentation.profiling(args.profile, args.profile_format, sys.argv):
+            return run_command(args)
+    return run_command(args)
+
+
+def run_command(args):
+    """
+    Runs the handler of the command, in a changeset transaction for the commands that write files.
+
+    Args:
+        args (Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    if not hasattr(args, "dry_run"):
+        return args.handler(args)
+
+    # Every file written by the command is committed at the end, all or nothing
+    import changeset
+
+    with changeset.transaction(dry_run=args.dry_run):
+        return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
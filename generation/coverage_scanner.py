@@ -0,0 +1,258 @@
+"""
+This script builds a coverage matrix of message mapper x data element over all message_mappers trees.
+
+Every message mapper is tokenized once with java_parser, so commented-out code is not counted: a data element is
+wired when a UMM to ISO builder method (.deNN_...() ) is called, or when the factory method of a statically
+imported DE field mapper is called, as the ISO to UMM builders do; leftover imports do not count. Parsing is spread
+over a process pool and the results are persisted, so that later scans only re-parse the files whose
+modification time or size changed.
+
+Usage (from the repository root):
+    python generation/coverage_scanner.py [--format csv|json] [--output coverage.csv] [--workers N]
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import instrumentation
+import java_parser
+
+COVERAGE_CACHE_PATH = Path("generation/.cache/coverage.json")
+COVERAGE_CACHE_VERSION = 2
+# Below this number of changed files the parsing runs in-process, a process pool would cost more than it saves
+PARALLEL_THRESHOLD = 64
+
+BUILDER_CALL_PATTERN = re.compile(r"^de(\d+)_\w+$")
+FIELD_MAPPER_IMPORT_PATTERN = re.compile(r"\.DE(\d+)_\w+Mapper\.(\w+)$")
+
+
+def parse_message_mapper(path):
+    """
+    Collects the data elements wired into a message mapper.
+
+    Args:
+        path (str): The path of the message mapper.
+
+    Returns:
+        list: The sorted data element numbers.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    model = java_parser.parse_java(content)
+    tokens = model["tokens"]
+    fields = set()
+    called = set()
+    for index in range(len(tokens) - 1):
+        kind, text, _, _ = tokens[index]
+        if kind != "name" or tokens[index + 1][1] != "(":
+            continue
+        called.add(text)
+        match = BUILDER_CALL_PATTERN.match(text)
+        if match and index > 0 and tokens[index - 1][1] == ".":
+            fields.add(int(match.group(1)))
+    for declaration in model["imports"]:
+        match = FIELD_MAPPER_IMPORT_PATTERN.search(declaration["name"])
+        if declaration["static"] and match and match.group(2) in called:
+            fields.add(int(match.group(1)))
+    return sorted(fields)
+
+
+def scan_message_mappers(dir_paths):
+    """
+    Lists the message mappers of all message_mappers directories.
+
+    Args:
+        dir_paths (dict): (direction, conversion) -> message_mappers directory.
+
+    Returns:
+        dict: path -> (direction, conversion, stat result).
+    """
+    files = {}
+    for (direction, conversion), directory in dir_paths.items():
+        with instrumentation.span("directory.scan", path=str(directory)) as attributes:
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".java"):
+                    files[entry.path] = (direction, conversion, entry.stat())
+            attributes["entries"] = len(entries)
+    return files
+
+
+def scan_coverage(dir_paths=None, cache_path=None, workers=None):
+    """
+    Scans the message mappers, re-parsing only the files that changed since the previous scan.
+
+    Args:
+        dir_paths (dict): (direction, conversion) -> message_mappers directory. Defaults to generate_setup.dir_paths.
+        cache_path (Path): The path of the persisted scan results. Defaults to COVERAGE_CACHE_PATH, suffixed with
+            the name of the selected module if it is not the default module of the project config.
+        workers (int): The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        dict: path -> entry with the keys "direction", "conversion", "mapper", "fields", "mtime_ns" and "size".
+    """
+    if dir_paths is None:
+        import generate_setup as setup
+        import project_config
+
+        dir_paths = setup.dir_paths
+        if cache_path is None:
+            cache_path = project_config.module_cache_path(COVERAGE_CACHE_PATH, project_config.get_module(setup.module_name))
+    if cache_path is None:
+        cache_path = COVERAGE_CACHE_PATH
+
+    cached = read_cache(cache_path)
+    entries = {}
+    changed = []
+    for path, (direction, conversion, stat) in scan_message_mappers(dir_paths).items():
+        entry = cached.get(path)
+        if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            entry = {
+                "direction": direction,
+                "conversion": conversion,
+                "mapper": Path(path).stem,
+                "fields": None,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+            }
+            changed.append(path)
+        entries[path] = entry
+
+    with instrumentation.span("coverage.parse", files=len(changed),
+                              bytes=sum(entries[path]["size"] for path in changed)):
+        if len(changed) >= PARALLEL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed = executor.map(parse_message_mapper, changed, chunksize=16)
+                for path, fields in zip(changed, parsed):
+                    entries[path]["fields"] = fields
+        else:
+            for path in changed:
+                entries[path]["fields"] = parse_message_mapper(path)
+
+    if changed or entries.keys() != cached.keys():
+        write_cache(cache_path, entries)
+    return entries
+
+
+def coverage_matrix(entries):
+    """
+    Builds the coverage matrix from the scanned entries.
+
+    Args:
+        entries (dict): path -> entry, see scan_coverage.
+
+    Returns:
+        tuple: A tuple containing:
+            - data_elements (list): The sorted data element numbers wired in at least one message mapper.
+            - rows (list): (direction, conversion, mapper, set of data elements) tuples, sorted.
+    """
+    rows = sorted((entry["direction"], entry["conversion"], entry["mapper"], frozenset(entry["fields"]))
+                  for entry in entries.values())
+    data_elements = sorted(set().union(*(fields for _, _, _, fields in rows)))
+    return data_elements, rows
+
+
+def write_csv(entries, output):
+    """
+    Writes the coverage matrix as CSV, one row per message mapper and one column per data element.
+
+    Args:
+        entries (dict): path -> entry, see scan_coverage.
+        output (file): The text stream to write to.
+
+    Returns:
+        None
+    """
+    data_elements, rows = coverage_matrix(entries)
+    writer = csv.writer(output)
+    writer.writerow(["direction", "conversion", "mapper"] + [f"DE{num}" for num in data_elements])
+    for direction, conversion, mapper, fields in rows:
+        writer.writerow([direction, conversion, mapper] + ["x" if num in fields else "" for num in data_elements])
+
+
+def write_json(entries, output):
+    """
+    Writes the coverage matrix as JSON, one object per message mapper.
+
+    Args:
+        entries (dict): path -> entry, see scan_coverage.
+        output (file): The text stream to write to.
+
+    Returns:
+        None
+    """
+    matrix = [
+        {"direction": entry["direction"], "conversion": entry["conversion"], "mapper": entry["mapper"],
+         "path": path, "fields": entry["fields"]}
+        for path, entry in sorted(entries.items(), key=lambda item: (item[1]["direction"], item[1]["conversion"], item[1]["mapper"]))
+    ]
+    json.dump(matrix, output, indent=2)
+    output.write("\n")
+
+
+def read_cache(cache_path):
+    """
+    Reads the persisted scan results.
+
+    Args:
+        cache_path (Path): The path of the persisted scan results.
+
+    Returns:
+        dict: path -> entry, empty if there are no usable persisted results.
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if cached.get("version") != COVERAGE_CACHE_VERSION:
+        return {}
+    return cached.get("files", {})
+
+
+def write_cache(cache_path, entries):
+    """
+    Persists the scan results atomically.
+
+    Args:
+        cache_path (Path): The path of the persisted scan results.
+        entries (dict): path -> entry.
+
+    Returns:
+        None
+    """
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({"version": COVERAGE_CACHE_VERSION, "files": entries}, file, separators=(",", ":"))
+    os.replace(tmp_path, cache_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the message mapper x data element coverage matrix.")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--output", default=None, help="output file (default: standard output)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    entries = scan_coverage(workers=args.workers)
+    writer = write_csv if args.format == "csv" else write_json
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            writer(entries, output)
+    else:
+        writer(entries, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+This script wires field mappers into the builder chains of the message mappers, for both conversions.
+
+The builder chains differ per conversion only in the builder that receives the field mappers, the name of the
+builder method and whether the calls are kept in data element order. Those differences are described by the
+BUILDER_SIGNATURES table, so a single engine serves the UMM to ISO and the ISO to UMM message mappers.
+The message mappers are read with java_parser, which locates the builder chains and the imports by their tokens.
+
+A field mapper counts as wired when a call of its builder chain passes its factory method, e.g.
+.msgFctnMapper(messageFunctionMapper()), whatever the name of the builder method.
+"""
+
+import re
+import java_parser
+
+# (conversion, field mapper sub-package) -> signature of the builder receiving the field mapper.
+# A sub-package of None is the fallback for the conversion.
+#   builder: the expression opening the builder chain
+#   method: the builder method, formatted with data_element and suffix (class name without the "DEnn_" prefix)
+#   methods: field mapper class -> builder method, for the builders whose method names follow the UMM element
+#            (UniMessage.Hdr.MsgFctn -> msgFctnMapper) rather than the class; field mappers missing from it
+#            cannot be wired until their builder method is added
+#   ordered: whether the calls are kept sorted by data element number
+BUILDER_SIGNATURES = {
+    ("umm_to_iso", None): {
+        "builder": "DataElementMapperDelegator.<UniMessageContext, MappingContext>builder()",
+        "method": "de{data_element}_{suffix}",
+        "ordered": True,
+    },
+    ("iso_to_umm", "hdr"): {
+        "builder": "MessageHeaderMapperDelegator.<ISO8583MessageContext, MappingContext>builder()",
+        "methods": {
+            "MessageFunctionMapper": "msgFctnMapper",  # UniMessage.Hdr.MsgFctn
+            "DE7_TransmissionDateTimeMapper": "creDtTmMapper",  # UniMessage.Hdr.CreDtTm
+        },
+        "ordered": False,
+    },
+    # The UniMessage builder takes the delegators of the UMM components (.hdrMapper(...)), not field mappers
+    ("iso_to_umm", None): {
+        "builder": "UniMessageMapperDelegator.<ISO8583MessageContext, MappingContext>builder()",
+        "methods": {},
+        "ordered": False,
+    },
+}
+
+DATA_ELEMENT_PATTERN = re.compile(r"^DE(\d+)_")
+DATA_ELEMENT_CALL_PATTERN = re.compile(r"^de(\d+)_")
+
+
+def get_signature(conversion, package):
+    """
+    Selects the builder signature for a field mapper.
+
+    Args:
+        conversion (str): The conversion, "umm_to_iso" or "iso_to_umm".
+        package (str): The package of the field mapper.
+
+    Returns:
+        dict: The builder signature.
+
+    Raises:
+        ValueError: If the conversion has no builder signature.
+    """
+    sub_package = package.rsplit(".", 1)[-1] if package else None
+    signature = BUILDER_SIGNATURES.get((conversion, sub_package)) or BUILDER_SIGNATURES.get((conversion, None))
+    if signature is None:
+        raise ValueError(f"No builder signature for conversion {conversion}")
+    return signature
+
+
+def builder_method(signature, class_name):
+    """
+    Returns the name of the builder method receiving a field mapper.
+
+    Args:
+        signature (dict): The builder signature.
+        class_name (str): The class name of the field mapper, e.g. DE2_PrimaryAccountNumberMapper.
+
+    Returns:
+        str: The builder method name, e.g. de2_PrimaryAccountNumberMapper.
+
+    Raises:
+        ValueError: If the builder method of the field mapper is not in the methods of the signature.
+    """
+    if "methods" in signature:
+        method = signature["methods"].get(class_name)
+        if method is None:
+            raise ValueError(f"Field mapper {class_name} cannot be wired: no builder method known for it in "
+                             f"{signature['builder']}, add it to delegator_wiring.BUILDER_SIGNATURES")
+        return method
+    data_element = DATA_ELEMENT_PATTERN.match(class_name)
+    return signature["method"].format(
+        data_element=data_element.group(1) if data_element else "",
+        suffix=class_name.split("_")[-1],
+    )
+
+
+def call_factory(model, call):
+    """
+    Returns the factory method passed to a builder method call, e.g. messageFunctionMapper for
+    .msgFctnMapper(messageFunctionMapper()).
+
+    Args:
+        model (dict): The model returned by java_parser.parse_java.
+        call (dict): The call, see java_parser.find_chain.
+
+    Returns:
+        str: The name of the factory method, or None if the argument is not a single call without arguments.
+    """
+    tokens = java_parser.tokenize(model["source"][call["arguments_start"]:call["arguments_end"]])
+    if len(tokens) == 3 and tokens[0][0] == "name" and tokens[1][1] == "(" and tokens[2][1] == ")":
+        return tokens[0][1].rsplit(".", 1)[-1]
+    return None
+
+
+def data_element_number(class_name):
+    """
+    Extracts the data element number of a field mapper class name.
+
+    Args:
+        class_name (str): The class name, e.g. DE2_PrimaryAccountNumberMapper.
+
+    Returns:
+        int: The data element number, or None if the class is not bound to a data element.
+    """
+    match = DATA_ELEMENT_PATTERN.match(class_name)
+    return int(match.group(1)) if match else None
+
+
+def check_field_mappers(conversion, field_mappers):
+    """
+    Checks that field mappers can be wired, before any message mapper is read or generated.
+
+    Args:
+        conversion (str): The conversion, "umm_to_iso" or "iso_to_umm".
+        field_mappers (list): (class, factory method, package) tuples, see field_mapper_catalog.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If a field mapper has no factory method or no known builder method.
+    """
+    for class_name, factory, package in field_mappers:
+        if factory is None:
+            raise ValueError(f"Instance call not found for class {class_name}")
+        builder_method(get_signature(conversion, package), class_name)
+
+
+def is_wired(content, conversion, field_mapper):
+    """
+    Checks whether a field mapper is already wired into its builder chain.
+
+    Args:
+        content (str): The content of the message mapper.
+        conversion (str): The conversion, "umm_to_iso" or "iso_to_umm".
+        field_mapper (tuple): (class, factory method, package), see field_mapper_catalog.
+
+    Returns:
+        bool: True if a call of its builder chain passes the factory method of the field mapper.
+    """
+    _, factory, package = field_mapper
+    signature = get_signature(conversion, package)
+    model = java_parser.parse_java(content)
+    chain = java_parser.find_chain(model, signature["builder"])
+    return any(call_factory(model, call) == factory for call in chain["calls"])
+
+
+def wire_field_mappers(content, conversion, field_mappers):
+    """
+    Wires field mappers into the builder chains of a message mapper, in a single splice of the content.
+
+    Field mappers whose factory method or builder method is already used in the chain are skipped, and a static
+    import of each factory method is added once before the other imports.
+
+    Args:
+        content (str): The content of the message mapper.
+        conversion (str): The conversion, "umm_to_iso" or "iso_to_umm".
+        field_mappers (list): (class, factory method, package) tuples, see field_mapper_catalog.
+
+    Returns:
+        tuple: A tuple containing:
+            - content (str): The modified content.
+            - wired (list): The class names of the field mappers that were added.
+
+    Raises:
+        ValueError: If a field mapper has no factory method or no known builder method.
+    """
+    model = java_parser.parse_java(content)
+    line_separator = java_parser.newline(content)
+    imported = {(declaration["static"], declaration["name"]) for declaration in model["imports"]}
+    patches = []
+    static_imports = set()
+    wired = []
+    chains = {}
+    for class_name, factory, package in field_mappers:
+        if factory is None:
+            raise ValueError(f"Instance call not found for class {class_name}")
+        signature = get_signature(conversion, package)
+        chain = java_parser.find_chain(model, signature["builder"])
+        if signature["builder"] not in chains:
+            chains[signature["builder"]] = {
+                "methods": {call["name"] for call in chain["calls"]},
+                "factories": {call_factory(model, call) for call in chain["calls"]},
+                "fields": [(int(match.group(1)), call["start"]) for call in chain["calls"]
+                           for match in [DATA_ELEMENT_CALL_PATTERN.match(call["name"])] if match],
+                "added": set(),
+            }
+        wiring = chains[signature["builder"]]
+        fields = wiring["fields"]
+
+        # Skip field mappers that are already wired, in the file or earlier in the batch
+        method = builder_method(signature, class_name)
+        data_element = data_element_number(class_name)
+        wired_key = data_element if signature["ordered"] else method
+        if wired_key in wiring["added"] or method in wiring["methods"] or factory in wiring["factories"] or (
+                signature["ordered"] and any(num == data_element for num, _ in fields)):
+            continue
+        wiring["added"].add(wired_key)
+
+        # Insert before the first larger data element when ordered, otherwise before .build()
+        position = chain["build_start"]
+        if signature["ordered"]:
+            position = next((pos for num, pos in fields if data_element < num), position)
+        indentation = java_parser.line_indentation(content, chain["build_start"])
+        patches.append((position, data_element or 0, f".{method}({factory}()){line_separator}{indentation}"))
+
+        static_import = f"{package}.{class_name}.{factory}"
+        if (True, static_import) not in imported:
+            static_imports.add(static_import)
+        wired.append(class_name)
+
+    if not patches:
+        return content, wired
+
+    if static_imports:
+        position, prefix = java_parser.import_insertion_point(model)
+        lines = "".join(f"import static {name};{line_separator}" for name in sorted(static_imports))
+        patches.append((position, -1, prefix + lines))
+    return java_parser.apply_patches(content, patches), wired
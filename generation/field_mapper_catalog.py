@@ -0,0 +1,216 @@
+"""
+This script maintains a catalog of the field mapper classes of the common module.
+
+Both field_mappers trees are scanned once and every field mapper is indexed by its data element number
+together with its class name, its static factory method and its package. The catalog is persisted and
+refreshed incrementally: only the files whose modification time or size changed are parsed again.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+import instrumentation
+# concurrent.futures is imported where it is used, it pulls in logging and slows down the start of read-only checks
+
+CATALOG_PATH = Path("generation/.cache/field_mapper_catalog.json")
+CATALOG_VERSION = 1
+# Threads parsing the changed field mappers; the reads are latency bound on a network share
+PARSE_WORKERS = 16
+
+FIELD_MAPPER_FILE_PATTERN = re.compile(r'^(\w+Mapper)\.java$')
+DATA_ELEMENT_PATTERN = re.compile(r'^DE(\d+)_')
+PACKAGE_PATTERN = re.compile(r'^\s*package\s+([\w.]+)\s*;', re.MULTILINE)
+
+
+def load_catalog(roots, catalog_path=CATALOG_PATH):
+    """
+    Loads the field mapper catalog, re-parsing only the files that changed since it was persisted.
+
+    Args:
+        roots (dict): direction (e.g. "umm_to_iso") -> directory of the field_mappers tree.
+        catalog_path (Path): The path of the persisted catalog.
+
+    Returns:
+        dict: The catalog with the keys:
+            - "files" (dict): path -> parsed file entry, as persisted.
+            - "index" (dict): direction -> data element number -> sorted list of (class, factory method, package).
+            - "classes" (dict): direction -> class name -> (class, factory method, package).
+    """
+    persisted = read_persisted(catalog_path)
+    files = {}
+    changed = []
+    with instrumentation.span("field_mappers.scan", roots=len(roots)) as attributes:
+        for direction, directory in roots.items():
+            for path, stat in scan_tree(str(directory)):
+                entry = persisted.get(path)
+                if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                    changed.append((path, direction, stat))
+                files[path] = entry
+        files.update(parse_field_mappers(changed))
+        parsed = len(changed)
+        attributes.update(entries=len(files), parsed=parsed)
+    if parsed or files.keys() != persisted.keys():
+        write_persisted(catalog_path, files)
+    return build_index(files)
+
+
+def scan_tree(directory):
+    """
+    Walks a field_mappers tree and yields its field mapper files.
+
+    Args:
+        directory (str): The root of the tree.
+
+    Yields:
+        tuple: The path of the file and its stat result.
+    """
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir():
+            yield from scan_tree(entry.path)
+        elif FIELD_MAPPER_FILE_PATTERN.match(entry.name):
+            yield entry.path, entry.stat()
+
+
+def parse_field_mappers(changed):
+    """
+    Parses field mapper files, in a thread pool when there are several, so that their reads overlap.
+
+    Args:
+        changed (list): (path, direction, stat result) tuples.
+
+    Returns:
+        dict: path -> parsed file entry.
+    """
+    if len(changed) < 2:
+        return {path: parse_field_mapper(path, direction, stat) for path, direction, stat in changed}
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(PARSE_WORKERS, len(changed))) as executor:
+        entries = executor.map(lambda item: parse_field_mapper(*item), changed)
+        return {path: entry for (path, _, _), entry in zip(changed, entries)}
+
+
+def parse_field_mapper(path, direction, stat):
+    """
+    Parses the class name, the static factory method and the package of a field mapper file.
+
+    Args:
+        path (str): The path of the Java file.
+        direction (str): The direction of the field_mappers tree the file belongs to.
+        stat (os.stat_result): The stat result of the file.
+
+    Returns:
+        dict: The file entry.
+    """
+    class_name = FIELD_MAPPER_FILE_PATTERN.match(os.path.basename(path)).group(1)
+    with open(path, 'r', encoding='utf-8') as file:
+        content = file.read()
+
+    factory = re.search(rf"public static {class_name}\s+([^\s(]+)\s*\(", content)
+    package = PACKAGE_PATTERN.search(content)
+    data_element = DATA_ELEMENT_PATTERN.match(class_name)
+    return {
+        "direction": direction,
+        "class": class_name,
+        "factory": factory.group(1) if factory else None,
+        "package": package.group(1) if package else None,
+        "data_element": int(data_element.group(1)) if data_element else None,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+
+def build_index(files):
+    """
+    Builds the lookup tables of the catalog from the parsed file entries.
+
+    Args:
+        files (dict): path -> parsed file entry.
+
+    Returns:
+        dict: The catalog, see load_catalog.
+    """
+    index = {}
+    classes = {}
+    for entry in files.values():
+        mapper = (entry["class"], entry["factory"], entry["package"])
+        classes.setdefault(entry["direction"], {})[entry["class"]] = mapper
+        if entry["data_element"] is not None:
+            index.setdefault(entry["direction"], {}).setdefault(entry["data_element"], []).append(mapper)
+    for by_data_element in index.values():
+        for mappers in by_data_element.values():
+            mappers.sort()
+    return {"files": files, "index": index, "classes": classes}
+
+
+def find_field_mappers(catalog, direction, field):
+    """
+    Looks up the field mappers implemented for a data element.
+
+    Args:
+        catalog (dict): The catalog returned by load_catalog.
+        direction (str): The direction, e.g. "umm_to_iso".
+        field (int): The data element number.
+
+    Returns:
+        list: (class, factory method, package) tuples, sorted by class name.
+    """
+    return catalog["index"].get(direction, {}).get(int(field), [])
+
+
+def find_field_mapper(catalog, direction, class_name):
+    """
+    Looks up a field mapper by class name.
+
+    Args:
+        catalog (dict): The catalog returned by load_catalog.
+        direction (str): The direction, e.g. "umm_to_iso".
+        class_name (str): The class name of the field mapper.
+
+    Returns:
+        tuple: (class, factory method, package), or None if the class is not in the catalog.
+    """
+    return catalog["classes"].get(direction, {}).get(class_name)
+
+
+def read_persisted(catalog_path):
+    """
+    Reads the persisted catalog files.
+
+    Args:
+        catalog_path (Path): The path of the persisted catalog.
+
+    Returns:
+        dict: path -> parsed file entry, empty if there is no usable persisted catalog.
+    """
+    try:
+        with open(catalog_path, 'r', encoding='utf-8') as file:
+            persisted = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if persisted.get("version") != CATALOG_VERSION:
+        return {}
+    return persisted.get("files", {})
+
+
+def write_persisted(catalog_path, files):
+    """
+    Persists the catalog files atomically.
+
+    Args:
+        catalog_path (Path): The path of the persisted catalog.
+        files (dict): path -> parsed file entry.
+
+    Returns:
+        None
+    """
+    catalog_path = Path(catalog_path)
+    catalog_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = catalog_path.with_name(f"{catalog_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({"version": CATALOG_VERSION, "files": files}, file, separators=(",", ":"))
+    os.replace(tmp_path, catalog_path)
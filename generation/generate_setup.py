@@ -3,43 +3,91 @@ This script generates mapper classes and updates the message type indicator mapp
 """
 
 import os
-import platform
 from pathlib import Path
-import pandas as pd
 from termcolor import colored
-from jinja2 import Environment, FileSystemLoader
-
-# Constants for paths
-if platform.system() == "Windows":
-    BASE_DIR = Path("C:/Source/mapping-components-auth-trg")
-else:
-    BASE_DIR = Path("/Source/mapping-components-auth-trg")
-COMMON_DIR = str(BASE_DIR / "mapping-components-auth-trg")
-INBOUND_BASE_DIR = BASE_DIR / "mapping-components-auth-trg-dk-merchant"
-INBOUND_MAPPERS_DIR_ISO_TO_UMM = INBOUND_BASE_DIR / "src/main/java/eu/nets/mapping/components/auth/trg/dk/merchant/iso8583_to_umm/message_mappers"
-INBOUND_MAPPERS_DIR_UMM_TO_ISO = INBOUND_BASE_DIR / "src/main/java/eu/nets/mapping/components/auth/trg/dk/merchant/umm_to_iso8583/message_mappers"
-OUTBOUND_BASE_DIR = BASE_DIR / "mapping-components-auth-trg-dk-merchant-nds"
-OUTBOUND_MAPPERS_DIR_UMM_TO_ISO = OUTBOUND_BASE_DIR / "src/main/java/eu/nets/mapping/components/auth/trg/dk/merchant/nds/umm_to_iso8583/message_mappers"
-OUTBOUND_MAPPERS_DIR_ISO_TO_UMM = OUTBOUND_BASE_DIR / "src/main/java/eu/nets/mapping/components/auth/trg/dk/merchant/nds/iso8583_to_umm/message_mappers"
-dir_paths = {
-    ("inbound", "iso_to_umm"): INBOUND_MAPPERS_DIR_ISO_TO_UMM,
-    ("inbound", "umm_to_iso"): INBOUND_MAPPERS_DIR_UMM_TO_ISO,
-    ("outbound", "iso_to_umm"): OUTBOUND_MAPPERS_DIR_ISO_TO_UMM,
-    ("outbound", "umm_to_iso"): OUTBOUND_MAPPERS_DIR_UMM_TO_ISO,
-}
+from functools import lru_cache
+import changeset
+import instrumentation
+import project_config
+# spec_reader, spec_cache, mti_helper and jinja2 are imported where they are used, so importing this module stays cheap
+
+SPEC_FILE = "Mapping_PSP to ISO20022_MTI12XX_V2.0.xlsx"
+
+# Paths of the selected module of the project config, see project_config.py and use_module
+dir_paths = {}
+FIELD_MAPPER_ROOTS = {}
+MTI_HELPER_PATH = None
+module_name = None
+
+
+def use_module(name=None):
+    """
+    Points the path constants at a module of the project config.
+
+    dir_paths and FIELD_MAPPER_ROOTS are updated in place, so the modules sharing them see the change.
+
+    Args:
+        name (str): The name of the module. Defaults to the default module of the config.
 
-environment = Environment(loader=FileSystemLoader("generation/templates/"))
-INBOUND_ISO2UMM_TEMPLATE = environment.get_template("INBOUND_ISO2UMM_TEMPLATE.txt")
-INBOUND_UMM2ISO_TEMPLATE = environment.get_template("INBOUND_UMM2ISO_TEMPLATE.txt")
-OUTBOUND_UMM2ISO_TEMPLATE = environment.get_template("OUTBOUND_UMM2ISO_TEMPLATE.txt")
-OUTBOUND_ISO2UMM_TEMPLATE = environment.get_template("OUTBOUND_ISO2UMM_TEMPLATE.txt")
-templates = {
-        ("inbound", "iso_to_umm"): INBOUND_ISO2UMM_TEMPLATE,
-        ("inbound", "umm_to_iso"): INBOUND_UMM2ISO_TEMPLATE,
-        ("outbound", "iso_to_umm"): OUTBOUND_ISO2UMM_TEMPLATE,
-        ("outbound", "umm_to_iso"): OUTBOUND_UMM2ISO_TEMPLATE
+    Returns:
+        dict: The module, see project_config.resolve_module.
+    """
+    global MTI_HELPER_PATH, module_name
+    module = project_config.get_module(name)
+    dir_paths.clear()
+    dir_paths.update(module["dir_paths"])
+    FIELD_MAPPER_ROOTS.clear()
+    FIELD_MAPPER_ROOTS.update(module["field_mapper_roots"])
+    MTI_HELPER_PATH = module["mti_helper"]
+    module_name = module["name"]
+    return module
+
+
+use_module()
+
+# Compiled templates are kept in a bytecode cache, so only changed templates are compiled again
+TEMPLATE_DIR = "generation/templates/"
+TEMPLATE_CACHE_DIR = "generation/.cache/templates"
+template_names = {
+        ("inbound", "iso_to_umm"): "INBOUND_ISO2UMM_TEMPLATE.txt",
+        ("inbound", "umm_to_iso"): "INBOUND_UMM2ISO_TEMPLATE.txt",
+        ("outbound", "iso_to_umm"): "OUTBOUND_ISO2UMM_TEMPLATE.txt",
+        ("outbound", "umm_to_iso"): "OUTBOUND_UMM2ISO_TEMPLATE.txt"
+}
+directions_map = {
+    "1": ("inbound", "iso_to_umm"),
+    "2": ("inbound", "umm_to_iso"),
+    "3": ("outbound", "umm_to_iso"),
+    "4": ("outbound", "iso_to_umm")
 }
 
+@lru_cache(maxsize=None)
+def get_environment():
+    """
+    Creates the Jinja environment on first use, so that importing this module does not load jinja2.
+
+    Returns:
+        Environment: The Jinja environment of the mapper class templates.
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    return Environment(loader=FileSystemLoader(TEMPLATE_DIR), bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR))
+
+@lru_cache(maxsize=None)
+def get_template(direction, directional_conversion):
+    """
+    Loads the template of a direction and conversion on first use.
+
+    Args:
+        direction (str): The direction of the mapper (inbound or outbound).
+        directional_conversion (str): The conversion type of the mapper (iso_to_umm or umm_to_iso).
+
+    Returns:
+        Template: The compiled template.
+    """
+    return get_environment().get_template(template_names[(direction, directional_conversion)])
+
 def update_message_type_indicator(message_function, message_type_indicator):
     """
     Updates the message type indicator mapping in the Java file.
@@ -51,96 +99,101 @@ def update_message_type_indicator(message_function, message_type_indicator):
     Returns:
         None
     """
-    # Read the Java file
-    file_path = COMMON_DIR + "/src/main/java/eu/nets/mapping/components/auth/trg/common/message_function/MessageTypeIndicatorHelper.java"
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.readlines()
+    update_message_type_indicators([(message_function, message_type_indicator)])
 
-    # Prepare the mapping
-    new_mapping = f'        map("{message_type_indicator}", MessageFunction.{message_function});\n'
+def update_message_type_indicators(mappings, mti_helper_path=None):
+    """
+    Adds a batch of message type indicator mappings to the Java file, which is read and written once.
 
-    # Check for existing mapping
-    mapping_exists = any(new_mapping.strip() in line for line in content)
+    Args:
+        mappings (list): (message_function, message_type_indicator) pairs.
+        mti_helper_path (str): The helper to update. Defaults to MTI_HELPER_PATH.
 
-    if not mapping_exists:
-        insert_position = find_insertion_position(message_type_indicator, content)
-        content.insert(insert_position, new_mapping)
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.writelines(content)
+    Returns:
+        dict: The pairs sorted into "added", "existing" and "conflicts", see mti_helper.merge_mappings.
+    """
+    import mti_helper
 
-        print("Mapping for " + colored(message_function, 'yellow') + " added successfully.")
-    else:
-        print("Mapping for " + colored(message_function, 'yellow') + " already exists. No changes needed.")
+    result = mti_helper.apply_mti_mappings(mti_helper_path or MTI_HELPER_PATH, mappings)
 
-def find_insertion_position(message_type_indicator, content):
+    for message_function, message_type_indicator in result["added"]:
+        outcome = " would be added." if changeset.is_dry_run() else " added successfully."
+        instrumentation.event("mti.added", "Mapping for " + colored(message_function, 'yellow') + outcome,
+                              message_function=message_function, message_type_indicator=message_type_indicator)
+    for message_function, message_type_indicator in result["existing"]:
+        instrumentation.event("mti.exists", "Mapping for " + colored(message_function, 'yellow') + " already exists. No changes needed.",
+                              message_function=message_function, message_type_indicator=message_type_indicator)
+    for message_function, message_type_indicator, existing_function in result["conflicts"]:
+        instrumentation.event("mti.conflict", colored(f"Conflict: {message_type_indicator} is already mapped to {existing_function}, "
+                                                      f"not mapping it to {message_function}.", 'red'),
+                              message_function=message_function, message_type_indicator=message_type_indicator,
+                              existing_function=existing_function)
+    return result
+
+
+def generate_mapper_class(message_function_description, message_function, direction, directional_conversion):
     """
-    Finds the insertion position for the new mapping based on the message type indicator.
+    Generates a mapper class based on the provided parameters.
 
     Args:
-        message_type_indicator (str): The message type indicator.
-        content (list): The content of the Java file.
+        message_function_description (str): The description of the message function.
+        message_function (str): The message function.
+        direction (str): The direction of the mapper (inbound or outbound).
+        birectional_conversion (str): The conversion type of the mapper (iso_to_umm or umm_to_iso).
 
     Returns:
-        int: The insertion position.
-    """
-    target_num = int(message_type_indicator)
-    block_found = False
-    insert_position = 0
-    for i, line in enumerate(content):
-        if 'map(' in line:
-            try:
-                # Extract the number from the line
-                start = line.find('"') + 1
-                end = line.find('"', start)
-                number_str = line[start:end]
-
-                # Convert to integer for comparison
-                current_num = int(number_str)
-                block_found = True
-
-                # If the current number is greater than the target number, the position is found
-                if current_num > target_num:
-                    insert_position = i
-                    return insert_position
-            except ValueError:
-                # Skip lines that do not contain valid numbers
-                continue
-        if '}' in line and block_found:
-            # If the number is not found in the order, add the mapping before the closing brace at the end of the static block
-            insert_position = i
-            return insert_position
-    return insert_position
+        bool: True if the mapper class was generated, False if it already existed.
+    """
+    file_path, rendered = render_mapper_class(message_function_description, message_function, direction, directional_conversion)
 
+    # Check if the file already exists
+    if changeset.exists(file_path):
+        report_existing(file_path)
+        return False
+    else:
+        changeset.write_file(file_path, rendered)
+        report_generated(file_path)
+        return True
 
-def generate_mapper_class(message_function_description, message_function, direction, directional_conversion):
+def report_generated(file_path):
     """
-    Generates a mapper class based on the provided parameters.
+    Reports a generated mapper class.
+    """
+    action = "Would generate " if changeset.is_dry_run() else "Generated "
+    instrumentation.event("mapper.generated", action + colored(str(file_path), 'yellow'), path=str(file_path))
+
+def report_existing(file_path):
+    """
+    Reports a mapper class that was not generated because it already exists.
+    """
+    instrumentation.event("mapper.exists", "File " + colored(str(file_path), 'yellow') + " already exists. Skipping generation to avoid overwriting.",
+                          path=str(file_path))
+
+def render_mapper_class(message_function_description, message_function, direction, directional_conversion, output_dirs=None):
+    """
+    Renders a mapper class without writing it.
 
     Args:
         message_function_description (str): The description of the message function.
         message_function (str): The message function.
         direction (str): The direction of the mapper (inbound or outbound).
-        birectional_conversion (str): The conversion type of the mapper (iso_to_umm or umm_to_iso).
+        directional_conversion (str): The conversion type of the mapper (iso_to_umm or umm_to_iso).
+        output_dirs (dict): (direction, conversion) -> output directory. Defaults to dir_paths.
 
     Returns:
-        None
+        tuple: The path of the mapper class file and its rendered content.
     """
-    class_name = f"{message_function_description.replace(" ", "")}Mapper"
+    class_name = f"{message_function_description.replace(' ', '')}Mapper"
 
-    template = templates[(direction, directional_conversion)]
-    rendered = template.render(message_function=message_function, class_name=class_name)
+    with instrumentation.span("template.render", class_name=class_name, direction=direction,
+                              conversion=directional_conversion) as attributes:
+        template = get_template(direction, directional_conversion)
+        rendered = template.render(message_function=message_function, class_name=class_name)
+        attributes["bytes"] = len(rendered)
 
     # Determine the correct directory based on direction
-    dir_path = dir_paths[(direction, directional_conversion)]
-    file_path = dir_path / f"{class_name}.java"
-
-    # Check if the file already exists
-    if os.path.exists(file_path):
-        print("File " + colored({file_path}, 'yellow') + " already exists. Skipping generation to avoid overwriting.")
-    else:
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(rendered)
-        print("Generated " + colored({file_path}, 'yellow') + "")
+    dir_path = Path((output_dirs or dir_paths)[(direction, directional_conversion)])
+    return dir_path / f"{class_name}.java", rendered
 
 def handle_generation(message_function_description, message_function, directions_input):
     """
@@ -154,49 +207,30 @@ def handle_generation(message_function_description, message_function, directions
     Returns:
         None
     """
-    directions_map = {
-        "1": ("inbound", "iso_to_umm"),
-        "2": ("inbound", "umm_to_iso"),
-        "3": ("outbound", "umm_to_iso"),
-        "4": ("outbound", "iso_to_umm")
-    }
-
     for direction_key in directions_input:
         if direction_key in directions_map:
             direction, conversion = directions_map[direction_key]
             generate_mapper_class(message_function_description, message_function, direction, conversion)
 
-def extract_variables_from_excel(file_path):
+def extract_variables_from_excel(file_path, sheet_name=None):
     """
     Extracts variables from an Excel file.
 
+    The sheet is streamed in read-only mode and reading stops as soon as the "ISO20022" header,
+    the message function row and the "Message Type Identifier" label have been found.
+
     Args:
         file_path (str): The path to the Excel file.
+        sheet_name (str): The name of the sheet to read. Defaults to the first sheet of the workbook.
 
     Returns:
         tuple: A tuple containing the extracted values:
             - message_function (str): The extracted message function.
             - message_type_indicator (str): The extracted message type indicator.
     """
-    # Read the Excel file
-    df = pd.read_excel(file_path, header=None)
-
-    # Find the column index for "ISO20022"
-    iso_column_index = df.iloc[0].tolist().index('ISO20022')  # Adjust based on actual Excel layout
-    target_row_index = 3  # For message_function, assuming it's still the same row
+    import spec_reader
 
-    # Extract message_function
-    message_function_raw = df.iloc[target_row_index, iso_column_index]  # Adjust indices as necessary
-    message_function = message_function_raw.split(", value ")[-1] if ", value " in message_function_raw else message_function_raw
-
-    # Adjust logic for message_type_indicator
-    # Find the cell with "Message Type Identifier" and then the cell to the right by 5 for its value
-    message_type_identifier_location = df[df.applymap(lambda x: "Message Type Identifier" in str(x)).any(axis=1)].stack().index.tolist()[0]
-    message_type_identifier_row, message_type_identifier_col = message_type_identifier_location
-    message_type_indicator = df.iloc[message_type_identifier_row, message_type_identifier_col + 5]  # Adjust the column by +2 to find the value
-
-    # Return the extracted values
-    return message_function, message_type_indicator
+    return spec_reader.read_message_header(file_path, sheet_name)
 
 
 def main():
@@ -206,7 +240,10 @@ def main():
     Returns:
         None
     """
-    message_function, message_type_indicator = extract_variables_from_excel("Mapping_PSP to ISO20022_MTI12XX_V2.0.xlsx")
+    import spec_cache
+
+    spec, _ = spec_cache.load_spec(SPEC_FILE)
+    message_function, message_type_indicator = spec["message_function"], spec["message_type_indicator"]
     message_function_description = "Financial Request"
     #message_function = "ADNO"
     #message_type_indicator = "1688"
@@ -1,6 +1,6 @@
-import subprocess
-import os
 from termcolor import colored
+import add_mapper_UMM2ISO
+import add_mapper_ISO2UMM
 
 def main():
     print(colored("Which direction do you want to implement?", 'yellow'))
@@ -9,11 +9,11 @@ def main():
     
     choice = input("Enter the number corresponding to your choice (1 or 2): ")
     if choice == '1':
-        subprocess.run(["python", "generation/add_mapper_UMM2ISO.py"])
+        add_mapper_UMM2ISO.main([])
     elif choice == '2':
-        subprocess.run(["python", "generation/add_mapper_ISO2UMM.py"])
+        add_mapper_ISO2UMM.main()
     else:
         print(colored("Invalid choice. Please enter 1 or 2.", 'red'))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,353 @@
+"""
+This script instruments the generator with timing spans and events.
+
+Spans time the steps of a run (Excel extraction, directory scans, template rendering, file reads, parses and writes,
+message type indicator updates) and carry counts and byte sizes. Events report what a step did, e.g. a generated
+file, and carry the colored console line describing it. Both go to the listeners of one event stream: the console
+renderer prints the console lines, and a profile started with --profile records everything and writes it as a JSON
+report or as a Chrome trace (chrome://tracing, https://ui.perfetto.dev).
+
+Without a profile, span() returns a shared no-op context manager, so an instrumented step only pays a function call.
+Work submitted to a process pool through profiled_call is recorded in the worker and merged into the profile of the
+parent process, on the worker's own track of the trace.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+REPORT_FORMATS = ("json", "chrome")
+REPORT_VERSION = 1
+
+# The profile being recorded, None when profiling is off
+active_profile = None
+# The attributes yielded by disabled spans: written to by the instrumented code, never read
+DISCARDED_ATTRIBUTES = {}
+NULL_SPAN = nullcontext(DISCARDED_ATTRIBUTES)
+
+
+def render_console(name, console, attributes):
+    """
+    Prints the console line of an event; events without a console line are not printed.
+
+    Args:
+        name (str): The name of the event.
+        console (str): The colored console line, or None.
+        attributes (dict): The attributes of the event.
+
+    Returns:
+        None
+    """
+    if console is not None:
+        print(console)
+
+
+# The listeners of the event stream, called with (name, console, attributes) for every event
+listeners = [render_console]
+
+
+def span(name, **attributes):
+    """
+    Times a step when a profile is being recorded.
+
+    Used as a context manager yielding the attributes of the span, to which the step can add counts and sizes:
+
+        with instrumentation.span("file.read", path=file_path) as attributes:
+            content = file.read()
+            attributes["bytes"] = len(content)
+
+    Args:
+        name (str): The name of the step, e.g. "template.render".
+        **attributes: The attributes of the span.
+
+    Returns:
+        context manager: The span, or a no-op context manager when profiling is off.
+    """
+    if active_profile is None:
+        return NULL_SPAN
+    return record_span(active_profile, name, attributes)
+
+
+@contextmanager
+def record_span(profile, name, attributes):
+    """
+    Records a span in a profile, with the error that ended it if any.
+    """
+    start = time.perf_counter_ns()
+    try:
+        yield attributes
+    except BaseException as error:
+        attributes["error"] = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        profile["spans"].append((name, current_thread(), start, time.perf_counter_ns(), attributes))
+
+
+def event(name, console=None, **attributes):
+    """
+    Sends an event to the listeners of the event stream.
+
+    Args:
+        name (str): The name of the event, e.g. "mapper.generated".
+        console (str): The colored line printed on the console, or None for events that are not printed.
+        **attributes: The attributes of the event.
+
+    Returns:
+        None
+    """
+    for listener in listeners:
+        listener(name, console, attributes)
+
+
+def current_thread():
+    """
+    Identifies the calling thread across processes.
+
+    Returns:
+        tuple: The process identifier and the thread identifier.
+    """
+    return os.getpid(), threading.get_ident()
+
+
+def start_profile():
+    """
+    Starts recording spans and events.
+
+    Returns:
+        dict: The profile with the keys "start_ns", "spans" ((name, thread, start_ns, end_ns, attributes) tuples)
+            and "events" ((name, thread, time_ns, attributes) tuples), thread being a (pid, thread ident) tuple.
+    """
+    global active_profile
+    profile = {"start_ns": time.perf_counter_ns(), "spans": [], "events": []}
+
+    def record_event(name, console, attributes):
+        profile["events"].append((name, current_thread(), time.perf_counter_ns(), attributes))
+
+    profile["listener"] = record_event
+    listeners.append(record_event)
+    active_profile = profile
+    return profile
+
+
+def stop_profile(profile):
+    """
+    Stops recording a profile.
+
+    Args:
+        profile (dict): The profile returned by start_profile.
+
+    Returns:
+        dict: The profile, with its "end_ns".
+    """
+    global active_profile
+    active_profile = None
+    if profile["listener"] in listeners:
+        listeners.remove(profile["listener"])
+    profile["end_ns"] = time.perf_counter_ns()
+    return profile
+
+
+def profiled_call(enabled, function, *args):
+    """
+    Calls a function in a worker process, recording its spans and events when the parent process is profiling.
+
+    Submit it to the pool with enabled=is_profiling() and pass the recording to merge_recording in the parent.
+
+    Args:
+        enabled (bool): Whether to record.
+        function (callable): The function, picklable.
+        *args: The arguments of the function.
+
+    Returns:
+        tuple: The result of the function and the recorded (spans, events), or None when not recording.
+    """
+    if not enabled:
+        return function(*args), None
+    profile = start_profile()
+    try:
+        result = function(*args)
+    finally:
+        stop_profile(profile)
+    return result, (profile["spans"], profile["events"])
+
+
+def is_profiling():
+    """
+    Checks whether a profile is being recorded.
+    """
+    return active_profile is not None
+
+
+def merge_recording(recording):
+    """
+    Adds the spans and events recorded by a worker process to the profile being recorded.
+
+    Args:
+        recording (tuple): (spans, events), see profiled_call, or None.
+
+    Returns:
+        None
+    """
+    if recording is None or active_profile is None:
+        return
+    spans, events = recording
+    active_profile["spans"].extend(spans)
+    active_profile["events"].extend(events)
+
+
+@contextmanager
+def profiling(report_path=None, report_format="json", command=None):
+    """
+    Records a profile of a block and writes its report, also when the block raises.
+
+    Args:
+        report_path (str): The report file. Nothing is recorded when None.
+        report_format (str): "json" or "chrome", see REPORT_FORMATS.
+        command (list): The command line, stored in the report.
+
+    Yields:
+        dict: The profile, or None when nothing is recorded.
+    """
+    if report_path is None:
+        yield None
+        return
+    profile = start_profile()
+    try:
+        yield profile
+    finally:
+        stop_profile(profile)
+        write_report(profile, report_path, report_format, command)
+        print(f"Profile written to {report_path}", file=sys.stderr)
+
+
+def summarize(profile):
+    """
+    Aggregates the spans of a profile by name.
+
+    Args:
+        profile (dict): The profile.
+
+    Returns:
+        dict: name -> dict with the keys "count", "total_ms", "max_ms" and the sums of the numeric attributes,
+            sorted by decreasing total time.
+    """
+    summary = {}
+    for name, _, start, end, attributes in profile["spans"]:
+        entry = summary.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        duration = (end - start) / 1e6
+        entry["count"] += 1
+        entry["total_ms"] += duration
+        entry["max_ms"] = max(entry["max_ms"], duration)
+        for key, value in attributes.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                entry[key] = entry.get(key, 0) + value
+    for entry in summary.values():
+        entry["total_ms"] = round(entry["total_ms"], 3)
+        entry["max_ms"] = round(entry["max_ms"], 3)
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["total_ms"]))
+
+
+def build_report(profile, command=None):
+    """
+    Builds the JSON report of a profile: the summary by span name, then every span and event in time order.
+
+    Args:
+        profile (dict): The stopped profile.
+        command (list): The command line.
+
+    Returns:
+        dict: The report.
+    """
+    origin = profile["start_ns"]
+    threads = thread_numbers(profile)
+    return {
+        "version": REPORT_VERSION,
+        "command": command,
+        "duration_ms": round((profile["end_ns"] - origin) / 1e6, 3),
+        "summary": summarize(profile),
+        "spans": [
+            {"name": name, "thread": threads[thread], "start_ms": round((start - origin) / 1e6, 3),
+             "duration_ms": round((end - start) / 1e6, 3), "attributes": attributes}
+            for name, thread, start, end, attributes in sorted(profile["spans"], key=lambda item: item[2])
+        ],
+        "events": [
+            {"name": name, "thread": threads[thread], "time_ms": round((time_ns - origin) / 1e6, 3), "attributes": attributes}
+            for name, thread, time_ns, attributes in profile["events"]
+        ],
+    }
+
+
+def build_chrome_trace(profile):
+    """
+    Converts a profile to the Chrome trace-event format: spans become complete ("X") events and events become
+    instant ("i") events, with timestamps in microseconds.
+
+    Args:
+        profile (dict): The stopped profile.
+
+    Returns:
+        dict: The trace.
+    """
+    origin = profile["start_ns"]
+    threads = thread_numbers(profile)
+    trace_events = [
+        {"name": name, "cat": name.split(".")[0], "ph": "X", "pid": thread[0], "tid": threads[thread],
+         "ts": (start - origin) / 1000, "dur": (end - start) / 1000, "args": attributes}
+        for name, thread, start, end, attributes in profile["spans"]
+    ]
+    trace_events += [
+        {"name": name, "cat": name.split(".")[0], "ph": "i", "s": "t", "pid": thread[0], "tid": threads[thread],
+         "ts": (time_ns - origin) / 1000, "args": attributes}
+        for name, thread, time_ns, attributes in profile["events"]
+    ]
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def thread_numbers(profile):
+    """
+    Numbers the threads of a profile in order of first appearance, the main thread first.
+
+    Returns:
+        dict: (pid, thread ident) -> number.
+    """
+    numbers = {(os.getpid(), threading.main_thread().ident): 0}
+    first_seen = [(start, thread) for _, thread, start, _, _ in profile["spans"]]
+    first_seen += [(time_ns, thread) for _, thread, time_ns, _ in profile["events"]]
+    for _, thread in sorted(first_seen):
+        numbers.setdefault(thread, len(numbers))
+    return numbers
+
+
+def write_report(profile, report_path, report_format="json", command=None):
+    """
+    Writes the report of a profile.
+
+    Args:
+        profile (dict): The stopped profile.
+        report_path (str): The report file.
+        report_format (str): "json" or "chrome", see REPORT_FORMATS.
+        command (list): The command line, stored in the JSON report.
+
+    Returns:
+        None
+    """
+    report = build_chrome_trace(profile) if report_format == "chrome" else build_report(profile, command)
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=1, default=str)
+        file.write("\n")
+
+
+def add_profile_arguments(parser):
+    """
+    Adds the --profile and --profile-format options to an argument parser.
+    """
+    parser.add_argument("--profile", default=None, metavar="REPORT",
+                        help="record timing spans and write them to this file")
+    parser.add_argument("--profile-format", choices=REPORT_FORMATS, default="json",
+                        help="report format: json summary and spans, or a chrome trace (default: %(default)s)")
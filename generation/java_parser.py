@@ -0,0 +1,257 @@
+"""
+This script parses the subset of Java used by the message mappers: the package declaration, the imports and the
+fluent builder chains passed to the delegators.
+
+The source is tokenized once (comments, strings and whitespace are skipped, so they cannot confuse the parser) into
+a model holding the span offsets of every element. Builder chains are resolved on demand and memoized in the model.
+Edits are never made to the model: they are collected as (position, order, text) patches and applied to the
+original source in one linear splice, so an unchanged file round-trips byte for byte.
+"""
+
+import re
+from functools import lru_cache
+import instrumentation
+
+# Whitespace and comments are consumed in front of every token; a qualified name (a.b.C) is a single token
+TOKEN_PATTERN = re.compile(
+    r'(?:\s+|//[^\r\n]*|/\*.*?\*/)*'
+    r'(?:(?P<string>"""(?:[^\\]|\\.)*?"""|"(?:[^"\\\r\n]|\\.)*"|\'(?:[^\'\\\r\n]|\\.)*\')'
+    r'|(?P<name>[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)'
+    r'|(?P<number>\d[\w.]*)'
+    r'|(?P<symbol>.))',
+    re.DOTALL,
+)
+# A package or import declaration, with the whitespace and comments in front of it
+DECLARATION_PATTERN = re.compile(
+    r'(?:\s+|//[^\r\n]*|/\*.*?\*/)*(?P<keyword>package|import)\s+(?P<static>static\s+)?(?P<name>[\w$.*]+)\s*;',
+    re.DOTALL,
+)
+BUILD_METHOD = "build"
+
+
+def tokenize(source, position=0):
+    """
+    Splits Java source into tokens, leaving out whitespace and comments.
+
+    Args:
+        source (str): The Java source.
+        position (int): The offset to start at.
+
+    Returns:
+        list: (kind, text, start, end) tuples, kind being "string", "name", "number" or "symbol".
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(source, position):
+        kind = match.lastgroup
+        if kind is not None:
+            tokens.append((kind, match.group(kind), match.start(kind), match.end(kind)))
+    return tokens
+
+
+@lru_cache(maxsize=None)
+def expression_tokens(expression):
+    """
+    Returns the token texts of a Java expression, e.g. the expression opening a builder chain.
+
+    Args:
+        expression (str): The Java expression.
+
+    Returns:
+        tuple: The token texts.
+    """
+    return tuple(text for _, text, _, _ in tokenize(expression))
+
+
+def parse_java(source):
+    """
+    Parses the package declaration and the imports of a Java file and tokenizes the rest of it.
+
+    Args:
+        source (str): The Java source.
+
+    Returns:
+        dict: The model with the keys:
+            - "source" (str): The original source.
+            - "tokens" (list): The tokens following the imports, see tokenize.
+            - "package" (dict): "name", "start" and "end" of the package declaration, or None.
+            - "imports" (list): dicts with the keys "name", "static", "start" and "end", in file order.
+            - "chains" (dict): builder expression -> builder chain, filled by find_chain.
+    """
+    with instrumentation.span("java.parse", bytes=len(source)) as attributes:
+        package = None
+        imports = []
+        position = 0
+        match = DECLARATION_PATTERN.match(source)
+        while match:
+            declaration = {"name": match.group("name"), "start": match.start("keyword"), "end": match.end()}
+            if match.group("keyword") == "package":
+                package = declaration
+            else:
+                declaration["static"] = match.group("static") is not None
+                imports.append(declaration)
+            position = match.end()
+            match = DECLARATION_PATTERN.match(source, position)
+
+        # Only the body after the declarations is tokenized
+        tokens = tokenize(source, position)
+        attributes["tokens"] = len(tokens)
+        return {"source": source, "tokens": tokens, "package": package, "imports": imports, "chains": {}}
+
+
+def find_chain(model, expression):
+    """
+    Finds the builder chain opened by an expression, e.g. Delegator.<A, B>builder(), up to its own .build() call.
+
+    The expression is matched token by token, so line breaks and spacing in the source do not matter. Builder
+    chains nested in the arguments of a call are part of that call, not of the chain.
+
+    Args:
+        model (dict): The model returned by parse_java.
+        expression (str): The expression opening the builder chain.
+
+    Returns:
+        dict: The builder chain with the keys:
+            - "start" (int): The offset of the opening expression.
+            - "end" (int): The offset after the .build() call.
+            - "build_start" (int): The offset of the "." of the .build() call.
+            - "calls" (list): dicts with the keys "name", "start" (offset of the "."), "arguments_start",
+              "arguments_end" and "end", for every builder method call before .build(), in source order.
+
+    Raises:
+        ValueError: If the expression is not found or its chain is not terminated by .build().
+    """
+    if expression in model["chains"]:
+        return model["chains"][expression]
+
+    tokens = model["tokens"]
+    pattern = expression_tokens(expression)
+    index = next((i for i in range(len(tokens) - len(pattern) + 1)
+                  if tokens[i][1] == pattern[0]
+                  and all(tokens[i + j][1] == text for j, text in enumerate(pattern))), None)
+    if index is None:
+        raise ValueError(f"Builder {expression} not found in the message mapper")
+
+    chain = {"start": tokens[index][2], "end": None, "build_start": None, "calls": []}
+    index += len(pattern)
+    while index < len(tokens) and tokens[index][1] == ".":
+        dot = tokens[index]
+        index += 1
+        if index < len(tokens) and tokens[index][1] == "<":
+            index = skip_balanced(tokens, index, "<", ">")
+        if index + 1 >= len(tokens) or tokens[index][0] != "name" or tokens[index + 1][1] != "(":
+            break
+        name = tokens[index][1]
+        open_paren = tokens[index + 1]
+        index = skip_balanced(tokens, index + 1, "(", ")")
+        close_paren = tokens[index - 1]
+        if name == BUILD_METHOD and open_paren[3] == close_paren[2]:
+            chain["build_start"] = dot[2]
+            chain["end"] = close_paren[3]
+            model["chains"][expression] = chain
+            return chain
+        chain["calls"].append({
+            "name": name,
+            "start": dot[2],
+            "arguments_start": open_paren[3],
+            "arguments_end": close_paren[2],
+            "end": close_paren[3],
+        })
+    raise ValueError(f"Builder {expression} is not terminated by .{BUILD_METHOD}()")
+
+
+def skip_balanced(tokens, index, opening, closing):
+    """
+    Skips a balanced group of tokens, e.g. the arguments of a call.
+
+    Args:
+        tokens (list): The tokens.
+        index (int): The index of the opening token.
+        opening (str): The opening symbol.
+        closing (str): The closing symbol.
+
+    Returns:
+        int: The index after the matching closing token.
+
+    Raises:
+        ValueError: If the group is not closed.
+    """
+    depth = 0
+    for position in range(index, len(tokens)):
+        text = tokens[position][1]
+        if text == opening:
+            depth += 1
+        elif text == closing:
+            depth -= 1
+            if depth == 0:
+                return position + 1
+    raise ValueError(f"Unbalanced {opening}{closing} at offset {tokens[index][2]}")
+
+
+def import_insertion_point(model):
+    """
+    Returns where new imports go: before the first import, or on the line after the package declaration.
+
+    Args:
+        model (dict): The model returned by parse_java.
+
+    Returns:
+        tuple: The offset and the text to put before the imports (a line break when there are no imports yet).
+    """
+    if model["imports"]:
+        return model["imports"][0]["start"], ""
+    if model["package"]:
+        source = model["source"]
+        end = model["package"]["end"]
+        line_end = source.find("\n", end)
+        return (len(source), newline(source)) if line_end == -1 else (line_end + 1, newline(source))
+    return 0, ""
+
+
+def newline(source):
+    """
+    Returns the line separator used by the source.
+
+    Args:
+        source (str): The source.
+
+    Returns:
+        str: "\\r\\n" if the source uses Windows line endings, "\\n" otherwise.
+    """
+    return "\r\n" if "\r\n" in source else "\n"
+
+
+def line_indentation(source, position):
+    """
+    Returns the indentation of the line containing a position.
+
+    Args:
+        source (str): The source.
+        position (int): The position.
+
+    Returns:
+        str: The leading whitespace of the line.
+    """
+    line_start = source.rfind("\n", 0, position) + 1
+    line = source[line_start:position]
+    return line[:len(line) - len(line.lstrip())]
+
+
+def apply_patches(source, patches):
+    """
+    Applies insertions to the source in one linear pass.
+
+    Args:
+        source (str): The source.
+        patches (list): (position, order, text) tuples; insertions at the same position are applied by order.
+
+    Returns:
+        str: The patched source.
+    """
+    pieces = []
+    previous = 0
+    for position, _, text in sorted(patches):
+        pieces.append(source[previous:position])
+        pieces.append(text)
+        previous = position
+    pieces.append(source[previous:])
+    return "".join(pieces)
@@ -0,0 +1,139 @@
+"""
+This script maintains the message type indicator mappings in MessageTypeIndicatorHelper.java.
+
+The map("NNNN", MessageFunction.X) calls of the helper's static block are parsed once into a sorted index,
+a whole batch of new mappings is merged into it and the file is written back once, through the changeset writer.
+"""
+
+import bisect
+import re
+import changeset
+import instrumentation
+
+MAPPING_PATTERN = re.compile(r'^\s*map\(\s*"(\d+)"\s*,\s*MessageFunction\.(\w+)\s*\)\s*;')
+MAPPING_LINE = '        map("{message_type_indicator}", MessageFunction.{message_function});'
+
+
+def read_lines(file_path):
+    """
+    Reads a file into lines, keeping the original line endings.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        list: The lines of the file.
+    """
+    return changeset.read_lines(file_path)
+
+
+def parse_mti_index(lines):
+    """
+    Parses the static block of the helper into an index of its mappings.
+
+    Args:
+        lines (list): The lines of MessageTypeIndicatorHelper.java.
+
+    Returns:
+        dict: The index with the keys:
+            - "functions" (dict): message type indicator -> message function.
+            - "keys" (list): the message type indicators as integers, sorted.
+            - "positions" (list): the line index of the mapping of each key in "keys".
+            - "block_end" (int): the line index of the closing brace of the static block.
+    """
+    functions = {}
+    entries = []
+    block_end = None
+    for i, line in enumerate(lines):
+        match = MAPPING_PATTERN.match(line)
+        if match:
+            functions[match.group(1)] = match.group(2)
+            entries.append((int(match.group(1)), i))
+        elif entries and '}' in line:
+            block_end = i
+            break
+    if block_end is None:
+        raise ValueError("Static block with map(...) calls not found in the message type indicator helper")
+
+    entries.sort()
+    return {
+        "functions": functions,
+        "keys": [key for key, _ in entries],
+        "positions": [position for _, position in entries],
+        "block_end": block_end,
+    }
+
+
+def merge_mappings(lines, index, mappings):
+    """
+    Merges new mappings into the parsed helper, keeping the static block sorted by message type indicator.
+
+    Args:
+        lines (list): The lines of MessageTypeIndicatorHelper.java.
+        index (dict): The index returned by parse_mti_index; it is updated with the added mappings.
+        mappings (iterable): (message_function, message_type_indicator) pairs.
+
+    Returns:
+        tuple: A tuple containing:
+            - lines (list): The new lines of the file.
+            - result (dict): The pairs sorted into "added", "existing" and "conflicts". A conflict is
+              reported as (message_function, message_type_indicator, existing_message_function).
+    """
+    newline = '\r\n' if lines and lines[0].endswith('\r\n') else '\n'
+    result = {"added": [], "existing": [], "conflicts": []}
+    insertions = []
+    for message_function, message_type_indicator in mappings:
+        message_type_indicator = str(message_type_indicator)
+        existing_function = index["functions"].get(message_type_indicator)
+        if existing_function == message_function:
+            result["existing"].append((message_function, message_type_indicator))
+            continue
+        if existing_function is not None:
+            result["conflicts"].append((message_function, message_type_indicator, existing_function))
+            continue
+
+        key = int(message_type_indicator)
+        slot = bisect.bisect_right(index["keys"], key)
+        # New mappings go before the first greater existing mapping, or at the end of the static block
+        position = index["positions"][slot] if slot < len(index["positions"]) else index["block_end"]
+        index["keys"].insert(slot, key)
+        index["positions"].insert(slot, position)
+        index["functions"][message_type_indicator] = message_function
+        line = MAPPING_LINE.format(message_type_indicator=message_type_indicator, message_function=message_function)
+        insertions.append((position, key, line + newline))
+        result["added"].append((message_function, message_type_indicator))
+
+    if not insertions:
+        return lines, result
+
+    insertions.sort()
+    new_lines = []
+    previous = 0
+    for position, _, line in insertions:
+        new_lines.extend(lines[previous:position])
+        new_lines.append(line)
+        previous = position
+    new_lines.extend(lines[previous:])
+    return new_lines, result
+
+
+def apply_mti_mappings(file_path, mappings):
+    """
+    Adds a batch of mappings to the helper, reading and writing the file once.
+
+    Args:
+        file_path (str): The path to MessageTypeIndicatorHelper.java.
+        mappings (iterable): (message_function, message_type_indicator) pairs.
+
+    Returns:
+        dict: The pairs sorted into "added", "existing" and "conflicts", see merge_mappings.
+    """
+    with instrumentation.span("mti.update", path=str(file_path)) as attributes:
+        lines = read_lines(file_path)
+        new_lines, result = merge_mappings(lines, parse_mti_index(lines), mappings)
+        if result["added"]:
+            changeset.write_file(file_path, "".join(new_lines))
+        attributes.update(lines=len(lines), added=len(result["added"]), existing=len(result["existing"]),
+                          conflicts=len(result["conflicts"]))
+        return result
+
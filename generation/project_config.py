@@ -0,0 +1,234 @@
+"""
+This script describes where the generator reads and writes in the mapping-components project.
+
+The project is described by a JSON config file (generation/project.json, or the file named by the
+MAPPING_PROJECT_CONFIG environment variable) listing any number of merchant modules, each with its four
+direction/conversion message_mappers directories. Without a config file, the dk merchant modules of
+mapping-components-auth-trg are used, as before.
+
+    {
+        "base_dir": "/Source/mapping-components-auth-trg",
+        "field_mappers": {"umm_to_iso": "...", "iso_to_umm": "..."},
+        "mti_helper": ".../MessageTypeIndicatorHelper.java",
+        "default_module": "dk-merchant",
+        "modules": [
+            {
+                "name": "dk-merchant",
+                "directories": {
+                    "inbound/iso_to_umm": "...", "inbound/umm_to_iso": "...",
+                    "outbound/iso_to_umm": "...", "outbound/umm_to_iso": "..."
+                }
+            }
+        ]
+    }
+
+Relative paths are resolved against base_dir (which defaults to /Source/mapping-components-auth-trg, or
+C:/Source/... on Windows). A module may override "field_mappers" and "mti_helper". The config is read and
+resolved once per process.
+"""
+
+import json
+import os
+import platform
+from functools import lru_cache
+from pathlib import Path
+
+CONFIG_PATH = Path("generation/project.json")
+CONFIG_ENV = "MAPPING_PROJECT_CONFIG"
+
+if platform.system() == "Windows":
+    DEFAULT_BASE_DIR = "C:/Source/mapping-components-auth-trg"
+else:
+    DEFAULT_BASE_DIR = "/Source/mapping-components-auth-trg"
+COMMON_JAVA = "mapping-components-auth-trg/src/main/java/eu/nets/mapping/components/auth/trg"
+MERCHANT_JAVA = "src/main/java/eu/nets/mapping/components/auth/trg/dk/merchant"
+DEFAULT_CONFIG = {
+    "field_mappers": {
+        "umm_to_iso": f"{COMMON_JAVA}/umm_to_iso8583/field_mappers",
+        "iso_to_umm": f"{COMMON_JAVA}/iso8583_to_umm/field_mappers",
+    },
+    "mti_helper": f"{COMMON_JAVA}/common/message_function/MessageTypeIndicatorHelper.java",
+    "modules": [
+        {
+            "name": "dk-merchant",
+            "directories": {
+                "inbound/iso_to_umm": f"mapping-components-auth-trg-dk-merchant/{MERCHANT_JAVA}/iso8583_to_umm/message_mappers",
+                "inbound/umm_to_iso": f"mapping-components-auth-trg-dk-merchant/{MERCHANT_JAVA}/umm_to_iso8583/message_mappers",
+                "outbound/iso_to_umm": f"mapping-components-auth-trg-dk-merchant-nds/{MERCHANT_JAVA}/nds/iso8583_to_umm/message_mappers",
+                "outbound/umm_to_iso": f"mapping-components-auth-trg-dk-merchant-nds/{MERCHANT_JAVA}/nds/umm_to_iso8583/message_mappers",
+            },
+        },
+    ],
+}
+DIRECTORY_KEYS = {
+    "inbound/iso_to_umm": ("inbound", "iso_to_umm"),
+    "inbound/umm_to_iso": ("inbound", "umm_to_iso"),
+    "outbound/iso_to_umm": ("outbound", "iso_to_umm"),
+    "outbound/umm_to_iso": ("outbound", "umm_to_iso"),
+}
+ALL_MODULES = "all"
+
+
+def config_path():
+    """
+    Returns the path of the config file: the MAPPING_PROJECT_CONFIG environment variable, or generation/project.json.
+    """
+    return Path(os.environ.get(CONFIG_ENV) or CONFIG_PATH)
+
+
+@lru_cache(maxsize=None)
+def load_config(path=None):
+    """
+    Reads the config file and resolves the paths of every module, once per process and config file.
+
+    Args:
+        path (str): The config file. Defaults to config_path(); the built-in config is used if it does not exist.
+
+    Returns:
+        dict: The resolved config with the keys "path" (the config file, or None for the built-in config),
+            "modules" (name -> module, see resolve_module, in config order) and "default_module".
+
+    Raises:
+        ValueError: If the config is invalid.
+    """
+    path = Path(path) if path else config_path()
+    if path.is_file():
+        with open(path, 'r', encoding='utf-8') as file:
+            try:
+                config = json.load(file)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"{path}: invalid JSON: {error}") from error
+    elif os.environ.get(CONFIG_ENV):
+        raise ValueError(f"Project config {path} not found")
+    else:
+        config, path = DEFAULT_CONFIG, None
+
+    base_dir = Path(config.get("base_dir") or DEFAULT_BASE_DIR)
+    modules = {}
+    for entry in config.get("modules") or []:
+        module = resolve_module(entry, config, base_dir)
+        if module["name"] in modules:
+            raise ValueError(f"{path}: module {module['name']} is defined twice")
+        modules[module["name"]] = module
+    if not modules:
+        raise ValueError(f"{path}: no modules defined")
+
+    default_module = config.get("default_module") or next(iter(modules))
+    if default_module not in modules:
+        raise ValueError(f"{path}: unknown default module {default_module}")
+    return {"path": path, "modules": modules, "default_module": default_module}
+
+
+def resolve_module(entry, config, base_dir):
+    """
+    Resolves the directories of a module of the config.
+
+    Args:
+        entry (dict): The module entry of the config.
+        config (dict): The whole config, holding the defaults for "field_mappers" and "mti_helper".
+        base_dir (Path): The directory relative paths are resolved against.
+
+    Returns:
+        dict: The module with the keys:
+            - "name" (str): The name of the module.
+            - "dir_paths" (dict): (direction, conversion) -> message_mappers directory.
+            - "field_mapper_roots" (dict): conversion -> field_mappers directory.
+            - "mti_helper" (str): The path of MessageTypeIndicatorHelper.java.
+
+    Raises:
+        ValueError: If the entry has no name or does not define the four directories.
+    """
+    name = entry.get("name")
+    if not name:
+        raise ValueError(f"Module without a name: {entry}")
+    directories = entry.get("directories") or {}
+    missing = [key for key in DIRECTORY_KEYS if key not in directories]
+    if missing:
+        raise ValueError(f"Module {name}: missing directories {', '.join(missing)}")
+    unknown = [key for key in directories if key not in DIRECTORY_KEYS]
+    if unknown:
+        raise ValueError(f"Module {name}: unknown directories {', '.join(unknown)}")
+
+    field_mappers = entry.get("field_mappers") or config.get("field_mappers") or {}
+    mti_helper = entry.get("mti_helper") or config.get("mti_helper")
+    if set(field_mappers) != {"umm_to_iso", "iso_to_umm"} or not mti_helper:
+        raise ValueError(f"Module {name}: field_mappers (umm_to_iso, iso_to_umm) and mti_helper are required")
+    return {
+        "name": name,
+        "dir_paths": {DIRECTORY_KEYS[key]: resolve_path(base_dir, path) for key, path in directories.items()},
+        "field_mapper_roots": {conversion: resolve_path(base_dir, path) for conversion, path in field_mappers.items()},
+        "mti_helper": resolve_path(base_dir, mti_helper),
+    }
+
+
+def resolve_path(base_dir, path):
+    """
+    Resolves a path of the config against the base directory, keeping absolute paths.
+
+    Returns:
+        str: The path with forward slashes.
+    """
+    return (base_dir / path).as_posix()
+
+
+def get_module(name=None):
+    """
+    Returns a module of the config.
+
+    Args:
+        name (str): The name of the module. Defaults to the default module of the config.
+
+    Returns:
+        dict: The module, see resolve_module.
+
+    Raises:
+        ValueError: If there is no such module.
+    """
+    config = load_config()
+    name = name or config["default_module"]
+    if name not in config["modules"]:
+        raise ValueError(f"Unknown module {name}, configured modules: {', '.join(config['modules'])}")
+    return config["modules"][name]
+
+
+def get_modules(names=None):
+    """
+    Returns the modules selected by a comma separated list of names.
+
+    Args:
+        names (str): The module names, or "all". Defaults to all modules.
+
+    Returns:
+        list: The modules, see resolve_module.
+
+    Raises:
+        ValueError: If a module is unknown.
+    """
+    if not names or names == ALL_MODULES:
+        return list(load_config()["modules"].values())
+    return [get_module(name.strip()) for name in names.split(",") if name.strip()]
+
+
+def is_default_module(module):
+    """
+    Checks whether a module is the default module of the config.
+    """
+    return module["name"] == load_config()["default_module"]
+
+
+def module_cache_path(path, module):
+    """
+    Returns the cache file of a module: the path itself for the default module, suffixed with the module name
+    otherwise, so that the modules do not overwrite each other's caches.
+
+    Args:
+        path (Path): The cache file of the default module.
+        module (dict): The module.
+
+    Returns:
+        Path: The cache file.
+    """
+    path = Path(path)
+    if is_default_module(module):
+        return path
+    return path.with_name(f"{path.stem}-{module['name']}{path.suffix}")
@@ -0,0 +1,78 @@
+"""
+This script renders many mapper classes at once: the templates are rendered in a thread pool and all output files
+are written in a single changeset afterwards.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import changeset
+import instrumentation
+import generate_setup as setup
+
+
+def render_jobs(jobs, max_workers=None, output_dirs=None):
+    """
+    Renders mapper classes in a thread pool.
+
+    Args:
+        jobs (list): (message_function_description, message_function, direction, directional_conversion) tuples.
+        max_workers (int): The number of render threads. Defaults to the executor's default.
+        output_dirs (dict): (direction, conversion) -> output directory. Defaults to generate_setup.dir_paths.
+
+    Returns:
+        list: (file_path, rendered) tuples in job order.
+    """
+    with instrumentation.span("render.batch", classes=len(jobs)):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda job: setup.render_mapper_class(*job, output_dirs=output_dirs), jobs))
+
+
+def write_rendered(rendered_files):
+    """
+    Writes rendered mapper classes, skipping the files that already exist.
+
+    Every output directory is listed once per process instead of checking each file separately, see
+    changeset.list_directory. The files are committed together through the changeset writer, or staged in the
+    transaction in progress if there is one.
+
+    Args:
+        rendered_files (list): (file_path, rendered) tuples.
+
+    Returns:
+        tuple: A tuple containing:
+            - generated (list): The paths of the written files.
+            - skipped (list): The paths of the files that already existed.
+    """
+    generated = []
+    skipped = []
+    changeset.prefetch_listings(os.path.dirname(file_path) for file_path, _ in rendered_files)
+    with changeset.transaction():
+        for file_path, rendered in rendered_files:
+            if changeset.exists(file_path):
+                skipped.append(file_path)
+                continue
+            changeset.write_file(file_path, rendered)
+            generated.append(file_path)
+    return generated, skipped
+
+
+def generate_mapper_classes(jobs, max_workers=None, output_dirs=None, verbose=True):
+    """
+    Renders and writes many mapper classes.
+
+    Args:
+        jobs (list): (message_function_description, message_function, direction, directional_conversion) tuples.
+        max_workers (int): The number of render threads. Defaults to the executor's default.
+        output_dirs (dict): (direction, conversion) -> output directory. Defaults to generate_setup.dir_paths.
+        verbose (bool): Whether to print every generated and skipped file.
+
+    Returns:
+        tuple: The generated and the skipped file paths, see write_rendered.
+    """
+    generated, skipped = write_rendered(render_jobs(jobs, max_workers, output_dirs))
+    if verbose:
+        for file_path in generated:
+            setup.report_generated(file_path)
+        for file_path in skipped:
+            setup.report_existing(file_path)
+    return generated, skipped
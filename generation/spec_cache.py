@@ -0,0 +1,206 @@
+"""
+This script caches the data extracted from the Excel mapping specification on disk, keyed by the workbook content.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from termcolor import colored
+import instrumentation
+import spec_reader
+
+# Cache location and size limit
+CACHE_DIR = Path("generation/.cache/specs")
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+# Sheet name keying the specs of all mapping sheets of a workbook; Excel does not allow "*" in sheet names
+ALL_SHEETS = "*"
+
+
+def hash_file(file_path):
+    """
+    Computes the SHA-256 hash of a file's content.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash, sheet_name=None):
+    """
+    Builds the cache key of a spec from the workbook hash, the selected sheet and the extractor version.
+
+    Args:
+        content_hash (str): The SHA-256 hash of the workbook.
+        sheet_name (str): The name of the extracted sheet, or None for the first sheet.
+
+    Returns:
+        str: The cache key.
+    """
+    sheet_part = hashlib.sha256((sheet_name or "").encode("utf-8")).hexdigest()[:12]
+    return f"{content_hash}-{sheet_part}-v{spec_reader.EXTRACTOR_VERSION}"
+
+
+def load_spec(file_path, sheet_name=None, cache_dir=CACHE_DIR, content_hash=None, verbose=True):
+    """
+    Loads the extracted spec of a workbook from the cache, extracting and caching it on a miss.
+
+    Args:
+        file_path (str): The path to the Excel file.
+        sheet_name (str): The name of the sheet to read. Defaults to the first sheet of the workbook.
+        cache_dir (Path): The cache directory.
+        content_hash (str): The SHA-256 hash of the workbook, if already known.
+        verbose (bool): Whether to report the cache hit or miss.
+
+    Returns:
+        tuple: A tuple containing:
+            - spec (dict): The extracted spec, see spec_reader.read_spec.
+            - cache_hit (bool): Whether the spec was served from the cache.
+    """
+    with instrumentation.span("spec.load", path=str(file_path), sheet=sheet_name) as attributes:
+        cache_dir = Path(cache_dir)
+        if content_hash is None:
+            content_hash = hash_file(file_path)
+        entry_path = cache_dir / f"{cache_key(content_hash, sheet_name)}.json"
+
+        spec = read_entry(entry_path)
+        attributes["cache_hit"] = spec is not None
+        if spec is not None:
+            report_cache_hit(file_path, verbose)
+            return spec, True
+
+        report_cache_miss(file_path, "extracting workbook", verbose)
+        spec = spec_reader.read_spec(file_path, sheet_name)
+        write_entry(entry_path, spec)
+        evict(cache_dir)
+        return spec, False
+
+
+def load_workbook_specs(file_path, cache_dir=CACHE_DIR, content_hash=None, verbose=True):
+    """
+    Returns the specs of every mapping sheet of a workbook from the cache, extracting the workbook in one pass on a miss.
+
+    Args:
+        file_path (str): The path to the Excel file.
+        cache_dir (Path): The cache directory.
+        content_hash (str): The SHA-256 hash of the workbook, if already known.
+        verbose (bool): Whether to report the cache hit or miss.
+
+    Returns:
+        tuple: A tuple containing:
+            - specs (list): The extracted specs, see spec_reader.read_workbook_specs.
+            - skipped (list): (sheet, reason) pairs for the sheets that are not mapping sheets.
+            - cache_hit (bool): Whether the specs were served from the cache.
+    """
+    with instrumentation.span("spec.load", path=str(file_path), sheet=ALL_SHEETS) as attributes:
+        cache_dir = Path(cache_dir)
+        if content_hash is None:
+            content_hash = hash_file(file_path)
+        entry_path = cache_dir / f"{cache_key(content_hash, ALL_SHEETS)}.json"
+
+        entry = read_entry(entry_path)
+        attributes["cache_hit"] = entry is not None
+        if entry is not None:
+            report_cache_hit(file_path, verbose)
+            return entry["specs"], [tuple(item) for item in entry["skipped"]], True
+
+        report_cache_miss(file_path, "extracting all sheets", verbose)
+        specs, skipped = spec_reader.read_workbook_specs(file_path)
+        write_entry(entry_path, {"specs": specs, "skipped": skipped})
+        evict(cache_dir)
+        return specs, skipped, False
+
+
+def report_cache_hit(file_path, verbose):
+    """
+    Reports a spec cache hit, on the console when verbose.
+    """
+    console = "Spec cache " + colored("hit", 'green') + " for " + colored(str(file_path), 'yellow') if verbose else None
+    instrumentation.event("spec_cache.hit", console, path=str(file_path))
+
+
+def report_cache_miss(file_path, action, verbose):
+    """
+    Reports a spec cache miss and what is done about it, on the console when verbose.
+    """
+    console = None
+    if verbose:
+        console = "Spec cache " + colored("miss", 'yellow') + " for " + colored(str(file_path), 'yellow') + f", {action}"
+    instrumentation.event("spec_cache.miss", console, path=str(file_path))
+
+
+def read_entry(entry_path):
+    """
+    Reads a cache entry and marks it as recently used.
+
+    Args:
+        entry_path (Path): The path of the cache entry.
+
+    Returns:
+        dict: The cached spec, or None if the entry is missing or unreadable.
+    """
+    try:
+        with open(entry_path, 'r', encoding='utf-8') as file:
+            spec = json.load(file)
+    except (OSError, ValueError):
+        return None
+    os.utime(entry_path)
+    return spec
+
+
+def write_entry(entry_path, spec):
+    """
+    Writes a cache entry atomically, so that concurrent runs never read a partial entry.
+
+    Args:
+        entry_path (Path): The path of the cache entry.
+        spec (dict): The spec to cache.
+
+    Returns:
+        None
+    """
+    entry_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(spec, file, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp_path, entry_path)
+
+
+def evict(cache_dir, max_bytes=MAX_CACHE_BYTES):
+    """
+    Removes the least recently used cache entries until the cache fits into the size limit.
+
+    Args:
+        cache_dir (Path): The cache directory.
+        max_bytes (int): The maximum total size of the cache entries.
+
+    Returns:
+        int: The number of evicted entries.
+    """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".json"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+        evicted += 1
+    return evicted
@@ -0,0 +1,317 @@
+"""
+This script compares two versions of the spec workbooks and feeds only what changed to the generator.
+
+Both versions (a workbook, a directory of workbooks or a JSON manifest each) are extracted through the spec cache
+and normalized into records keyed by message function, holding the message type indicators and the field mapping
+rows keyed by data element. The diff lists what was added, removed or changed:
+
+    - message_function: a message function appeared or disappeared, or its description changed
+    - mti: a message type indicator of a message function was added or removed
+    - data_element: a data element became mapped or unmapped, or its ISO20022 mapping changed
+
+With --apply, only the additions are fed to the generator: the mapper classes of new message functions are
+generated, the new message type indicators are mapped and the newly mapped data elements are wired into the
+UMM to ISO message mappers, all in a single changeset. Removals and changes are reported, the generator never
+deletes code.
+
+Usage (from the repository root):
+    python generation/spec_diff.py <old workbook | directory | manifest.json> <new ...> [--directions 1,2,3,4]
+                                   [--modules all | name,...] [--apply] [--dry-run] [--format text|json]
+"""
+
+import argparse
+import json
+import sys
+from termcolor import colored
+import cli
+import changeset
+import generate_setup as setup
+import instrumentation
+import project_config
+import spec_reader
+import validator
+
+MESSAGE_FUNCTION = "message_function"
+MTI = "mti"
+DATA_ELEMENT = "data_element"
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+CHANGE_COLORS = {ADDED: 'green', REMOVED: 'red', CHANGED: 'yellow'}
+
+
+def load_records(source, workers=None):
+    """
+    Loads the specs of a version and normalizes them into records keyed by message function.
+
+    The sheets that are not mapping sheets are not compared; they are reported, so that a changed response sheet
+    does not go unnoticed.
+
+    Args:
+        source (str): A workbook, a directory containing spec workbooks or a JSON manifest, see validator.collect_jobs.
+        workers (int): The number of worker processes used to load the workbooks.
+
+    Returns:
+        dict: message function -> record, see normalize_specs.
+    """
+    with instrumentation.span("spec_diff.load", source=str(source)) as attributes:
+        specs, skipped = validator.load_specs(validator.collect_jobs([source]), workers)
+        attributes.update(sheets=len(specs), skipped=len(skipped))
+        if skipped:
+            sheets = [sheet for _, sheet, _ in skipped]
+            instrumentation.event("spec_diff.skipped", colored(f"Skipped {len(sheets)} sheets of {source} that are not "
+                                                               f"mapping sheets: {', '.join(sheets)}", 'yellow'),
+                                  source=str(source), sheets=sheets)
+        return normalize_specs(specs)
+
+
+def normalize_specs(specs):
+    """
+    Normalizes extracted specs into records keyed by message function.
+
+    A message function spread over several sheets gets one record; its data elements are merged, a data element
+    mapped on one of the sheets counting as mapped.
+
+    Args:
+        specs (list): (workbook, description, spec) tuples, see validator.load_specs.
+
+    Returns:
+        dict: message function -> dict with the keys "description", "workbook", "sheet" (the first sheet of the
+            message function), "message_type_indicators" (set) and "fields" (data element -> dict with the keys
+            "name", "iso20022" (tuple) and "mapped").
+    """
+    records = {}
+    for workbook, description, spec in specs:
+        record = records.setdefault(spec["message_function"], {
+            "description": description,
+            "workbook": workbook,
+            "sheet": spec["sheet"],
+            "message_type_indicators": set(),
+            "fields": {},
+        })
+        record["message_type_indicators"].update(spec_reader.split_message_type_indicators(spec["message_type_indicator"]))
+        for field in spec["fields"]:
+            entry = {
+                "name": field["name"],
+                "iso20022": tuple(field["iso20022"]),
+                "mapped": spec_reader.is_mapped_field(field),
+            }
+            if entry["mapped"] or field["data_element"] not in record["fields"]:
+                record["fields"][field["data_element"]] = entry
+    return records
+
+
+def record_spec(function, record):
+    """
+    Rebuilds a spec from the record of a message function, with the data elements of all its sheets.
+
+    Args:
+        function (str): The message function.
+        record (dict): The record, see normalize_specs.
+
+    Returns:
+        dict: The spec, see spec_reader.read_spec.
+    """
+    return {
+        "sheet": record["sheet"],
+        "message_function": function,
+        "message_type_indicator": "/".join(sorted(record["message_type_indicators"])),
+        "fields": [{"data_element": num, "name": field["name"], "iso20022": list(field["iso20022"])}
+                   for num, field in sorted(record["fields"].items())],
+    }
+
+
+def change(kind, status, message_function, detail, value=None):
+    """
+    Builds a change, see diff_records.
+    """
+    return {"kind": kind, "change": status, "message_function": message_function, "value": value, "detail": detail}
+
+
+def diff_records(old, new):
+    """
+    Compares the records of two versions.
+
+    Args:
+        old (dict): The records of the old version, see normalize_specs.
+        new (dict): The records of the new version.
+
+    Returns:
+        list: The changes as dicts with the keys "kind" (message_function, mti or data_element), "change" (added,
+            removed or changed), "message_function", "value" (the message type indicator or the data element)
+            and "detail", sorted by message function.
+    """
+    changes = []
+    for function in sorted(old.keys() | new.keys()):
+        before, after = old.get(function), new.get(function)
+        if before is None:
+            changes.append(change(MESSAGE_FUNCTION, ADDED, function, f"{after['description']} ({after['sheet']})"))
+            changes += [change(MTI, ADDED, function, f"MTI {mti}", mti) for mti in sorted(after["message_type_indicators"])]
+            changes += [change(DATA_ELEMENT, ADDED, function, f"DE{num} {field['name']}", num)
+                        for num, field in sorted(after["fields"].items()) if field["mapped"]]
+            continue
+        if after is None:
+            changes.append(change(MESSAGE_FUNCTION, REMOVED, function, f"{before['description']} ({before['sheet']})"))
+            continue
+        if before["description"] != after["description"]:
+            changes.append(change(MESSAGE_FUNCTION, CHANGED, function,
+                                  f"description {before['description']} -> {after['description']}"))
+        changes += diff_message_type_indicators(function, before, after)
+        changes += diff_fields(function, before["fields"], after["fields"])
+    return changes
+
+
+def diff_message_type_indicators(function, before, after):
+    """
+    Compares the message type indicators of a message function in two versions.
+
+    Returns:
+        list: The changes, see diff_records.
+    """
+    old, new = before["message_type_indicators"], after["message_type_indicators"]
+    return ([change(MTI, ADDED, function, f"MTI {mti}", mti) for mti in sorted(new - old)]
+            + [change(MTI, REMOVED, function, f"MTI {mti}", mti) for mti in sorted(old - new)])
+
+
+def diff_fields(function, before, after):
+    """
+    Compares the field mapping rows of a message function in two versions.
+
+    Args:
+        function (str): The message function.
+        before (dict): data element -> field of the old version, see normalize_specs.
+        after (dict): data element -> field of the new version.
+
+    Returns:
+        list: The changes, see diff_records.
+    """
+    changes = []
+    mapped_before = {num for num, field in before.items() if field["mapped"]}
+    mapped_after = {num for num, field in after.items() if field["mapped"]}
+    for num in sorted(mapped_before | mapped_after):
+        if num not in mapped_before:
+            changes.append(change(DATA_ELEMENT, ADDED, function, f"DE{num} {after[num]['name']}", num))
+        elif num not in mapped_after:
+            changes.append(change(DATA_ELEMENT, REMOVED, function, f"DE{num} {before[num]['name']}", num))
+        elif before[num]["iso20022"] != after[num]["iso20022"] or before[num]["name"] != after[num]["name"]:
+            changes.append(change(DATA_ELEMENT, CHANGED, function, f"DE{num} {after[num]['name']}: "
+                                  f"{', '.join(before[num]['iso20022'])} -> {', '.join(after[num]['iso20022'])}", num))
+    return changes
+
+
+def apply_changes(changes, new, directions, modules=None):
+    """
+    Feeds the additions of a diff to the generator: mapper classes of new message functions, new message type
+    indicator mappings and newly mapped data elements. Everything is staged in the transaction in progress, or
+    committed together at the end.
+
+    Args:
+        changes (list): The changes, see diff_records.
+        new (dict): The records of the new version, see normalize_specs.
+        directions (list): The direction keys to generate, see generate_setup.directions_map.
+        modules (list): The modules to update, see project_config.get_modules. Defaults to the selected module.
+
+    Returns:
+        None
+    """
+    import add_mapper_UMM2ISO as mapper
+    import render_service
+
+    added = [item for item in changes if item["change"] == ADDED]
+    new_functions = [item["message_function"] for item in added if item["kind"] == MESSAGE_FUNCTION]
+    mappings = sorted({(item["message_function"], item["value"]) for item in added if item["kind"] == MTI},
+                      key=lambda pair: pair[1])
+    fields = {}
+    for item in added:
+        if item["kind"] == DATA_ELEMENT:
+            fields.setdefault(item["message_function"], set()).add(item["value"])
+    conversions = [setup.directions_map[key] for key in directions]
+    wired_directions = [direction for direction, conversion in conversions if conversion == "umm_to_iso"]
+
+    previous_module = setup.module_name
+    modules = modules or [project_config.get_module(previous_module)]
+    try:
+        with changeset.transaction(), instrumentation.span("spec_diff.apply", functions=len(new_functions),
+                                                           mappings=len(mappings), fields=sum(map(len, fields.values()))):
+            if mappings:
+                # Modules sharing a helper get its mappings once
+                for mti_helper_path in dict.fromkeys(module["mti_helper"] for module in modules):
+                    setup.update_message_type_indicators(mappings, mti_helper_path)
+            for module in modules:
+                setup.use_module(module["name"])
+                mapper.get_field_mapper_catalog.cache_clear()
+                render_service.generate_mapper_classes(
+                    [(new[function]["description"], function, direction, conversion)
+                     for function in new_functions for direction, conversion in conversions])
+                changeset.prefetch(mapper.message_mapper_path(new[function]["description"], direction, "umm_to_iso")
+                                   for function in fields for direction in wired_directions)
+                # The data elements are wired from the record, which merges every sheet of the message function
+                for function, data_elements in sorted(fields.items()):
+                    if wired_directions:
+                        mapper.implement_spec_fields(record_spec(function, new[function]), new[function]["description"],
+                                                     wired_directions, "umm_to_iso", data_elements)
+    finally:
+        setup.use_module(previous_module)
+        mapper.get_field_mapper_catalog.cache_clear()
+
+
+def format_change(item):
+    """
+    Formats a change as one line of console output.
+    """
+    return (colored(f"{item['change']:<8}", CHANGE_COLORS[item["change"]]) + f" {item['kind']:<16} "
+            + colored(item["message_function"], 'yellow') + f": {item['detail']}")
+
+
+def print_changes(changes):
+    """
+    Prints the changes followed by a summary.
+
+    Args:
+        changes (list): The changes, see diff_records.
+
+    Returns:
+        None
+    """
+    for item in changes:
+        instrumentation.event("spec_diff.change", format_change(item), **item)
+    counts = ", ".join(f"{sum(item['change'] == status for item in changes)} {status}" for status in (ADDED, REMOVED, CHANGED))
+    instrumentation.event("spec_diff.summary", colored(f"Spec diff: {counts}.", 'green' if not changes else 'yellow'),
+                          changes=len(changes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two spec versions and generate only what changed.")
+    parser.add_argument("old", help="old spec: workbook, directory containing spec workbooks or JSON manifest")
+    parser.add_argument("new", help="new spec: workbook, directory containing spec workbooks or JSON manifest")
+    cli.add_directions_argument(parser, "generate")
+    parser.add_argument("--modules", default="all",
+                        help="comma separated modules of the project config to update (default: %(default)s)")
+    parser.add_argument("--apply", action="store_true", help="generate the added message functions, MTIs and fields")
+    parser.add_argument("--dry-run", action="store_true", help="with --apply, print the unified diff instead of writing the files")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        modules = project_config.get_modules(args.modules)
+    except ValueError as error:
+        parser.error(str(error))
+
+    with instrumentation.profiling(args.profile, args.profile_format, sys.argv):
+        new = load_records(args.new, args.workers)
+        changes = diff_records(load_records(args.old, args.workers), new)
+        if args.format == "json":
+            json.dump(changes, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            print_changes(changes)
+        if args.apply and any(item["change"] == ADDED for item in changes):
+            with changeset.transaction(dry_run=args.dry_run):
+                apply_changes(changes, new, args.directions, modules)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
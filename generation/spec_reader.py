@@ -0,0 +1,345 @@
+"""
+This script reads the Excel mapping specification workbooks row by row, without loading whole sheets into memory.
+"""
+
+import os
+import re
+import instrumentation
+
+# Layout of the mapping specification sheets
+ISO20022_HEADER = "ISO20022"
+HEADER_ROW_INDEX = 0
+MESSAGE_FUNCTION_ROW_INDEX = 3
+MESSAGE_TYPE_IDENTIFIER_LABEL = "Message Type Identifier"
+MESSAGE_TYPE_INDICATOR_COLUMN_OFFSET = 5
+MESSAGE_FUNCTION_VALUE_SEPARATOR = ", value "
+DATA_ELEMENT_COLUMN_INDEX = 0
+DATA_ELEMENT_NAME_COLUMN_INDEX = 1
+# ISO20022 cells naming a UMM element or a data element mapping sheet, as opposed to "NA", "in progress" or notes
+MAPPED_ELEMENT_PATTERN = re.compile(r"^(UniMessage\.|DE\d+)")
+
+# Version of the extraction logic, bump it whenever the shape or content of the extracted spec changes
+EXTRACTOR_VERSION = 2
+
+
+def open_workbook(file_path):
+    """
+    Opens an Excel workbook in read-only streaming mode.
+
+    Args:
+        file_path (str): The path to the Excel file.
+
+    Returns:
+        Workbook: The read-only workbook. The caller is responsible for closing it.
+    """
+    # Imported on first use, openpyxl is only needed when a workbook is actually read
+    from openpyxl import load_workbook
+
+    return load_workbook(file_path, read_only=True, data_only=True)
+
+
+def select_sheet(workbook, sheet_name=None):
+    """
+    Selects a sheet of the workbook.
+
+    Args:
+        workbook (Workbook): The workbook to select the sheet from.
+        sheet_name (str): The name of the sheet. Defaults to the first sheet of the workbook.
+
+    Returns:
+        Worksheet: The selected sheet.
+    """
+    if sheet_name is None:
+        return workbook.worksheets[0]
+    return workbook[sheet_name]
+
+
+def parse_message_function(raw_value):
+    """
+    Extracts the message function code from an ISO20022 cell, e.g. "UniMessage.Hdr.MsgFctn, value FNCQ".
+
+    Args:
+        raw_value (str): The raw cell value.
+
+    Returns:
+        str: The message function code.
+    """
+    if MESSAGE_FUNCTION_VALUE_SEPARATOR in raw_value:
+        return raw_value.split(MESSAGE_FUNCTION_VALUE_SEPARATOR)[-1]
+    return raw_value
+
+
+def list_sheets(file_path):
+    """
+    Lists the sheet names of a workbook.
+
+    Args:
+        file_path (str): The path to the Excel file.
+
+    Returns:
+        list: The sheet names in workbook order.
+    """
+    workbook = open_workbook(file_path)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def describe_message_function(sheet_title):
+    """
+    Derives the message function description from a sheet title, e.g. "1200 Financial Request" -> "Financial Request".
+
+    Args:
+        sheet_title (str): The title of the mapping sheet.
+
+    Returns:
+        str: The message function description, usable as a Java class name once the spaces are removed.
+    """
+    words = re.sub(r"^[\d/\s]+", "", sheet_title)
+    return " ".join(word[:1].upper() + word[1:] for word in re.findall(r"[A-Za-z0-9]+", words))
+
+
+def read_message_header(file_path, sheet_name=None):
+    """
+    Streams the rows of a mapping sheet until the message function and the message type indicator are found.
+
+    Args:
+        file_path (str): The path to the Excel file.
+        sheet_name (str): The name of the sheet to read. Defaults to the first sheet of the workbook.
+
+    Returns:
+        tuple: A tuple containing the extracted values:
+            - message_function (str): The extracted message function.
+            - message_type_indicator (str): The extracted message type indicator.
+    """
+    with instrumentation.span("excel.extract", path=str(file_path), bytes=os.path.getsize(file_path), sheets=1):
+        workbook = open_workbook(file_path)
+        try:
+            return scan_message_header(select_sheet(workbook, sheet_name).iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+
+def read_spec(file_path, sheet_name=None):
+    """
+    Streams a whole mapping sheet and extracts the message header together with the field mapping rows.
+
+    Args:
+        file_path (str): The path to the Excel file.
+        sheet_name (str): The name of the sheet to read. Defaults to the first sheet of the workbook.
+
+    Returns:
+        dict: The extracted spec with the keys "sheet", "message_function", "message_type_indicator" and "fields".
+            Each field is a dict with the keys "data_element", "name" and "iso20022" (the ISO20022 elements
+            listed on the data element row and its subfield rows).
+    """
+    with instrumentation.span("excel.extract", path=str(file_path), bytes=os.path.getsize(file_path), sheets=1):
+        workbook = open_workbook(file_path)
+        try:
+            return extract_sheet_spec(select_sheet(workbook, sheet_name))
+        finally:
+            workbook.close()
+
+
+def read_workbook_specs(file_path):
+    """
+    Streams every sheet of a workbook in a single pass and extracts the specs of the mapping sheets.
+
+    Args:
+        file_path (str): The path to the Excel file.
+
+    Returns:
+        tuple: A tuple containing:
+            - specs (list): The extracted specs, see read_spec.
+            - skipped (list): (sheet, reason) pairs for the sheets that do not follow the spec layout, e.g. the
+              response sheets and the data element value sheets.
+    """
+    with instrumentation.span("excel.extract", path=str(file_path), bytes=os.path.getsize(file_path)) as attributes:
+        workbook = open_workbook(file_path)
+        try:
+            specs = []
+            skipped = []
+            for sheet in workbook.worksheets:
+                try:
+                    specs.append(extract_sheet_spec(sheet))
+                except (ValueError, TypeError) as error:
+                    skipped.append((sheet.title, str(error)))
+            attributes.update(sheets=len(workbook.worksheets), skipped=len(skipped))
+            return specs, skipped
+        finally:
+            workbook.close()
+
+
+def extract_sheet_spec(sheet):
+    """
+    Extracts the spec of an open mapping sheet.
+
+    Args:
+        sheet (Worksheet): The read-only worksheet.
+
+    Returns:
+        dict: The extracted spec, see read_spec.
+    """
+    rows = iter(sheet.iter_rows(values_only=True))
+    iso_column_index, message_function, message_type_indicator = scan_header(rows)
+    return {
+        "sheet": sheet.title,
+        "message_function": message_function,
+        "message_type_indicator": message_type_indicator,
+        "fields": scan_field_mappings(rows, iso_column_index),
+    }
+
+
+def scan_message_header(rows):
+    """
+    Scans sheet rows for the message function and the message type indicator, stopping as soon as both are found.
+
+    Args:
+        rows (iterable): The rows of the sheet as tuples of cell values.
+
+    Returns:
+        tuple: A tuple containing the message function and the message type indicator.
+
+    Raises:
+        ValueError: If the sheet does not follow the mapping specification layout.
+    """
+    _, message_function, message_type_indicator = scan_header(rows)
+    return message_function, message_type_indicator
+
+
+def scan_header(rows):
+    """
+    Consumes sheet rows up to the message function row and the "Message Type Identifier" row.
+
+    Args:
+        rows (iterator): The rows of the sheet as tuples of cell values.
+
+    Returns:
+        tuple: The index of the ISO20022 column, the message function and the message type indicator.
+
+    Raises:
+        ValueError: If the sheet does not follow the mapping specification layout.
+    """
+    iso_column_index = None
+    message_function = None
+    message_type_indicator = None
+    message_type_indicator_found = False
+
+    for row_index, row in enumerate(rows):
+        if row_index == HEADER_ROW_INDEX:
+            if ISO20022_HEADER not in row:
+                raise ValueError(f"'{ISO20022_HEADER}' header not found in the first row of the sheet")
+            iso_column_index = row.index(ISO20022_HEADER)
+        elif row_index == MESSAGE_FUNCTION_ROW_INDEX:
+            message_function = parse_message_function(cell_at(row, iso_column_index))
+
+        if not message_type_indicator_found:
+            for column_index, value in enumerate(row):
+                if value is not None and MESSAGE_TYPE_IDENTIFIER_LABEL in str(value):
+                    message_type_indicator = cell_at(row, column_index + MESSAGE_TYPE_INDICATOR_COLUMN_OFFSET)
+                    message_type_indicator_found = True
+                    break
+
+        if row_index >= MESSAGE_FUNCTION_ROW_INDEX and message_type_indicator_found:
+            return iso_column_index, message_function, message_type_indicator
+
+    if iso_column_index is None or message_function is None:
+        raise ValueError("Message function row not found in the sheet")
+    raise ValueError(f"'{MESSAGE_TYPE_IDENTIFIER_LABEL}' not found in the sheet")
+
+
+def scan_field_mappings(rows, iso_column_index):
+    """
+    Collects the field mapping rows following the message header.
+
+    A row starting with a data element number opens a new field, the rows below it without a number
+    are its subfields and contribute their ISO20022 elements to it.
+
+    Args:
+        rows (iterable): The remaining rows of the sheet as tuples of cell values.
+        iso_column_index (int): The index of the ISO20022 column.
+
+    Returns:
+        list: The field mappings in sheet order.
+    """
+    fields = []
+    current_field = None
+    for row in rows:
+        data_element = parse_data_element(cell_at(row, DATA_ELEMENT_COLUMN_INDEX))
+        if data_element is not None:
+            name = cell_at(row, DATA_ELEMENT_NAME_COLUMN_INDEX)
+            current_field = {
+                "data_element": data_element,
+                "name": str(name).strip() if name is not None else "",
+                "iso20022": [],
+            }
+            fields.append(current_field)
+        elif current_field is None:
+            continue
+
+        iso_value = cell_at(row, iso_column_index)
+        if iso_value is not None and str(iso_value).strip():
+            current_field["iso20022"].append(str(iso_value).strip())
+    return fields
+
+
+def split_message_type_indicators(value):
+    """
+    Splits a message type indicator cell listing several indicators, e.g. "1220/1221".
+
+    Args:
+        value (object): The message type indicator cell value.
+
+    Returns:
+        list: The message type indicators as strings.
+    """
+    return [part.strip() for part in str(value).split("/") if part.strip()]
+
+
+def is_mapped_field(field):
+    """
+    Checks whether the spec maps a data element to ISO20022.
+
+    Args:
+        field (dict): The field mapping, see scan_field_mappings.
+
+    Returns:
+        bool: True if the field or one of its subfields names a UMM element or a data element mapping sheet.
+    """
+    return any(MAPPED_ELEMENT_PATTERN.match(value) for value in field["iso20022"])
+
+
+def parse_data_element(value):
+    """
+    Parses a data element number from the first cell of a row.
+
+    Args:
+        value (object): The cell value.
+
+    Returns:
+        int: The data element number, or None if the cell does not hold one.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+
+def cell_at(row, column_index):
+    """
+    Returns the value of a cell, treating cells past the end of a short row as empty.
+
+    Args:
+        row (tuple): The row as a tuple of cell values.
+        column_index (int): The index of the column.
+
+    Returns:
+        object: The cell value, or None if the cell is empty.
+    """
+    return row[column_index] if column_index < len(row) else None
@@ -0,0 +1,129 @@
+"""
+Tests of the changeset writer: transactions, dry runs, the all-or-nothing commit and the content cache.
+
+Run from the repository root:
+    python -m pytest generation/tests
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import changeset  # noqa: E402
+
+
+class ChangesetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.existing = str(self.root / "Existing.java")
+        self.created = str(self.root / "Created.java")
+        Path(self.existing).write_text("original\r\n", encoding="utf-8", newline="")
+        changeset.forget_listings()
+        changeset.forget_contents()
+
+    def tearDown(self):
+        changeset.forget_listings()
+        changeset.forget_contents()
+        self.tmp_dir.cleanup()
+
+    def read(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            return file.read()
+
+    def leftovers(self):
+        return [name for name in os.listdir(self.root) if name.endswith(".tmp")]
+
+    def test_write_outside_a_transaction(self):
+        changeset.write_file(self.existing, "changed\r\n")
+        self.assertEqual(self.read(self.existing), "changed\r\n")
+
+    def test_transaction_commits_at_the_end(self):
+        with changeset.transaction():
+            changeset.write_file(self.existing, "changed")
+            changeset.write_file(self.created, "created")
+            self.assertEqual(self.read(self.existing), "original\r\n")
+            self.assertFalse(os.path.exists(self.created))
+            self.assertEqual(changeset.read_file(self.existing), "changed")
+            self.assertTrue(changeset.exists(self.created))
+        self.assertEqual((self.read(self.existing), self.read(self.created)), ("changed", "created"))
+        self.assertTrue(changeset.exists(self.created))
+
+    def test_nested_transaction_joins(self):
+        with changeset.transaction():
+            with changeset.transaction():
+                changeset.write_file(self.created, "created")
+            self.assertFalse(os.path.exists(self.created))
+        self.assertEqual(self.read(self.created), "created")
+
+    def test_dry_run_prints_the_diff(self):
+        output = io.StringIO()
+        with changeset.transaction(dry_run=True, output=output):
+            self.assertTrue(changeset.is_dry_run())
+            changeset.write_file(self.existing, "changed\r\n")
+            changeset.write_file(self.created, "created\n")
+        self.assertFalse(changeset.is_dry_run())
+        self.assertEqual(self.read(self.existing), "original\r\n")
+        self.assertFalse(os.path.exists(self.created))
+        diff = output.getvalue()
+        self.assertIn("-original\r\n+changed\r\n", diff)
+        self.assertIn("--- /dev/null", diff)
+
+    def test_nothing_is_written_when_the_block_raises(self):
+        with self.assertRaises(RuntimeError):
+            with changeset.transaction():
+                changeset.write_file(self.existing, "changed")
+                raise RuntimeError("abort")
+        self.assertEqual(self.read(self.existing), "original\r\n")
+
+    def test_failed_commit_rolls_back(self):
+        replace = os.replace
+        created = self.created
+
+        def fail_on_created(source, target):
+            if target == created and source.endswith(".tmp") and not os.path.exists(created):
+                raise OSError("disk full")
+            replace(source, target)
+
+        with mock.patch.object(changeset.os, "replace", side_effect=fail_on_created):
+            with self.assertRaises(OSError):
+                with changeset.transaction():
+                    changeset.write_file(self.existing, "changed")
+                    changeset.write_file(self.created, "created")
+        self.assertEqual(self.read(self.existing), "original\r\n")
+        self.assertFalse(os.path.exists(self.created))
+        self.assertEqual(self.leftovers(), [])
+
+    def test_rollback_removes_created_files(self):
+        changeset.write_file(self.created, "created")
+        changeset.rollback([(os.path.abspath(self.created), None), (os.path.abspath(self.existing), "restored")])
+        self.assertFalse(os.path.exists(self.created))
+        self.assertEqual(self.read(self.existing), "restored")
+
+    def test_content_cache_is_invalidated_on_write(self):
+        self.assertEqual(changeset.read_file(self.existing), "original\r\n")
+        self.assertIn(os.path.abspath(self.existing), changeset.contents)
+        changeset.write_file(self.existing, "changed")
+        self.assertNotIn(os.path.abspath(self.existing), changeset.contents)
+        self.assertEqual(changeset.read_file(self.existing), "changed")
+
+    def test_prefetch_fills_the_content_cache(self):
+        paths = [str(self.root / f"File{i}.java") for i in range(5)]
+        for path in paths:
+            Path(path).write_text(path, encoding="utf-8")
+        self.assertEqual(changeset.prefetch(paths + [str(self.root / "Missing.java")]), 6)
+        self.assertEqual(changeset.prefetch(paths), 0)
+        with mock.patch.object(changeset, "open", side_effect=AssertionError("read from disk"), create=True):
+            self.assertEqual([changeset.read_file(path) for path in paths], paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
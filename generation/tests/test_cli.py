@@ -0,0 +1,47 @@
+"""
+Tests of the shared command line options.
+
+Run from the repository root:
+    python -m pytest generation/tests
+"""
+
+import argparse
+import io
+import sys
+import unittest
+from contextlib import redirect_stderr
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import cli  # noqa: E402
+import generate_setup as setup  # noqa: E402
+
+
+class DirectionsArgumentTest(unittest.TestCase):
+
+    def parse(self, *argv):
+        parser = argparse.ArgumentParser()
+        cli.add_directions_argument(parser, "validate")
+        return parser.parse_args(argv).directions
+
+    def test_keys_match_generate_setup(self):
+        self.assertEqual(cli.DIRECTION_KEYS, tuple(setup.directions_map))
+
+    def test_default_and_explicit_directions(self):
+        self.assertEqual(self.parse(), ["1", "2", "3", "4"])
+        self.assertEqual(self.parse("--directions", " 1, 3,"), ["1", "3"])
+
+    def test_invalid_directions(self):
+        with redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+            self.parse("--directions", "1,5,x")
+        self.assertIn("invalid directions: 5, x", stderr.getvalue())
+
+    def test_subcommands_share_the_option(self):
+        parser = cli.build_parser()
+        for argv in (["generate"], ["validate"], ["watch"], ["spec-diff", "old.xlsx", "new.xlsx"]):
+            with self.subTest(command=argv[0]):
+                self.assertEqual(parser.parse_args(argv + ["--directions", "2,3"]).directions, ["2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Tests of the persisted field mapper catalog and its incremental refresh.
+
+Run from the repository root:
+    python -m pytest generation/tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import add_mapper_UMM2ISO as mapper  # noqa: E402
+import field_mapper_catalog as catalog  # noqa: E402
+
+PACKAGE = "eu.nets.mapping.components.auth.trg.umm_to_iso8583.field_mappers"
+
+
+class CatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.tmp_dir.name)
+        self.directory = root / "umm_to_iso"
+        self.directory.mkdir()
+        self.roots = {"umm_to_iso": str(self.directory)}
+        self.catalog_path = root / "catalog.json"
+        self.write("DE2_PrimaryAccountNumberMapper", "DE2_PrimaryAccountNumber")
+        self.write("DE4_AmountTransactionMapper", "DE4_AmountTransaction")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, class_name, factory, mtime_ns=None):
+        path = self.directory / f"{class_name}.java"
+        path.write_text(f"package {PACKAGE};\n\npublic class {class_name} {{\n"
+                        f"    public static {class_name} {factory}() {{\n        return new {class_name}();\n    }}\n}}\n",
+                        encoding="utf-8")
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def load(self):
+        """
+        Loads the catalog, returning it with the names of the files that were parsed.
+        """
+        with mock.patch.object(catalog, "parse_field_mapper", wraps=catalog.parse_field_mapper) as parse:
+            loaded = catalog.load_catalog(self.roots, self.catalog_path)
+        return loaded, sorted(os.path.basename(call.args[0]) for call in parse.call_args_list)
+
+    def test_cold_load_parses_every_file(self):
+        loaded, parsed = self.load()
+        self.assertEqual(parsed, ["DE2_PrimaryAccountNumberMapper.java", "DE4_AmountTransactionMapper.java"])
+        self.assertEqual(catalog.find_field_mappers(loaded, "umm_to_iso", 2),
+                         [("DE2_PrimaryAccountNumberMapper", "DE2_PrimaryAccountNumber", PACKAGE)])
+        self.assertTrue(self.catalog_path.exists())
+
+    def test_warm_load_parses_nothing(self):
+        self.load()
+        persisted = self.catalog_path.stat().st_mtime_ns
+        loaded, parsed = self.load()
+        self.assertEqual(parsed, [])
+        self.assertEqual(self.catalog_path.stat().st_mtime_ns, persisted)
+        self.assertEqual(len(loaded["files"]), 2)
+
+    def test_new_file_is_parsed(self):
+        self.load()
+        self.write("DE49_TransactionCurrencyCodeMapper", "DE49_TransactionCurrencyCode")
+        loaded, parsed = self.load()
+        self.assertEqual(parsed, ["DE49_TransactionCurrencyCodeMapper.java"])
+        self.assertEqual([class_name for class_name, _, _ in catalog.find_field_mappers(loaded, "umm_to_iso", 49)],
+                         ["DE49_TransactionCurrencyCodeMapper"])
+
+    def test_deleted_file_is_dropped(self):
+        self.load()
+        (self.directory / "DE4_AmountTransactionMapper.java").unlink()
+        loaded, parsed = self.load()
+        self.assertEqual(parsed, [])
+        self.assertEqual(catalog.find_field_mappers(loaded, "umm_to_iso", 4), [])
+        self.assertIsNone(catalog.find_field_mapper(loaded, "umm_to_iso", "DE4_AmountTransactionMapper"))
+        self.assertEqual(len(catalog.read_persisted(self.catalog_path)), 1)
+
+    def test_touched_file_is_parsed_again(self):
+        path = self.write("DE2_PrimaryAccountNumberMapper", "DE2_PrimaryAccountNumber", mtime_ns=1_000_000_000)
+        self.load()
+        # Same size, other factory method and modification time
+        self.write("DE2_PrimaryAccountNumberMapper", "de2_PrimaryAccountNumber", mtime_ns=2_000_000_000)
+        self.assertEqual(path.stat().st_size, catalog.read_persisted(self.catalog_path)[str(path)]["size"])
+        loaded, parsed = self.load()
+        self.assertEqual(parsed, ["DE2_PrimaryAccountNumberMapper.java"])
+        self.assertEqual(catalog.find_field_mapper(loaded, "umm_to_iso", "DE2_PrimaryAccountNumberMapper")[1],
+                         "de2_PrimaryAccountNumber")
+
+    def test_warm_lookups_do_not_walk_the_tree(self):
+        mapper.get_field_mapper_catalog.cache_clear()
+        try:
+            with mock.patch.object(mapper, "FIELD_MAPPER_ROOTS", self.roots), \
+                    mock.patch.object(catalog, "CATALOG_PATH", self.catalog_path):
+                self.assertEqual(mapper.does_field_mapper_exist(2, "umm_to_iso"), ["DE2_PrimaryAccountNumberMapper.java"])
+                with mock.patch.object(catalog.os, "scandir", side_effect=AssertionError("directory walk")):
+                    self.assertEqual(mapper.does_field_mapper_exist(4, "umm_to_iso"), ["DE4_AmountTransactionMapper.java"])
+                    self.assertEqual(mapper.get_field_mapper("DE4_AmountTransactionMapper.java")[1], "DE4_AmountTransaction")
+        finally:
+            mapper.get_field_mapper_catalog.cache_clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
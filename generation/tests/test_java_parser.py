@@ -0,0 +1,163 @@
+"""
+Tests of java_parser and of the builder chain wiring built on it (delegator_wiring).
+
+Run from the repository root:
+    python -m pytest generation/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import delegator_wiring  # noqa: E402
+import java_parser  # noqa: E402
+
+UMM_TO_ISO_MAPPER = """package eu.nets.mapping.components.auth.trg.dk.merchant.umm_to_iso8583.message_mappers;
+
+import eu.nets.uni.mapping.components.core.auth.iso8583.delegator.DataElementMapperDelegator;
+import eu.nets.uni.mapping.components.core.context.MappingContext;
+
+import static eu.nets.mapping.components.auth.trg.umm_to_iso8583.field_mappers.DE4_AmountTransactionMapper.DE4_AmountTransaction;
+
+/**
+ * Implementation of FNCQ message mapper. DataElementMapperDelegator.<UniMessageContext, MappingContext>builder()
+ */
+public class FinancialRequestMapper extends AbstractDataElementMappingDelegator {
+    public FinancialRequestMapper() {
+        super(
+                messageTypeIndicatorMapper(),
+                DataElementMapperDelegator.<UniMessageContext, MappingContext>builder()
+                        // .de2_PrimaryAccountNumberMapper(DE2_PrimaryAccountNumber())
+                        .de4_AmountTransactionMapper(DE4_AmountTransaction())
+                        .build()
+        );
+    }
+}
+"""
+
+ISO_TO_UMM_MAPPER = """package eu.nets.mapping.components.auth.trg.dk.merchant.iso8583_to_umm.message_mappers;
+
+import eu.nets.uni.mapping.components.core.auth.umm.delegator.v001.MessageHeaderMapperDelegator;
+import eu.nets.uni.mapping.components.core.auth.umm.delegator.v001.UniMessageMapperDelegator;
+
+import static eu.nets.mapping.components.auth.trg.iso8583_to_umm.field_mappers.hdr.MessageFunctionMapper.messageFunctionMapper;
+
+public class FinancialRequestMapper extends AbstractUniMessageMappingDelegator {
+    public FinancialRequestMapper() {
+        super(
+               UniMessageMapperDelegator.<ISO8583MessageContext, MappingContext>builder()
+                        .hdrMapper(MessageHeaderMapperDelegator.<ISO8583MessageContext, MappingContext>builder()
+                                .msgFctnMapper(messageFunctionMapper())
+                                .build()
+                        )
+                        .build()
+        );
+    }
+}
+"""
+
+UMM_TO_ISO_BUILDER = "DataElementMapperDelegator.<UniMessageContext, MappingContext>builder()"
+HEADER_BUILDER = "MessageHeaderMapperDelegator.<ISO8583MessageContext, MappingContext>builder()"
+UNI_MESSAGE_BUILDER = "UniMessageMapperDelegator.<ISO8583MessageContext, MappingContext>builder()"
+UMM_TO_ISO_PACKAGE = "eu.nets.mapping.components.auth.trg.umm_to_iso8583.field_mappers"
+HEADER_PACKAGE = "eu.nets.mapping.components.auth.trg.iso8583_to_umm.field_mappers.hdr"
+
+
+def field_mapper(data_element, name):
+    """
+    Returns the catalog entry of a UMM to ISO field mapper, e.g. (DE2_PrimaryAccountNumberMapper, ...).
+    """
+    return f"DE{data_element}_{name}Mapper", f"DE{data_element}_{name}", UMM_TO_ISO_PACKAGE
+
+
+class ParserTest(unittest.TestCase):
+
+    def test_tokenize_skips_comments_and_keeps_strings(self):
+        tokens = java_parser.tokenize('a /* b */ // c\n"d // e" f')
+        self.assertEqual([text for _, text, _, _ in tokens], ["a", '"d // e"', "f"])
+
+    def test_parse_declarations(self):
+        model = java_parser.parse_java(UMM_TO_ISO_MAPPER)
+        self.assertEqual(model["package"]["name"], "eu.nets.mapping.components.auth.trg.dk.merchant.umm_to_iso8583.message_mappers")
+        self.assertEqual([declaration["static"] for declaration in model["imports"]], [False, False, True])
+
+    def test_find_chain_ignores_comments(self):
+        chain = java_parser.find_chain(java_parser.parse_java(UMM_TO_ISO_MAPPER), UMM_TO_ISO_BUILDER)
+        self.assertEqual([call["name"] for call in chain["calls"]], ["de4_AmountTransactionMapper"])
+        self.assertEqual(UMM_TO_ISO_MAPPER[chain["build_start"]:chain["end"]], ".build()")
+
+    def test_find_nested_chains(self):
+        model = java_parser.parse_java(ISO_TO_UMM_MAPPER)
+        self.assertEqual([call["name"] for call in java_parser.find_chain(model, UNI_MESSAGE_BUILDER)["calls"]], ["hdrMapper"])
+        self.assertEqual([call["name"] for call in java_parser.find_chain(model, HEADER_BUILDER)["calls"]], ["msgFctnMapper"])
+
+    def test_find_chain_missing_builder(self):
+        with self.assertRaises(ValueError):
+            java_parser.find_chain(java_parser.parse_java(UMM_TO_ISO_MAPPER), HEADER_BUILDER)
+
+    def test_unpatched_source_round_trips(self):
+        for source in (UMM_TO_ISO_MAPPER, ISO_TO_UMM_MAPPER, UMM_TO_ISO_MAPPER.replace("\n", "\r\n")):
+            java_parser.parse_java(source)
+            self.assertEqual(java_parser.apply_patches(source, []), source)
+
+    def test_apply_patches_in_order(self):
+        self.assertEqual(java_parser.apply_patches("ad", [(1, 2, "c"), (1, 1, "b"), (0, 0, ">")]), ">abcd")
+
+    def test_import_insertion_point(self):
+        self.assertEqual(java_parser.import_insertion_point(java_parser.parse_java(UMM_TO_ISO_MAPPER)),
+                         (UMM_TO_ISO_MAPPER.index("import"), ""))
+        source = "package a;\nclass B {}\n"
+        self.assertEqual(java_parser.import_insertion_point(java_parser.parse_java(source)), (len("package a;\n"), "\n"))
+
+
+class WiringTest(unittest.TestCase):
+
+    def test_wire_in_data_element_order(self):
+        content, wired = delegator_wiring.wire_field_mappers(
+            UMM_TO_ISO_MAPPER, "umm_to_iso", [field_mapper(11, "SystemTraceAuditNumber"), field_mapper(2, "PrimaryAccountNumber")])
+        self.assertEqual(wired, ["DE11_SystemTraceAuditNumberMapper", "DE2_PrimaryAccountNumberMapper"])
+        calls = java_parser.find_chain(java_parser.parse_java(content), UMM_TO_ISO_BUILDER)["calls"]
+        self.assertEqual([call["name"] for call in calls],
+                         ["de2_PrimaryAccountNumberMapper", "de4_AmountTransactionMapper", "de11_SystemTraceAuditNumberMapper"])
+        self.assertIn(f"import static {UMM_TO_ISO_PACKAGE}.DE2_PrimaryAccountNumberMapper.DE2_PrimaryAccountNumber;\n", content)
+        self.assertIn("                        .de2_PrimaryAccountNumberMapper(DE2_PrimaryAccountNumber())\n", content)
+
+    def test_wiring_twice_is_a_no_op(self):
+        content, _ = delegator_wiring.wire_field_mappers(UMM_TO_ISO_MAPPER, "umm_to_iso", [field_mapper(2, "PrimaryAccountNumber")])
+        again, wired = delegator_wiring.wire_field_mappers(content, "umm_to_iso", [field_mapper(2, "PrimaryAccountNumber")])
+        self.assertEqual((again, wired), (content, []))
+
+    def test_wiring_keeps_windows_line_endings(self):
+        source = UMM_TO_ISO_MAPPER.replace("\n", "\r\n")
+        content, _ = delegator_wiring.wire_field_mappers(source, "umm_to_iso", [field_mapper(2, "PrimaryAccountNumber")])
+        self.assertNotIn("\n", content.replace("\r\n", ""))
+
+    def test_already_wired_by_factory(self):
+        message_function = ("MessageFunctionMapper", "messageFunctionMapper", HEADER_PACKAGE)
+        self.assertTrue(delegator_wiring.is_wired(ISO_TO_UMM_MAPPER, "iso_to_umm", message_function))
+        self.assertEqual(delegator_wiring.wire_field_mappers(ISO_TO_UMM_MAPPER, "iso_to_umm", [message_function]),
+                         (ISO_TO_UMM_MAPPER, []))
+
+    def test_wire_iso_to_umm_header_field(self):
+        transmission = ("DE7_TransmissionDateTimeMapper", "transmissionDateTimeMapper", HEADER_PACKAGE)
+        content, wired = delegator_wiring.wire_field_mappers(ISO_TO_UMM_MAPPER, "iso_to_umm", [transmission])
+        self.assertEqual(wired, ["DE7_TransmissionDateTimeMapper"])
+        calls = java_parser.find_chain(java_parser.parse_java(content), HEADER_BUILDER)["calls"]
+        self.assertEqual([call["name"] for call in calls], ["msgFctnMapper", "creDtTmMapper"])
+        self.assertIn(f"import static {HEADER_PACKAGE}.DE7_TransmissionDateTimeMapper.transmissionDateTimeMapper;\n", content)
+        self.assertIn("                                .creDtTmMapper(transmissionDateTimeMapper())\n"
+                      "                                .build()", content)
+        self.assertTrue(delegator_wiring.is_wired(content, "iso_to_umm", transmission))
+
+    def test_unknown_builder_method(self):
+        primary_account = ("DE2_PrimaryAccountNumberMapper", "primaryAccountNumberMapper",
+                           "eu.nets.mapping.components.auth.trg.iso8583_to_umm.field_mappers")
+        with self.assertRaises(ValueError):
+            delegator_wiring.check_field_mappers("iso_to_umm", [primary_account])
+        with self.assertRaises(ValueError):
+            delegator_wiring.wire_field_mappers(ISO_TO_UMM_MAPPER, "iso_to_umm", [primary_account])
+
+
+if __name__ == "__main__":
+    unittest.main()
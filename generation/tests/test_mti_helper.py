@@ -0,0 +1,118 @@
+"""
+Tests of the batch merge of message type indicator mappings into MessageTypeIndicatorHelper.java.
+
+Run from the repository root:
+    python -m pytest generation/tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import changeset  # noqa: E402
+import mti_helper  # noqa: E402
+
+HELPER = """package eu.nets.mapping.components.auth.trg.common.message_function;
+
+public final class MessageTypeIndicatorHelper {
+    static {
+        map("1200", MessageFunction.FNCQ);
+        map("1220", MessageFunction.FNCN);
+    }
+}
+"""
+
+
+def lines_of(content):
+    return content.splitlines(keepends=True)
+
+
+def merge(mappings, content=HELPER):
+    """
+    Merges mappings into the helper content, returning the new content and the result.
+    """
+    lines = lines_of(content)
+    new_lines, result = mti_helper.merge_mappings(lines, mti_helper.parse_mti_index(lines), mappings)
+    return "".join(new_lines), result
+
+
+def mapped(content):
+    """
+    Returns the (message type indicator, message function) pairs of the static block in file order.
+    """
+    return [(match.group(1), match.group(2)) for match in map(mti_helper.MAPPING_PATTERN.match, lines_of(content)) if match]
+
+
+class MergeMappingsTest(unittest.TestCase):
+
+    def test_parse_index(self):
+        index = mti_helper.parse_mti_index(lines_of(HELPER))
+        self.assertEqual(index["functions"], {"1200": "FNCQ", "1220": "FNCN"})
+        self.assertEqual((index["keys"], index["positions"], index["block_end"]), ([1200, 1220], [4, 5], 6))
+
+    def test_insert_before_between_and_after(self):
+        content, result = merge([("RVRA", "1420"), ("ATHQ", "1100"), ("FNCR", "1210")])
+        self.assertEqual(mapped(content), [("1100", "ATHQ"), ("1200", "FNCQ"), ("1210", "FNCR"), ("1220", "FNCN"),
+                                           ("1420", "RVRA")])
+        self.assertEqual(result["added"], [("RVRA", "1420"), ("ATHQ", "1100"), ("FNCR", "1210")])
+        self.assertTrue(content.endswith('        map("1420", MessageFunction.RVRA);\n    }\n}\n'))
+
+    def test_existing_and_duplicate_mappings(self):
+        content, result = merge([("FNCQ", "1200"), ("FNCR", "1210"), ("FNCR", "1210")])
+        self.assertEqual(mapped(content), [("1200", "FNCQ"), ("1210", "FNCR"), ("1220", "FNCN")])
+        self.assertEqual(result, {"added": [("FNCR", "1210")], "existing": [("FNCQ", "1200"), ("FNCR", "1210")],
+                                  "conflicts": []})
+
+    def test_conflicts(self):
+        content, result = merge([("FNCR", "1200"), ("FNCR", "1210"), ("ATHR", "1210")])
+        self.assertEqual(mapped(content), [("1200", "FNCQ"), ("1210", "FNCR"), ("1220", "FNCN")])
+        self.assertEqual(result["conflicts"], [("FNCR", "1200", "FNCQ"), ("ATHR", "1210", "FNCR")])
+
+    def test_nothing_to_add_keeps_the_lines(self):
+        lines = lines_of(HELPER)
+        new_lines, _ = mti_helper.merge_mappings(lines, mti_helper.parse_mti_index(lines), [("FNCQ", 1200)])
+        self.assertIs(new_lines, lines)
+
+    def test_windows_line_endings(self):
+        content, _ = merge([("FNCR", "1210"), ("RVRA", "1420")], HELPER.replace("\n", "\r\n"))
+        self.assertNotIn("\n", content.replace("\r\n", ""))
+        self.assertIn('        map("1210", MessageFunction.FNCR);\r\n', content)
+
+    def test_static_block_without_mappings(self):
+        with self.assertRaises(ValueError):
+            mti_helper.parse_mti_index(lines_of(HELPER.replace('        map("1200", MessageFunction.FNCQ);\n', "")
+                                                .replace('        map("1220", MessageFunction.FNCN);\n', "")))
+
+
+class ApplyMappingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp_dir.name) / "MessageTypeIndicatorHelper.java")
+        Path(self.path).write_text(HELPER, encoding="utf-8")
+        changeset.forget_contents()
+
+    def tearDown(self):
+        changeset.forget_contents()
+        self.tmp_dir.cleanup()
+
+    def test_batch_is_written_once(self):
+        with mock.patch.object(changeset, "write_file", wraps=changeset.write_file) as write_file:
+            result = mti_helper.apply_mti_mappings(self.path, [("ATHQ", "1100"), ("FNCR", "1210"), ("RVRA", "1420")])
+        self.assertEqual(write_file.call_count, 1)
+        self.assertEqual(len(result["added"]), 3)
+        self.assertEqual([indicator for indicator, _ in mapped(Path(self.path).read_text(encoding="utf-8"))],
+                         ["1100", "1200", "1210", "1220", "1420"])
+
+    def test_nothing_is_written_without_additions(self):
+        with mock.patch.object(changeset, "write_file") as write_file:
+            result = mti_helper.apply_mti_mappings(self.path, [("FNCQ", "1200"), ("FNCR", "1220")])
+        write_file.assert_not_called()
+        self.assertEqual((result["existing"], result["conflicts"]), ([("FNCQ", "1200")], [("FNCR", "1220", "FNCN")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
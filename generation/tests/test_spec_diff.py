@@ -0,0 +1,89 @@
+"""
+Tests of the spec diff: normalization of the specs into records, the diff of two versions and the wiring of the
+added data elements.
+
+Run from the repository root:
+    python -m pytest generation/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import add_mapper_UMM2ISO as mapper  # noqa: E402
+import changeset  # noqa: E402
+import spec_diff  # noqa: E402
+
+
+def spec(sheet, function, indicator, fields):
+    """
+    Returns an extracted spec, see spec_reader.read_spec; fields are (data element, ISO20022 cell) pairs.
+    """
+    return {"sheet": sheet, "message_function": function, "message_type_indicator": indicator,
+            "fields": [{"data_element": num, "name": f"Field {num}", "iso20022": [iso20022]} for num, iso20022 in fields]}
+
+
+def records(*specs):
+    return spec_diff.normalize_specs([("spec.xlsx", "Financial Request", item) for item in specs])
+
+
+OLD = records(spec("1200 Financial Request", "FNCQ", "1200", [(2, "UniMessage.Body.Tx.PAN"), (3, "UniMessage.Body.Tx.Tp"),
+                                                             (4, "UniMessage.Body.Tx.Amt"), (11, "NA")]))
+
+
+class DiffRecordsTest(unittest.TestCase):
+
+    def summary(self, changes):
+        return [(item["kind"], item["change"], item["message_function"], item["value"]) for item in changes]
+
+    def test_identical_versions(self):
+        self.assertEqual(spec_diff.diff_records(OLD, OLD), [])
+
+    def test_fields_and_indicators(self):
+        new = records(spec("1200 Financial Request", "FNCQ", "1200/1201",
+                           [(2, "UniMessage.Body.Tx.PAN"), (4, "UniMessage.Body.Tx.TtlAmt"), (11, "UniMessage.Body.Tx.STAN")]))
+        self.assertEqual(self.summary(spec_diff.diff_records(OLD, new)), [
+            ("mti", "added", "FNCQ", "1201"),
+            ("data_element", "removed", "FNCQ", 3),
+            ("data_element", "changed", "FNCQ", 4),
+            ("data_element", "added", "FNCQ", 11),
+        ])
+        self.assertEqual(self.summary(spec_diff.diff_records(new, OLD))[0], ("mti", "removed", "FNCQ", "1201"))
+
+    def test_message_functions(self):
+        new = records(spec("1420 Reversal Advice", "RVRA", "1420/1421", [(2, "UniMessage.Body.Tx.PAN"), (11, "NA")]))
+        self.assertEqual(self.summary(spec_diff.diff_records(OLD, new)), [
+            ("message_function", "removed", "FNCQ", None),
+            ("message_function", "added", "RVRA", None),
+            ("mti", "added", "RVRA", "1420"),
+            ("mti", "added", "RVRA", "1421"),
+            ("data_element", "added", "RVRA", 2),
+        ])
+
+    def test_sheets_of_a_message_function_are_merged(self):
+        new = records(spec("1200 Financial Request", "FNCQ", "1200", [(2, "UniMessage.Body.Tx.PAN"), (3, "UniMessage.Body.Tx.Tp"),
+                                                                     (4, "UniMessage.Body.Tx.Amt"), (11, "NA")]),
+                      spec("1200 Financial Request (2)", "FNCQ", "1200", [(11, "UniMessage.Body.Tx.STAN"), (2, "NA")]))
+        self.assertEqual(self.summary(spec_diff.diff_records(OLD, new)), [("data_element", "added", "FNCQ", 11)])
+        merged = spec_diff.record_spec("FNCQ", new["FNCQ"])
+        self.assertEqual([(field["data_element"], field["iso20022"]) for field in merged["fields"]],
+                         [(2, ["UniMessage.Body.Tx.PAN"]), (3, ["UniMessage.Body.Tx.Tp"]), (4, ["UniMessage.Body.Tx.Amt"]),
+                          (11, ["UniMessage.Body.Tx.STAN"])])
+
+    def test_fields_added_on_another_sheet_are_wired(self):
+        new = records(spec("1200 Financial Request", "FNCQ", "1200", [(2, "UniMessage.Body.Tx.PAN")]),
+                      spec("1200 Financial Request (2)", "FNCQ", "1200", [(49, "UniMessage.Body.Tx.Ccy")]))
+        old = records(spec("1200 Financial Request", "FNCQ", "1200", [(2, "UniMessage.Body.Tx.PAN")]))
+        changes = spec_diff.diff_records(old, new)
+        with mock.patch.object(mapper, "implement_spec_fields") as implement_spec_fields, \
+                changeset.transaction(dry_run=True):
+            spec_diff.apply_changes(changes, new, ["2"])
+        wired_spec, description, directions, conversion, data_elements = implement_spec_fields.call_args.args
+        self.assertEqual((description, directions, conversion, data_elements), ("Financial Request", ["inbound"], "umm_to_iso", {49}))
+        self.assertIn(49, [field["data_element"] for field in wired_spec["fields"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
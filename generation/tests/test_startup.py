@@ -0,0 +1,37 @@
+"""
+Tests of the start-up of the read-only CLI commands: they must not import the heavy modules and must start within
+the budget of benchmarks/startup_report.py.
+
+Run from the repository root:
+    python -m pytest generation/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+import startup_report  # noqa: E402
+
+REPEAT = 5
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_heavy_modules_are_not_imported(self):
+        for name, arguments in startup_report.COMMANDS.items():
+            with self.subTest(command=name):
+                _, stderr = startup_report.run(arguments, importtime=True)
+                imported = {module.split(".")[0] for module, _, _, _ in startup_report.parse_importtime(stderr)}
+                self.assertEqual(sorted(imported & set(startup_report.HEAVY_MODULES)), [])
+
+    def test_start_up_within_budget(self):
+        baseline = startup_report.best_wall_time(["-c", "pass"], REPEAT)
+        for name, arguments in startup_report.COMMANDS.items():
+            with self.subTest(command=name):
+                overhead_ms = (startup_report.best_wall_time(arguments, REPEAT) - baseline) * 1000
+                self.assertLess(overhead_ms, startup_report.BUDGET_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Tests of the validator on a mapper tree generated from the templates.
+
+Run from the repository root:
+    python -m pytest generation/tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import coverage_scanner  # noqa: E402
+import delegator_wiring  # noqa: E402
+import field_mapper_catalog  # noqa: E402
+import generate_setup as setup  # noqa: E402
+import instrumentation  # noqa: E402
+import validator  # noqa: E402
+
+FIELD_MAPPER_PACKAGE = "eu.nets.mapping.components.auth.trg.umm_to_iso8583.field_mappers"
+HEADER_PACKAGE = "eu.nets.mapping.components.auth.trg.iso8583_to_umm.field_mappers.hdr"
+MTI_HELPER = """package eu.nets.mapping.components.auth.trg.common.message_function;
+
+public final class MessageTypeIndicatorHelper {
+    static {
+        map("1200", MessageFunction.FNCQ);
+    }
+}
+"""
+
+
+def field(data_element, iso20022):
+    """
+    Returns a field mapping of a spec, see spec_reader.scan_field_mappings.
+    """
+    return {"data_element": data_element, "name": f"DE{data_element}", "iso20022": [iso20022]}
+
+
+class ValidatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.tmp_dir.name)
+        self.field_mapper_roots = {"umm_to_iso": root / "umm_to_iso", "iso_to_umm": root / "iso_to_umm"}
+        self.write_field_mapper("umm_to_iso", FIELD_MAPPER_PACKAGE, "DE2_PrimaryAccountNumberMapper", "DE2_PrimaryAccountNumber")
+        self.write_field_mapper("umm_to_iso", FIELD_MAPPER_PACKAGE, "DE4_AmountTransactionMapper", "DE4_AmountTransaction")
+        self.write_field_mapper("iso_to_umm", HEADER_PACKAGE, "MessageFunctionMapper", "messageFunctionMapper")
+
+        self.dir_paths = {}
+        for direction, conversion in setup.directions_map.values():
+            self.dir_paths[(direction, conversion)] = root / direction / conversion
+            self.dir_paths[(direction, conversion)].mkdir(parents=True)
+        mti_helper = root / "MessageTypeIndicatorHelper.java"
+        mti_helper.write_text(MTI_HELPER, encoding="utf-8")
+        self.module = {"name": "test", "dir_paths": self.dir_paths, "field_mapper_roots": self.field_mapper_roots,
+                       "mti_helper": str(mti_helper)}
+        self.spec = {"sheet": "1200 Financial Request", "message_function": "FNCQ", "message_type_indicator": "1200",
+                     "fields": [field(2, "UniMessage.Body.Tx.PAN"), field(4, "UniMessage.Body.Tx.Amt"),
+                                field(11, "Not mapped")]}
+        self.caches = [mock.patch.object(coverage_scanner, "COVERAGE_CACHE_PATH", root / "coverage.json"),
+                       mock.patch.object(field_mapper_catalog, "CATALOG_PATH", root / "catalog.json")]
+        for cache in self.caches:
+            cache.start()
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.stop()
+        self.tmp_dir.cleanup()
+
+    def write_field_mapper(self, conversion, package, class_name, factory):
+        directory = self.field_mapper_roots[conversion] / package.rsplit(".", 1)[-1]
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{class_name}.java").write_text(
+            f"package {package};\n\npublic class {class_name} {{\n"
+            f"    public static {class_name} {factory}() {{\n        return new {class_name}();\n    }}\n}}\n",
+            encoding="utf-8")
+
+    def generate(self, wired):
+        """
+        Renders the message mappers of every direction and wires the given field mappers into the UMM to ISO ones.
+        """
+        for direction, conversion in setup.directions_map.values():
+            file_path, content = setup.render_mapper_class("Financial Request", "FNCQ", direction, conversion,
+                                                           output_dirs=self.dir_paths)
+            if conversion == "umm_to_iso":
+                content, _ = delegator_wiring.wire_field_mappers(content, conversion, wired)
+            file_path.write_text(content, encoding="utf-8")
+
+    def validate(self):
+        specs = [("spec.xlsx", "Financial Request", self.spec)]
+        return validator.validate_module(self.module, specs, validator.expected_fields(specs, list(setup.directions_map)))
+
+    def test_generated_tree_matches_the_spec(self):
+        self.generate([("DE2_PrimaryAccountNumberMapper", "DE2_PrimaryAccountNumber", FIELD_MAPPER_PACKAGE),
+                       ("DE4_AmountTransactionMapper", "DE4_AmountTransaction", FIELD_MAPPER_PACKAGE)])
+        self.assertEqual(self.validate(), [])
+
+    def test_missing_fields_are_only_reported_for_umm_to_iso(self):
+        self.generate([("DE2_PrimaryAccountNumberMapper", "DE2_PrimaryAccountNumber", FIELD_MAPPER_PACKAGE)])
+        findings = self.validate()
+        self.assertEqual(sorted((item["kind"], item["direction"], item["conversion"], tuple(item["data_elements"]))
+                                for item in findings),
+                         [("missing_field", "inbound", "umm_to_iso", (4,)), ("missing_field", "outbound", "umm_to_iso", (4,))])
+        self.assertEqual({item["module"] for item in findings}, {"test"})
+
+    def test_missing_mappers_and_field_mappers(self):
+        self.spec["fields"].append(field(49, "UniMessage.Body.Tx.Ccy"))
+        self.spec["message_type_indicator"] = "1200/1201"
+        findings = self.validate()
+        self.assertEqual(sorted(item["kind"] for item in findings),
+                         ["missing_mapper"] * 4 + ["missing_mti"] + ["unknown_field_mapper"] * 2)
+        self.assertEqual({tuple(item["data_elements"]) for item in findings if item["kind"] == "unknown_field_mapper"}, {(49,)})
+
+    def test_skipped_sheets_are_reported_without_failing(self):
+        skipped = validator.skipped_sheet_findings([("spec.xlsx", "1210 Fin. response", "'ISO20022' header not found")])
+        self.assertEqual([(item["kind"], item["sheet"]) for item in skipped], [("skipped_sheet", "1210 Fin. response")])
+        self.assertFalse(validator.has_failures(skipped))
+        self.assertTrue(validator.has_failures(skipped + self.validate()))
+
+    def test_findings_are_printed_as_events(self):
+        events = []
+        findings = self.validate() + validator.skipped_sheet_findings([("spec.xlsx", "DE24_Function-code", "no header")])
+        with mock.patch.object(instrumentation, "listeners", [lambda *event: events.append(event)]):
+            validator.print_findings(findings)
+        self.assertEqual([name for name, _, _ in events], ["validator.finding"] * len(findings) + ["validator.summary"])
+        self.assertEqual(events[-1][2], {"failed": True, "findings": len(findings)})
+        self.assertIn("Validation failed", events[-1][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,444 @@
+"""
+This script validates the implemented Java mappers against the Excel mapping specification.
+
+Every spec workbook is extracted (through the spec cache) into the data elements each message mapper must wire,
+the message mappers are taken from the coverage scanner and the field mappers from the field mapper catalog.
+The comparison is done with set operations on those indexes:
+
+    - missing_mapper: the message mapper of a spec sheet does not exist
+    - missing_field: a data element mapped in the spec is not wired into its message mapper
+    - extra_field: a data element wired into a message mapper is not mapped in the spec
+    - unknown_field_mapper: no DEnn_*Mapper.java exists for a data element mapped in the spec
+    - missing_mti: a message type indicator of the spec is not mapped in MessageTypeIndicatorHelper.java
+    - mti_conflict: a message type indicator of the spec is mapped to another message function
+    - skipped_sheet: a sheet does not follow the mapping sheet layout (e.g. a response sheet) and is not validated;
+      it is reported, but does not fail the validation
+
+The data element checks only apply to the UMM to ISO message mappers, whose builder takes one field mapper per
+data element. The ISO to UMM message mappers are built from the delegators of the UMM components (see
+delegator_wiring.py), so only their existence is checked.
+
+Every module of the project config (see project_config.py) is validated against the same specs, in parallel.
+
+Usage (from the repository root):
+    python generation/validator.py [workbook.xlsx | directory | manifest.json ...] [--directions 1,2,3,4]
+                                   [--modules all | name,...] [--format text|json] [--workers N]
+                                   [--profile report.json [--profile-format chrome]]
+
+The exit code is 0 when the mappers match the spec and 1 when there are findings other than skipped sheets, so it
+can gate merges.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from termcolor import colored
+import cli
+import generate_setup as setup
+import instrumentation
+import project_config
+import spec_cache
+import spec_reader
+
+MISSING_MAPPER = "missing_mapper"
+MISSING_FIELD = "missing_field"
+EXTRA_FIELD = "extra_field"
+UNKNOWN_FIELD_MAPPER = "unknown_field_mapper"
+MISSING_MTI = "missing_mti"
+MTI_CONFLICT = "mti_conflict"
+SKIPPED_SHEET = "skipped_sheet"
+FINDING_KINDS = (MISSING_MAPPER, MISSING_FIELD, EXTRA_FIELD, UNKNOWN_FIELD_MAPPER, MISSING_MTI, MTI_CONFLICT, SKIPPED_SHEET)
+
+# Conversions whose message mappers are checked data element by data element, see the module docstring
+FIELD_CONVERSIONS = ("umm_to_iso",)
+# Below this number of workbooks the specs are loaded in-process, a process pool would cost more than it saves
+PARALLEL_THRESHOLD = 8
+
+
+def collect_jobs(sources):
+    """
+    Collects the workbooks to validate.
+
+    Args:
+        sources (list): Workbook paths, directories containing spec workbooks or JSON manifests, see
+            batch_generate.collect_jobs.
+
+    Returns:
+        list: The jobs as dicts with the keys "workbook", "sheet" and "description".
+    """
+    import batch_generate
+
+    jobs = []
+    for source in sources:
+        if Path(source).suffix.lower() in batch_generate.WORKBOOK_SUFFIXES:
+            jobs.append({"workbook": str(source), "sheet": None, "description": None})
+        else:
+            jobs.extend(batch_generate.collect_jobs(source))
+    return jobs
+
+
+def load_job_specs(job):
+    """
+    Loads the specs of a job, every mapping sheet of the workbook unless the job selects one.
+
+    Args:
+        job (dict): The job, see collect_jobs.
+
+    Returns:
+        tuple: A tuple containing:
+            - specs (list): (workbook, description, spec) tuples.
+            - skipped (list): (workbook, sheet, reason) tuples for the sheets that are not mapping sheets.
+    """
+    skipped = []
+    if job["sheet"]:
+        specs = [spec_cache.load_spec(job["workbook"], job["sheet"], verbose=False)[0]]
+    else:
+        specs, skipped, _ = spec_cache.load_workbook_specs(job["workbook"], verbose=False)
+    return ([(job["workbook"], job["description"] or spec_reader.describe_message_function(spec["sheet"]), spec)
+             for spec in specs],
+            [(job["workbook"], sheet, reason) for sheet, reason in skipped])
+
+
+def load_specs(jobs, workers=None):
+    """
+    Loads the specs of all jobs, in a process pool when there are many workbooks.
+
+    Args:
+        jobs (list): The jobs, see collect_jobs.
+        workers (int): The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        tuple: A tuple containing:
+            - specs (list): (workbook, description, spec) tuples.
+            - skipped (list): (workbook, sheet, reason) tuples for the sheets that are not mapping sheets.
+    """
+    specs = []
+    skipped = []
+    if len(jobs) < PARALLEL_THRESHOLD:
+        for job_specs, job_skipped in map(load_job_specs, jobs):
+            specs.extend(job_specs)
+            skipped.extend(job_skipped)
+        return specs, skipped
+    with ProcessPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1)) as executor:
+        profiled = [instrumentation.is_profiling()] * len(jobs)
+        for (job_specs, job_skipped), recording in executor.map(instrumentation.profiled_call, profiled,
+                                                                [load_job_specs] * len(jobs), jobs):
+            instrumentation.merge_recording(recording)
+            specs.extend(job_specs)
+            skipped.extend(job_skipped)
+    return specs, skipped
+
+
+def mapper_name(description):
+    """
+    Returns the class name of the message mapper of a message function description, e.g. FinancialRequestMapper.
+    """
+    return f"{description.replace(' ', '')}Mapper"
+
+
+def expected_fields(specs, directions):
+    """
+    Indexes the data elements every message mapper must wire according to the specs.
+
+    Args:
+        specs (list): (workbook, description, spec) tuples, see load_specs.
+        directions (list): The direction keys to validate, see generate_setup.directions_map.
+
+    Returns:
+        dict: (direction, conversion, mapper) -> dict with the keys "fields" (set of data elements),
+            "workbook" and "sheet".
+    """
+    expected = {}
+    for workbook, description, spec in specs:
+        fields = {field["data_element"] for field in spec["fields"] if spec_reader.is_mapped_field(field)}
+        mapper = mapper_name(description)
+        for key in directions:
+            direction, conversion = setup.directions_map[key]
+            entry = expected.setdefault((direction, conversion, mapper),
+                                        {"fields": set(), "workbook": workbook, "sheet": spec["sheet"]})
+            entry["fields"] |= fields
+    return expected
+
+
+def actual_fields(coverage):
+    """
+    Indexes the data elements wired into every scanned message mapper.
+
+    Args:
+        coverage (dict): path -> entry, see coverage_scanner.scan_coverage.
+
+    Returns:
+        dict: (direction, conversion, mapper) -> set of data elements.
+    """
+    return {(entry["direction"], entry["conversion"], entry["mapper"]): set(entry["fields"]) for entry in coverage.values()}
+
+
+def finding(kind, workbook, sheet, detail, direction=None, conversion=None, mapper=None, data_elements=None):
+    """
+    Builds a finding, see validate.
+    """
+    return {
+        "kind": kind,
+        "module": None,
+        "workbook": workbook,
+        "sheet": sheet,
+        "direction": direction,
+        "conversion": conversion,
+        "mapper": mapper,
+        "data_elements": data_elements or [],
+        "detail": detail,
+    }
+
+
+def compare_fields(expected, actual, catalog_index, dir_paths=None):
+    """
+    Compares the expected data elements with the wired ones and the implemented field mappers.
+
+    The message mappers of the conversions not in FIELD_CONVERSIONS are only checked for existence.
+
+    Args:
+        expected (dict): See expected_fields.
+        actual (dict): See actual_fields.
+        catalog_index (dict): conversion -> data element -> field mappers, see field_mapper_catalog.load_catalog.
+        dir_paths (dict): (direction, conversion) -> message_mappers directory. Defaults to generate_setup.dir_paths.
+
+    Returns:
+        list: The findings.
+    """
+    findings = []
+    implemented = {conversion: set(by_data_element) for conversion, by_data_element in catalog_index.items()}
+    for (direction, conversion, mapper), entry in sorted(expected.items()):
+        fields = entry["fields"]
+        location = {"direction": direction, "conversion": conversion, "mapper": mapper}
+        checks_fields = conversion in FIELD_CONVERSIONS
+        unknown = fields - implemented.get(conversion, set()) if checks_fields else set()
+        if unknown:
+            findings.append(finding(UNKNOWN_FIELD_MAPPER, entry["workbook"], entry["sheet"],
+                                    f"no field mapper implemented for {format_fields(unknown)}",
+                                    data_elements=sorted(unknown), **location))
+
+        wired = actual.get((direction, conversion, mapper))
+        if wired is None:
+            findings.append(finding(MISSING_MAPPER, entry["workbook"], entry["sheet"],
+                                    f"{mapper}.java not found in {(dir_paths or setup.dir_paths)[(direction, conversion)]}", **location))
+            continue
+        if not checks_fields:
+            continue
+        missing = fields - wired
+        if missing:
+            findings.append(finding(MISSING_FIELD, entry["workbook"], entry["sheet"],
+                                    f"{format_fields(missing)} not wired", data_elements=sorted(missing), **location))
+        extra = wired - fields
+        if extra:
+            findings.append(finding(EXTRA_FIELD, entry["workbook"], entry["sheet"],
+                                    f"{format_fields(extra)} wired but not mapped in the spec",
+                                    data_elements=sorted(extra), **location))
+    return findings
+
+
+def compare_message_type_indicators(specs, functions):
+    """
+    Compares the message type indicators of the specs with the mappings of the helper.
+
+    Args:
+        specs (list): (workbook, description, spec) tuples, see load_specs.
+        functions (dict): message type indicator -> message function, see mti_helper.parse_mti_index.
+
+    Returns:
+        list: The findings.
+    """
+    findings = []
+    for workbook, _, spec in specs:
+        message_function = spec["message_function"]
+        for indicator in spec_reader.split_message_type_indicators(spec["message_type_indicator"]):
+            mapped = functions.get(indicator)
+            if mapped is None:
+                findings.append(finding(MISSING_MTI, workbook, spec["sheet"],
+                                        f"MTI {indicator} -> {message_function} is not mapped"))
+            elif mapped != message_function:
+                findings.append(finding(MTI_CONFLICT, workbook, spec["sheet"],
+                                        f"MTI {indicator} is mapped to {mapped} instead of {message_function}"))
+    return findings
+
+
+def skipped_sheet_findings(skipped):
+    """
+    Reports the sheets that are not mapping sheets, so that the parts of the spec that are not validated are listed.
+
+    Args:
+        skipped (list): (workbook, sheet, reason) tuples, see load_specs.
+
+    Returns:
+        list: The findings.
+    """
+    return [finding(SKIPPED_SHEET, workbook, sheet, f"not a mapping sheet: {reason}") for workbook, sheet, reason in skipped]
+
+
+def has_failures(findings):
+    """
+    Checks whether findings fail the validation; skipped sheets are reported but do not.
+
+    Args:
+        findings (list): The findings, see validate.
+
+    Returns:
+        bool: True if there are findings other than skipped sheets.
+    """
+    return any(item["kind"] != SKIPPED_SHEET for item in findings)
+
+
+def format_fields(fields):
+    """
+    Formats data element numbers as "DE2, DE4, ...".
+    """
+    return ", ".join(f"DE{num}" for num in sorted(fields))
+
+
+def validate(sources, directions, workers=None, modules=None):
+    """
+    Validates the Java mappers against the spec workbooks.
+
+    The specs are loaded once; the modules are then validated against them in a thread pool.
+
+    Args:
+        sources (list): Workbook paths, directories or JSON manifests, see collect_jobs.
+        directions (list): The direction keys to validate, see generate_setup.directions_map.
+        workers (int): The number of worker processes used to load the workbooks and parse the message mappers.
+        modules (list): The modules to validate, see project_config.get_modules. Defaults to the selected module.
+
+    Returns:
+        list: The findings as dicts with the keys "kind", "module", "workbook", "sheet", "direction",
+            "conversion", "mapper", "data_elements" and "detail".
+    """
+    specs, skipped = load_specs(collect_jobs(sources), workers)
+    expected = expected_fields(specs, directions)
+    modules = modules or [project_config.get_module(setup.module_name)]
+    if len(modules) == 1:
+        return validate_module(modules[0], specs, expected, workers) + skipped_sheet_findings(skipped)
+    with ThreadPoolExecutor(max_workers=len(modules)) as executor:
+        results = executor.map(lambda module: validate_module(module, specs, expected, workers), modules)
+        return [item for findings in results for item in findings] + skipped_sheet_findings(skipped)
+
+
+def validate_module(module, specs, expected, workers=None):
+    """
+    Validates the Java mappers of a module against the loaded specs.
+
+    Args:
+        module (dict): The module, see project_config.resolve_module.
+        specs (list): (workbook, description, spec) tuples, see load_specs.
+        expected (dict): See expected_fields.
+        workers (int): The number of worker processes used to parse the message mappers.
+
+    Returns:
+        list: The findings of the module, see validate.
+    """
+    import coverage_scanner
+    import field_mapper_catalog
+    import mti_helper
+
+    with instrumentation.span("validate.module", module=module["name"]) as attributes:
+        coverage = coverage_scanner.scan_coverage(
+            module["dir_paths"], project_config.module_cache_path(coverage_scanner.COVERAGE_CACHE_PATH, module), workers)
+        catalog = field_mapper_catalog.load_catalog(
+            module["field_mapper_roots"], project_config.module_cache_path(field_mapper_catalog.CATALOG_PATH, module))
+        functions = mti_helper.parse_mti_index(mti_helper.read_lines(module["mti_helper"]))["functions"]
+
+        findings = compare_fields(expected, actual_fields(coverage), catalog["index"], module["dir_paths"])
+        findings += compare_message_type_indicators(specs, functions)
+        for item in findings:
+            item["module"] = module["name"]
+        attributes["findings"] = len(findings)
+        return findings
+
+
+def format_finding(item, show_module=False):
+    """
+    Formats a finding as one line of console output.
+
+    Args:
+        item (dict): The finding, see validate.
+        show_module (bool): Whether to prefix the location with the module.
+
+    Returns:
+        str: The colored line.
+    """
+    location = f"{item['direction']} {item['conversion']} {item['mapper']}" if item["mapper"] else item["sheet"]
+    if item["kind"] == SKIPPED_SHEET:
+        location = f"{Path(item['workbook']).name} [{item['sheet']}]"
+    if show_module and item.get("module"):
+        location = f"{item['module']} {location}"
+    color = 'yellow' if item["kind"] == SKIPPED_SHEET else 'red'
+    return colored(item["kind"], color) + " " + colored(location, 'yellow') + f": {item['detail']}"
+
+
+def count_findings(findings):
+    """
+    Counts the findings by kind, e.g. "2 missing_field, 1 missing_mti".
+
+    Args:
+        findings (list): The findings, see validate.
+
+    Returns:
+        str: The counts of the kinds present.
+    """
+    return ", ".join(f"{sum(item['kind'] == kind for item in findings)} {kind}" for kind in FINDING_KINDS
+                     if any(item["kind"] == kind for item in findings))
+
+
+def print_findings(findings):
+    """
+    Prints the findings grouped by kind, followed by a summary, as validator.finding and validator.summary events.
+
+    Args:
+        findings (list): The findings, see validate.
+
+    Returns:
+        None
+    """
+    show_module = len({item["module"] for item in findings if item.get("module")}) > 1
+    for kind in FINDING_KINDS:
+        for item in (item for item in findings if item["kind"] == kind):
+            instrumentation.event("validator.finding", format_finding(item, show_module), **item)
+    failed = has_failures(findings)
+    if failed:
+        summary = colored(f"Validation failed: {count_findings(findings)}.", 'red')
+    elif findings:
+        summary = colored(f"Validation passed: the mappers match the spec, {count_findings(findings)} not validated.", 'green')
+    else:
+        summary = colored("Validation passed: the mappers match the spec.", 'green')
+    instrumentation.event("validator.summary", summary, failed=failed, findings=len(findings))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the Java mappers against the spec workbooks.")
+    parser.add_argument("sources", nargs="*", default=[setup.SPEC_FILE],
+                        help="spec workbooks, directories containing spec workbooks or JSON manifests "
+                             "(default: the spec workbook of generate_setup)")
+    cli.add_directions_argument(parser, "validate")
+    parser.add_argument("--modules", default="all",
+                        help="comma separated modules of the project config to validate (default: %(default)s)")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        modules = project_config.get_modules(args.modules)
+    except ValueError as error:
+        parser.error(str(error))
+    with instrumentation.profiling(args.profile, args.profile_format, sys.argv):
+        findings = validate(args.sources, args.directions, args.workers, modules)
+        if args.format == "text":
+            print_findings(findings)
+    if args.format == "json":
+        json.dump(findings, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 1 if has_failures(findings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
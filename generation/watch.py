@@ -0,0 +1,558 @@
+"""
+This script watches the spec workbooks and the Java sources and revalidates, optionally regenerating, on every change.
+
+The parsed specs, the field mapper catalog, the message mapper coverage and the message type indicator index are
+kept in memory between changes. Changes are picked up with inotify on Linux, called through ctypes so that no extra
+package is needed, or by polling the modification times elsewhere (and with --poll). A burst of events is debounced,
+then only what the changed files affect is recomputed:
+
+    - a workbook: its specs are reloaded and the sheets whose spec changed are revalidated; with --generate their
+      missing mapper classes and message type indicator mappings are written first
+    - a message mapper: the coverage scan is refreshed and that mapper is revalidated
+    - a field mapper: the catalog is refreshed and every spec field is checked against it again
+    - MessageTypeIndicatorHelper.java: the index is parsed again and every message type indicator is revalidated
+
+The watcher works on one module of the project config (see project_config.py), the default one unless --module
+selects another.
+
+Usage (from the repository root):
+    python generation/watch.py [workbook.xlsx | directory | manifest.json ...] [--directions 1,2,3,4]
+                               [--module NAME] [--generate] [--poll] [--interval 0.5]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from termcolor import colored
+import cli
+import changeset
+import coverage_scanner
+import field_mapper_catalog
+import generate_setup as setup
+import instrumentation
+import mti_helper
+import project_config
+import spec_reader
+import validator
+
+# Events arriving within this delay of each other are handled together
+DEBOUNCE_SECONDS = 0.1
+POLL_INTERVAL = 0.5
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+EVENT_BUFFER_SIZE = 64 * 1024
+
+
+def load_state(sources, directions):
+    """
+    Loads everything the watcher keeps in memory.
+
+    Args:
+        sources (list): Workbook paths, directories or JSON manifests, see validator.collect_jobs.
+        directions (list): The direction keys to validate, see generate_setup.directions_map.
+
+    Returns:
+        dict: The state with the keys "sources", "directions", "roots", "catalog_path", "mapper_dirs", "mti_path", "jobs"
+            (workbook -> jobs), "specs" (workbook -> (sheet, description) -> spec tuple), "catalog",
+            "coverage" and "mti" (message type indicator -> message function).
+    """
+    import add_mapper_UMM2ISO as mapper
+
+    state = {
+        "sources": [os.path.abspath(source) for source in sources],
+        "directions": directions,
+        "roots": mapper.FIELD_MAPPER_ROOTS,
+        "catalog_path": project_config.module_cache_path(field_mapper_catalog.CATALOG_PATH,
+                                                         project_config.get_module(setup.module_name)),
+        "mapper_dirs": {os.path.abspath(str(path)): key for key, path in setup.dir_paths.items()},
+        "mti_path": os.path.abspath(setup.MTI_HELPER_PATH),
+        "jobs": {},
+        "specs": {},
+    }
+    reload_jobs(state)
+    for workbook in state["jobs"]:
+        state["specs"][workbook] = load_workbook(state, workbook) or {}
+    state["catalog"] = field_mapper_catalog.load_catalog(state["roots"], state["catalog_path"])
+    state["coverage"] = coverage_scanner.scan_coverage()
+    state["mti"] = load_mti(state)
+    return state
+
+
+def reload_jobs(state):
+    """
+    Collects the jobs of the watched sources again, e.g. after a workbook was added to a watched directory.
+
+    Args:
+        state (dict): The watcher state.
+
+    Returns:
+        None
+    """
+    jobs = {}
+    for job in validator.collect_jobs(state["sources"]):
+        jobs.setdefault(os.path.abspath(job["workbook"]), []).append(job)
+    state["jobs"] = jobs
+
+
+def load_workbook(state, workbook):
+    """
+    Loads the specs of a workbook through the spec cache.
+
+    Args:
+        state (dict): The watcher state.
+        workbook (str): The absolute path of the workbook.
+
+    Returns:
+        dict: (sheet, description) -> (workbook, description, spec), or None if the workbook cannot be read,
+            e.g. while it is being saved.
+    """
+    specs = {}
+    skipped = []
+    try:
+        for job in state["jobs"].get(workbook, []):
+            job_specs, job_skipped = validator.load_job_specs(job)
+            for item in job_specs:
+                specs[(item[2]["sheet"], item[1])] = item
+            skipped.extend(sheet for _, sheet, _ in job_skipped)
+    except Exception as error:
+        instrumentation.event("watch.read_failed", colored(f"Could not read {workbook}: {error}", 'red'),
+                              path=workbook, error=str(error))
+        return None
+    if skipped:
+        instrumentation.event("watch.skipped", colored(f"Skipped {len(skipped)} sheets of {workbook} that are not "
+                                                       f"mapping sheets: {', '.join(skipped)}", 'yellow'),
+                              path=workbook, sheets=skipped)
+    return specs
+
+
+def load_mti(state):
+    """
+    Parses the message type indicator index of the helper.
+
+    Args:
+        state (dict): The watcher state.
+
+    Returns:
+        dict: message type indicator -> message function, empty if the helper cannot be parsed.
+    """
+    try:
+        return mti_helper.parse_mti_index(mti_helper.read_lines(state["mti_path"]))["functions"]
+    except (OSError, ValueError) as error:
+        instrumentation.event("watch.mti_failed", colored(f"Could not parse {state['mti_path']}: {error}", 'red'),
+                              path=state["mti_path"], error=str(error))
+        return {}
+
+
+def all_specs(state):
+    """
+    Lists the (workbook, description, spec) tuples of every watched workbook.
+    """
+    return [item for specs in state["specs"].values() for item in specs.values()]
+
+
+def classify(state, path):
+    """
+    Tells what a changed file is to the watcher.
+
+    Args:
+        state (dict): The watcher state.
+        path (str): The absolute path of the changed file.
+
+    Returns:
+        str: "workbook", "source", "message_mapper", "field_mapper" or "mti", or None if the file is not watched.
+    """
+    if path == state["mti_path"]:
+        return "mti"
+    name = os.path.basename(path)
+    if path in state["sources"]:
+        return "workbook" if path in state["jobs"] else "source"
+    if os.path.dirname(path) in state["mapper_dirs"] and name.endswith(".java"):
+        return "message_mapper"
+    if name.endswith("Mapper.java") and any(
+            path.startswith(os.path.abspath(root) + os.sep) for root in state["roots"].values()):
+        return "field_mapper"
+    if Path(path).suffix.lower() in (".xlsx", ".xlsm") and not name.startswith("~$"):
+        if path in state["jobs"] or os.path.dirname(path) in state["sources"]:
+            return "workbook"
+    return None
+
+
+def refresh_workbook(state, workbook):
+    """
+    Reloads a changed workbook and tells which of its specs changed.
+
+    Args:
+        state (dict): The watcher state.
+        workbook (str): The absolute path of the workbook.
+
+    Returns:
+        list: The (workbook, description, spec) tuples that are new or changed.
+    """
+    if not os.path.exists(workbook):
+        removed = state["specs"].pop(workbook, {})
+        state["jobs"].pop(workbook, None)
+        for sheet, description in removed:
+            instrumentation.event("watch.removed", f"Removed {colored(description, 'yellow')} ({sheet}) with "
+                                                    f"{os.path.basename(workbook)}", path=workbook, sheet=sheet)
+        return []
+    if workbook not in state["jobs"]:
+        reload_jobs(state)
+    specs = load_workbook(state, workbook)
+    if specs is None:
+        return []
+    previous = state["specs"].get(workbook, {})
+    state["specs"][workbook] = specs
+    for sheet, description in previous.keys() - specs.keys():
+        instrumentation.event("watch.removed", f"Removed {colored(description, 'yellow')} ({sheet}) from "
+                                                f"{os.path.basename(workbook)}", path=workbook, sheet=sheet)
+    return [item for key, item in specs.items() if key not in previous or previous[key][2] != item[2]]
+
+
+def generate(state, specs):
+    """
+    Writes the missing mapper classes and message type indicator mappings of changed specs, in one changeset.
+
+    Args:
+        state (dict): The watcher state.
+        specs (list): (workbook, description, spec) tuples.
+
+    Returns:
+        None
+    """
+    import render_service
+
+    jobs = [(description, spec["message_function"], *setup.directions_map[key])
+            for _, description, spec in specs for key in state["directions"]]
+    mappings = sorted({(spec["message_function"], indicator) for _, _, spec in specs
+                       for indicator in spec_reader.split_message_type_indicators(spec["message_type_indicator"])
+                       if state["mti"].get(indicator) != spec["message_function"]}, key=lambda pair: pair[1])
+    with changeset.transaction():
+        render_service.generate_mapper_classes(jobs, verbose=True)
+        if mappings:
+            setup.update_message_type_indicators(mappings)
+    if mappings:
+        state["mti"] = load_mti(state)
+
+
+def handle_changes(state, paths, regenerate=False):
+    """
+    Recomputes what a set of changed files affects and returns the findings in that scope.
+
+    Args:
+        state (dict): The watcher state.
+        paths (set): The absolute paths of the changed files.
+        regenerate (bool): Whether to generate the missing classes and mappings of changed specs.
+
+    Returns:
+        list: The findings in the recomputed scope, or None if none of the files is watched.
+    """
+    changed = {}
+    for path in paths:
+        kind = classify(state, path)
+        if kind is not None:
+            changed.setdefault(kind, set()).add(path)
+    if not changed:
+        return None
+    # Files may have been created or removed outside the generator since the directories were listed
+    changeset.forget_listings()
+    changeset.forget_contents(paths)
+
+    if "source" in changed:
+        reload_jobs(state)
+        changed.setdefault("workbook", set()).update(state["jobs"].keys() - state["specs"].keys())
+        changed["workbook"].update(state["specs"].keys() - state["jobs"].keys())
+    changed_specs = []
+    for workbook in sorted(changed.get("workbook", ())):
+        changed_specs.extend(refresh_workbook(state, workbook))
+    if regenerate and changed_specs:
+        generate(state, changed_specs)
+        changed["message_mapper"] = set()
+    if "field_mapper" in changed:
+        state["catalog"] = field_mapper_catalog.load_catalog(state["roots"], state["catalog_path"])
+    if "message_mapper" in changed:
+        state["coverage"] = coverage_scanner.scan_coverage()
+    if "mti" in changed:
+        state["mti"] = load_mti(state)
+
+    # Narrow the validation to the mappers and message type indicators affected by the changes
+    specs = all_specs(state)
+    expected = validator.expected_fields(specs, state["directions"])
+    if "field_mapper" in changed:
+        keys = set(expected)
+    else:
+        keys = {key for key in expected if key[2] in {validator.mapper_name(description) for _, description, _ in changed_specs}}
+        keys |= {(*state["mapper_dirs"][os.path.dirname(path)], Path(path).stem) for path in changed.get("message_mapper", ())}
+    findings = validator.compare_fields({key: expected[key] for key in keys if key in expected},
+                                        validator.actual_fields(state["coverage"]), state["catalog"]["index"])
+    findings += validator.compare_message_type_indicators(specs if "mti" in changed else changed_specs, state["mti"])
+    return findings
+
+
+def open_watcher(state, polling=False):
+    """
+    Starts watching the directories of the workbooks and the Java sources.
+
+    Args:
+        state (dict): The watcher state.
+        polling (bool): Whether to poll even where inotify is available.
+
+    Returns:
+        dict: The watcher, read with next_changes.
+    """
+    directories = watched_directories(state)
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return open_inotify(directories)
+        except OSError as error:
+            instrumentation.event("watch.polling", colored(f"inotify unavailable ({error}), polling instead", 'yellow'),
+                                  error=str(error))
+    return {"kind": "polling", "state": state, "snapshot": snapshot(directories)}
+
+
+def watched_directories(state):
+    """
+    Lists the existing directories to watch, including every sub-directory of the field_mappers trees.
+
+    Args:
+        state (dict): The watcher state.
+
+    Returns:
+        list: The absolute paths of the directories.
+    """
+    directories = {os.path.dirname(state["mti_path"])} | set(state["mapper_dirs"])
+    directories |= {os.path.dirname(workbook) for workbook in state["jobs"]}
+    directories |= {source if os.path.isdir(source) else os.path.dirname(source) for source in state["sources"]}
+    for root in state["roots"].values():
+        directories |= {os.path.abspath(path) for path, _, _ in os.walk(root)}
+    return sorted(directory for directory in directories if os.path.isdir(directory))
+
+
+def open_inotify(directories):
+    """
+    Opens an inotify instance watching directories.
+
+    Args:
+        directories (list): The directories.
+
+    Returns:
+        dict: The watcher.
+
+    Raises:
+        OSError: If inotify is not available.
+    """
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    watcher = {"kind": "inotify", "fd": fd, "libc": libc, "directories": {}}
+    for directory in directories:
+        add_inotify_watch(watcher, directory)
+    return watcher
+
+
+def add_inotify_watch(watcher, directory):
+    """
+    Adds a directory to an inotify watcher.
+
+    Args:
+        watcher (dict): The inotify watcher.
+        directory (str): The directory.
+
+    Returns:
+        None
+    """
+    wd = watcher["libc"].inotify_add_watch(watcher["fd"], os.fsencode(directory), WATCH_MASK)
+    if wd < 0:
+        raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+    watcher["directories"][wd] = directory
+
+
+def read_inotify(watcher, timeout):
+    """
+    Waits for inotify events and returns the paths they concern.
+
+    Args:
+        watcher (dict): The inotify watcher.
+        timeout (float): The maximum wait in seconds.
+
+    Returns:
+        set: The absolute paths of the changed files.
+    """
+    readable, _, _ = select.select([watcher["fd"]], [], [], timeout)
+    if not readable:
+        return set()
+    try:
+        data = os.read(watcher["fd"], EVENT_BUFFER_SIZE)
+    except BlockingIOError:
+        return set()
+
+    paths = set()
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+        name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+        offset += EVENT_HEADER.size + length
+        directory = watcher["directories"].get(wd)
+        if directory is None or not name:
+            continue
+        path = os.path.join(directory, os.fsdecode(name))
+        if mask & IN_ISDIR:
+            # New sub-directories, e.g. a new field mapper package, are watched as well
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    add_inotify_watch(watcher, path)
+                except OSError:
+                    pass
+            continue
+        paths.add(path)
+    return paths
+
+
+def snapshot(directories):
+    """
+    Takes the modification time and size of every file of directories.
+
+    Args:
+        directories (list): The directories.
+
+    Returns:
+        dict: path -> (mtime_ns, size).
+    """
+    files = {}
+    for directory in directories:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def read_polling(watcher, timeout):
+    """
+    Sleeps, then compares a new snapshot of the watched directories with the previous one.
+
+    Args:
+        watcher (dict): The polling watcher.
+        timeout (float): The sleep in seconds.
+
+    Returns:
+        set: The absolute paths of the files created, modified or deleted since the previous snapshot.
+    """
+    time.sleep(timeout)
+    current = snapshot(watched_directories(watcher["state"]))
+    previous = watcher["snapshot"]
+    watcher["snapshot"] = current
+    return {path for path in current.keys() | previous.keys() if current.get(path) != previous.get(path)}
+
+
+def next_changes(watcher, interval=POLL_INTERVAL):
+    """
+    Blocks until files change and the burst of changes has settled.
+
+    Args:
+        watcher (dict): The watcher returned by open_watcher.
+        interval (float): The polling interval in seconds.
+
+    Returns:
+        set: The absolute paths of the changed files.
+    """
+    read = read_inotify if watcher["kind"] == "inotify" else read_polling
+    paths = set()
+    while not paths:
+        paths = read(watcher, interval)
+    while True:
+        more = read(watcher, DEBOUNCE_SECONDS)
+        if not more:
+            return paths
+        paths |= more
+
+
+def watch(sources, directions, regenerate=False, polling=False, interval=POLL_INTERVAL):
+    """
+    Validates once, then revalidates on every change until interrupted.
+
+    Args:
+        sources (list): Workbook paths, directories or JSON manifests, see validator.collect_jobs.
+        directions (list): The direction keys to validate, see generate_setup.directions_map.
+        regenerate (bool): Whether to generate the missing classes and mappings of changed specs.
+        polling (bool): Whether to poll even where inotify is available.
+        interval (float): The polling interval in seconds.
+
+    Returns:
+        None
+    """
+    state = load_state(sources, directions)
+    validator.print_findings(validator.compare_fields(
+        validator.expected_fields(all_specs(state), directions), validator.actual_fields(state["coverage"]),
+        state["catalog"]["index"]) + validator.compare_message_type_indicators(all_specs(state), state["mti"]))
+    watcher = open_watcher(state, polling)
+    instrumentation.event("watch.started", colored(f"Watching {len(state['specs'])} workbook(s) with {watcher['kind']}, "
+                                                   f"press Ctrl+C to stop.", 'green'),
+                          workbooks=len(state["specs"]), watcher=watcher["kind"])
+
+    try:
+        while True:
+            paths = next_changes(watcher, interval)
+            start = time.perf_counter()
+            findings = handle_changes(state, paths, regenerate)
+            if findings is None:
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            names = ", ".join(sorted(os.path.basename(path) for path in paths if classify(state, path)))
+            instrumentation.event("watch.changes", colored(time.strftime("%H:%M:%S"), 'cyan') + f" {names}", names=names)
+            for item in findings:
+                instrumentation.event("watch.finding", "  " + validator.format_finding(item), **item)
+            summary = f"{validator.count_findings(findings)}" if findings else "no findings"
+            instrumentation.event("watch.summary", colored(f"  {summary} in the affected scope ({elapsed:.0f} ms)",
+                                                           'red' if findings else 'green'),
+                                  findings=len(findings), elapsed_ms=elapsed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher["kind"] == "inotify":
+            os.close(watcher["fd"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Revalidate the mappers whenever the spec or the Java sources change.")
+    parser.add_argument("sources", nargs="*", default=[setup.SPEC_FILE],
+                        help="spec workbooks, directories containing spec workbooks or JSON manifests "
+                             "(default: the spec workbook of generate_setup)")
+    cli.add_directions_argument(parser, "validate")
+    parser.add_argument("--module", default=None, help="module of the project config (default: the default module)")
+    parser.add_argument("--generate", action="store_true",
+                        help="generate the missing mapper classes and message type indicator mappings of changed sheets")
+    parser.add_argument("--poll", action="store_true", help="poll the modification times instead of using inotify")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="polling interval in seconds")
+    args = parser.parse_args(argv)
+
+    try:
+        setup.use_module(args.module)
+    except ValueError as error:
+        parser.error(str(error))
+    watch(args.sources, args.directions, args.generate, args.poll, args.interval)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())